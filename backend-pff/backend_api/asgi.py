@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend_api.settings')
+# Lectures servies par les vues asynchrones (vaccination/asynchrone.py)
+os.environ.setdefault('VUES_ASYNCHRONES', '1')
 
 application = get_asgi_application()
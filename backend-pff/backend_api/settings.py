@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,6 +45,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'vaccination.middleware.MetriquesMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -52,6 +54,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'vaccination.routage.RoutageMiddleware',
 ]
 
 ROOT_URLCONF = 'backend_api.urls'
@@ -84,6 +87,56 @@ DATABASES = {
     }
 }
 
+# Profils SQLite, choisis par la variable SQLITE_PROFIL. 'production' : journal WAL (les
+# lectures ne bloquent plus les écritures), pragmas appliqués à chaque connexion, connexions
+# persistantes. Les transactions restent DEFERRED (une lecture ne prend pas le verrou
+# d'écriture) ; les écritures passées par verrous.reessayer_si_verrouillee s'ouvrent en
+# BEGIN IMMEDIATE.
+PRAGMAS_SQLITE = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+PROFILS_SQLITE = {
+    'simple': {
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {'init_command': 'PRAGMA journal_mode=DELETE'},
+    },
+    'production': {
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {nom}={valeur}' for nom, valeur in PRAGMAS_SQLITE.items()),
+            'timeout': 20,
+        },
+    },
+}
+
+SQLITE_PROFIL = os.environ.get('SQLITE_PROFIL', 'production')
+DATABASES['default'].update(PROFILS_SQLITE[SQLITE_PROFIL])
+
+# Réplique en lecture (voir vaccination/routage.py). SQLITE_REPLIQUE désigne une copie locale
+# de la base, tenue à jour par `manage.py repliquer_base` ; une vraie réplique se déclare de
+# la même façon sous l'alias REPLIQUE_ALIAS.
+REPLIQUE_ALIAS = None
+if os.environ.get('SQLITE_REPLIQUE'):
+    REPLIQUE_ALIAS = 'replique'
+    # Connexion par requête : chaque copie remplace le fichier, une connexion gardée lirait l'ancien
+    DATABASES[REPLIQUE_ALIAS] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['SQLITE_REPLIQUE'],
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {'init_command': 'PRAGMA query_only=ON'},
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['vaccination.routage.RoutageLectureEcriture']
+# Après une écriture, le client lit la base principale pendant ce délai (secondes)
+REPLIQUE_DELAI_COLLANT = 30
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -127,3 +180,74 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 CORS_ALLOW_ALL_ORIGINS = True
+
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'vaccination.authentification.TokenEnCacheAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'vaccination.pagination.PaginationParCurseur',
+    'PAGE_SIZE': 50,
+    # Même JSON que le rendu de DRF, encodé par orjson s'il est installé
+    'DEFAULT_RENDERER_CLASSES': [
+        'vaccination.rapide.RenduJSONRapide',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+# Listes /api/enfants/ et /api/vaccins/ lues par values() plutôt que par les serializers
+# (vaccination/rapide.py) : même JSON, moins de temps CPU par ligne
+LISTES_RAPIDES = os.environ.get('LISTES_RAPIDES', '0') == '1'
+
+# Lectures asynchrones (villages, enfants, statistiques : vaccination/asynchrone.py),
+# activées par défaut par backend_api/asgi.py ; sous WSGI, les vues DRF synchrones suffisent
+VUES_ASYNCHRONES = os.environ.get('VUES_ASYNCHRONES', '0') == '1'
+if VUES_ASYNCHRONES:
+    ROOT_URLCONF = 'backend_api.urls_asgi'
+
+AUTHENTICATION_BACKENDS = ['vaccination.authentification.ModelBackendAvecProfil']
+
+# Durée (secondes) pendant laquelle un token résolu reste en cache, révocations mises à part
+CACHE_AUTH_TTL = 300
+
+# Cache des réponses de lecture de l'API (vaccination/cache.py), invalidé par les signaux
+# des modèles, et des tokens d'authentification. 'locmem' (défaut) est propre à chaque processus : avec plusieurs workers,
+# choisir 'fichier' ou 'redis' (paquet `redis` requis ; politique allkeys-lru côté serveur).
+CACHE_VACCINATION = os.environ.get('CACHE_VACCINATION', 'locmem')
+
+BACKENDS_CACHE_VACCINATION = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'vaccination',
+        # Au-delà, les entrées les moins récemment lues sont évincées
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    'fichier': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache_api',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'),
+    },
+}
+
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'vaccination': {**BACKENDS_CACHE_VACCINATION[CACHE_VACCINATION], 'TIMEOUT': 600},
+}
+
+# Taille maximale (octets, sérialisée) d'une réponse mise en cache
+CACHE_VACCINATION_TAILLE_MAX_ENTREE = 512 * 1024
+
+# Métriques des requêtes (vaccination/middleware.py), exposées sur /api/metrics/ :
+# part des requêtes mesurées, et durée (secondes) au-delà de laquelle une requête
+# est journalisée avec ses requêtes SQL (logger 'vaccination.lent')
+METRIQUES_ECHANTILLONNAGE = 1.0
+METRIQUES_SEUIL_LENT = 1.0
+
+# Tâches différées (vaccination/taches.py, `manage.py travailleur`) : dossier des
+# fichiers qu'elles produisent (exports demandés avec ?differe=1)
+TACHES_DOSSIER = os.environ.get('TACHES_DOSSIER', BASE_DIR / 'taches')
@@ -0,0 +1,13 @@
+"""
+Routes servies sous ASGI (VUES_ASYNCHRONES) : les lectures asynchrones de l'API passent
+devant les routes DRF, qui gardent les écritures et les autres lectures.
+"""
+from django.contrib import admin
+from django.urls import path, include
+
+from vaccination.urls import routes_asynchrones, urlpatterns as routes_api
+
+urlpatterns = [
+    path('admin/', admin.site.urls),
+    path('api/', include(routes_asynchrones + routes_api)),
+]
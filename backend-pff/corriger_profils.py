@@ -6,29 +6,11 @@ import django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend_api.settings')
 django.setup()
 
-from django.contrib.auth.models import User
-from vaccination.models import Profile
+from django.core.management import call_command
 
 def corriger_profils_manquants():
-    print("=== CORRECTION DES PROFILS MANQUANTS ===\n")
-    
-    users = User.objects.all()
-    profils_crees = 0
-    
-    for user in users:
-        try:
-            # Vérifier si l'utilisateur a déjà un profil
-            profile = user.profile
-            print(f"✓ {user.username} a déjà un profil (rôle: {profile.get_role_display()})")
-        except Profile.DoesNotExist:
-            # Créer un profil pour l'utilisateur
-            profile = Profile.objects.create(user=user, role='parent')
-            profils_crees += 1
-            print(f"✓ Profil créé pour {user.username} avec le rôle 'Parent'")
-    
-    print(f"\n=== RÉSULTAT ===")
-    print(f"Profils créés: {profils_crees}")
-    print(f"Total utilisateurs: {users.count()}")
+    # Voir `python manage.py corriger_profils` : anti-jointure et créations par lots
+    call_command('corriger_profils')
 
 if __name__ == "__main__":
-    corriger_profils_manquants() 
\ No newline at end of file
+    corriger_profils_manquants()
\ No newline at end of file
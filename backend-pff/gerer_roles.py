@@ -7,7 +7,9 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend_api.settings')
 django.setup()
 
 from django.contrib.auth.models import User
+from django.core.management import call_command
 from vaccination.models import Profile
+from vaccination.roles import lister_utilisateurs, libelle
 
 def afficher_menu():
     print("\n=== GESTION DES RÔLES ===")
@@ -19,41 +21,19 @@ def afficher_menu():
     print("=" * 30)
 
 def voir_utilisateurs():
-    print("\n=== UTILISATEURS ET LEURS RÔLES ===")
-    users = User.objects.all()
-    
-    if not users.exists():
-        print("Aucun utilisateur trouvé.")
-        return
-    
-    print(f"{'ID':<5} {'Nom d\'utilisateur':<20} {'Email':<30} {'Rôle':<15}")
-    print("-" * 70)
-    
-    for user in users:
-        try:
-            profile = user.profile
-            role = profile.get_role_display()
-        except Profile.DoesNotExist:
-            role = "Aucun profil"
-        
-        print(f"{user.id:<5} {user.username:<20} {user.email:<30} {role:<15}")
+    call_command('voir_roles')
 
 def changer_role():
     print("\n=== CHANGER LE RÔLE D'UN UTILISATEUR ===")
     
     # Afficher les utilisateurs
-    users = User.objects.all()
-    if not users.exists():
+    if not User.objects.exists():
         print("Aucun utilisateur trouvé.")
         return
     
     print("Utilisateurs disponibles:")
-    for user in users:
-        try:
-            role = user.profile.get_role_display()
-        except Profile.DoesNotExist:
-            role = "Aucun profil"
-        print(f"{user.id}. {user.username} - {role}")
+    for user_id, username, _, role in lister_utilisateurs():
+        print(f"{user_id}. {username} - {libelle(role)}")
     
     # Demander l'ID de l'utilisateur
     try:
@@ -124,23 +104,7 @@ def creer_utilisateur():
         print(f"✓ Utilisateur {username} créé avec le rôle '{dict(Profile.USER_ROLES)[role]}'")
 
 def statistiques():
-    print("\n=== STATISTIQUES PAR RÔLE ===")
-    users = User.objects.all()
-    roles_count = {}
-    
-    for user in users:
-        try:
-            role = user.profile.role
-            roles_count[role] = roles_count.get(role, 0) + 1
-        except Profile.DoesNotExist:
-            roles_count['sans_profil'] = roles_count.get('sans_profil', 0) + 1
-    
-    for role, count in roles_count.items():
-        if role == 'sans_profil':
-            print(f"Sans profil: {count}")
-        else:
-            role_display = dict(Profile.USER_ROLES).get(role, role)
-            print(f"{role_display}: {count}")
+    call_command('voir_roles', statistiques=True)
 
 def main():
     while True:
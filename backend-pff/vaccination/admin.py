@@ -1,3 +1,8 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import DoseCalendrier
+
+
+@admin.register(DoseCalendrier)
+class DoseCalendrierAdmin(admin.ModelAdmin):
+    list_display = ['vaccin', 'dose', 'age_jours', 'tolerance_jours']
@@ -0,0 +1,151 @@
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.views import View
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.views import APIView
+
+from . import cache
+from .conditionnel import aversion_enfant, aversion_objet, aversions_tables, condition, poser_validateurs
+from .models import Village
+from .rapide import RenduJSONRapide, avaccins_par_enfant
+from .views import EnfantViewSet, StatistiquesView, VillageViewSet
+
+# Vues de lecture asynchrones, servies sous ASGI (voir urls.py) : les lectures passent par
+# l'ORM asynchrone et la réponse est envoyée sans occuper de thread pendant que le client
+# la reçoit. Mêmes données, mêmes validateurs HTTP et mêmes entrées de cache que les vues DRF.
+
+MEDIA_TYPE = 'application/json'
+
+
+def reponse_json(donnees, status=200):
+    reponse = HttpResponse(RenduJSONRapide().render(donnees), content_type=MEDIA_TYPE, status=status)
+    patch_vary_headers(reponse, ['Accept'])
+    return reponse
+
+
+class LectureAsynchrone(View):
+    """
+    GET asynchrone d'une vue DRF existante (`vue`, dont sont repris filtres, pagination,
+    champs et générations de cache). Les écritures, et les lectures demandant un autre
+    format que JSON (API navigable), sont déléguées à la vue synchrone `synchrone`.
+    Les sous-classes définissent `liste(vue, request)` et, si leur URL a un `pk`, `detail(vue, request, pk)`.
+    """
+    vue = None
+    synchrone = None
+    lecture_replique = True
+
+    def vue_drf(self, request, action, kwargs):
+        vue = self.vue()
+        vue.args, vue.kwargs, vue.action, vue.headers = (), kwargs, action, {}
+        # Requête DRF sans l'action_map des ViewSet : l'action est fixée ci-dessus
+        vue.request = APIView.initialize_request(vue, request)
+        return vue
+
+    @staticmethod
+    def json_accepte(request):
+        accept = request.headers.get('Accept', '')
+        return 'format' not in request.GET and 'text/html' not in accept
+
+    async def deleguer(self, request, *args, **kwargs):
+        return await sync_to_async(self.synchrone)(request, *args, **kwargs)
+
+    post = put = patch = delete = options = deleguer
+
+    async def get(self, request, *args, **kwargs):
+        if not self.json_accepte(request):
+            return await self.deleguer(request, *args, **kwargs)
+        vue = self.vue_drf(request, 'retrieve' if 'pk' in kwargs else 'list', kwargs)
+        try:
+            # Négociation, authentification, permissions et limitations de la vue DRF
+            await sync_to_async(vue.initial)(vue.request, **kwargs)
+        except APIException:
+            # Refus (401, 403, 429) : la vue synchrone produit la réponse de DRF et ses en-têtes
+            return await self.deleguer(request, *args, **kwargs)
+        try:
+            if 'pk' in kwargs:
+                return await self.detail(vue, request, kwargs['pk'])
+            return await self.liste(vue, request)
+        except APIException as erreur:
+            # Comme le gestionnaire d'exceptions de DRF
+            detail = erreur.detail if isinstance(erreur.detail, (list, dict)) else {'detail': erreur.detail}
+            return reponse_json(detail, status=erreur.status_code)
+
+    async def repondre_si_modifie(self, request, validateurs, produire):
+        """ConditionnelMixin.repondre_si_modifie, avec `produire` coroutine renvoyant les données."""
+        request.version_donnees = validateurs[0]
+        etag, last_modified, reponse = condition(request, validateurs, MEDIA_TYPE)
+        if reponse is None:
+            reponse = reponse_json(await produire())
+        return poser_validateurs(reponse, etag, last_modified)
+
+    async def en_cache(self, vue, request, noms, produire):
+        return await cache.adonnees_en_cache(vue.__class__.__name__, request, noms, produire)
+
+
+class VillagesAsynchrones(LectureAsynchrone):
+    vue = VillageViewSet
+
+    async def liste(self, vue, request):
+        async def produire():
+            return [ligne async for ligne in vue.get_queryset().values('id', 'nom')]
+
+        return await self.repondre_si_modifie(
+            request, await aversions_tables(*vue.tables_versionnees),
+            lambda: self.en_cache(vue, request, vue.generations_liste, produire),
+        )
+
+    async def detail(self, vue, request, pk):
+        validateurs = await aversion_objet(Village, pk)
+        if validateurs is None:
+            raise NotFound('No Village matches the given query.')
+
+        async def produire():
+            return await vue.get_queryset().filter(pk=pk).values('id', 'nom').aget()
+
+        return await self.repondre_si_modifie(
+            request, validateurs, lambda: self.en_cache(vue, request, vue.generations_detail(pk), produire),
+        )
+
+
+class EnfantsAsynchrones(LectureAsynchrone):
+    vue = EnfantViewSet
+
+    async def liste(self, vue, request):
+        async def produire():
+            # Lignes par values() comme la liste rapide, page lue par l'ORM asynchrone
+            queryset = vue.filter_queryset(vue.get_queryset()).prefetch_related(None).values(*vue.colonnes_rapides)
+            page = await vue.paginator.apaginer(queryset, vue.request, vue)
+            vaccins = await avaccins_par_enfant([ligne['id'] for ligne in page]) if vue.inclut('vaccins') else {}
+            return vue.paginator.get_paginated_response(vue.serialiser_lignes(page, vaccins)).data
+
+        return await self.repondre_si_modifie(
+            request, await aversions_tables(*vue.tables_versionnees),
+            lambda: self.en_cache(vue, request, vue.generations_liste, produire),
+        )
+
+    async def detail(self, vue, request, pk):
+        validateurs = await aversion_enfant(pk)
+        if validateurs is None:
+            raise NotFound('No Enfant matches the given query.')
+
+        async def produire():
+            # Village joint et vaccins préchargés : le serializer ne lit plus la base
+            enfant = await vue.get_queryset().aget(pk=pk)
+            return vue.get_serializer(enfant).data
+
+        return await self.repondre_si_modifie(
+            request, validateurs, lambda: self.en_cache(vue, request, vue.generations_detail(pk), produire),
+        )
+
+
+class StatistiquesAsynchrones(LectureAsynchrone):
+    vue = StatistiquesView
+
+    async def liste(self, vue, request):
+        async def produire():
+            lignes, prochains = vue.requetes()
+            return vue.donnees([ligne async for ligne in lignes], await prochains.acount())
+
+        validateurs = vue.validateurs(await aversions_tables(*vue.tables_versionnees))
+        return await self.repondre_si_modifie(request, validateurs, produire)
@@ -0,0 +1,110 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db import transaction
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .cache import stockage
+from .models import Profile
+
+
+def role_de(user):
+    return user.profile.role if hasattr(user, 'profile') else 'parent'
+
+
+def est_administrateur(user):
+    return user.is_staff or role_de(user) == 'admin'
+
+
+def cle_token(key):
+    return f'auth:token:{key}'
+
+
+def duree_cache():
+    return getattr(settings, 'CACHE_AUTH_TTL', 300)
+
+
+# Champs de l'utilisateur gardés en cache : ni mot de passe haché ni données personnelles,
+# le cache peut être un fichier sur disque
+CHAMPS_EN_CACHE = ('id', 'username', 'is_active', 'is_staff', 'is_superuser')
+
+
+def memoriser(key, user):
+    """Garde l'identité et le rôle de l'utilisateur du token pour `CACHE_AUTH_TTL` secondes."""
+    profil = getattr(user, 'profile', None)
+    entree = (tuple(getattr(user, champ) for champ in CHAMPS_EN_CACHE), profil.role if profil else None)
+    stockage().set(cle_token(key), entree, duree_cache())
+
+
+def utilisateur_en_cache(entree):
+    """Utilisateur allégé reconstruit depuis l'entrée de `memoriser`, profil compris, sans requête."""
+    valeurs, role = entree
+    user = get_user_model()(**dict(zip(CHAMPS_EN_CACHE, valeurs)))
+    if role is None:
+        # Absence de profil mémorisée : hasattr(user, 'profile') ne relit pas la base
+        get_user_model().profile.related.set_cached_value(user, None)
+    else:
+        user.profile = Profile(user_id=user.id, role=role)
+    return user
+
+
+def revoquer(*keys):
+    """Retire des tokens du cache, tout de suite et au commit de la transaction en cours."""
+    cles = [cle_token(key) for key in keys]
+    if not cles:
+        return
+    stockage().delete_many(cles)
+    transaction.on_commit(lambda: stockage().delete_many(cles))
+
+
+def revoquer_utilisateur(user_id):
+    revoquer(*Token.objects.filter(user_id=user_id).values_list('key', flat=True))
+
+
+class TokenEnCacheAuthentication(TokenAuthentication):
+    """
+    `Authorization: Token <clé>` sans requête tant que le token est en cache ;
+    sinon une seule requête (token, utilisateur et profil en jointure).
+    Les signaux retirent l'entrée à la déconnexion et au changement de rôle.
+    """
+
+    def authenticate_credentials(self, key):
+        entree = stockage().get(cle_token(key))
+        # Une entrée d'un autre format (ancienne version) est relue en base
+        if isinstance(entree, tuple):
+            user = utilisateur_en_cache(entree)
+        else:
+            try:
+                token = Token.objects.select_related('user__profile').get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed('Token invalide.')
+            user = token.user
+            if user.is_active:
+                memoriser(key, user)
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('Utilisateur inactif ou supprimé.')
+        return user, Token(key=key, user=user)
+
+
+class ModelBackendAvecProfil(ModelBackend):
+    """ModelBackend qui charge le profil et le token avec l'utilisateur, en une requête."""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.select_related('profile', 'auth_token').get(
+                **{UserModel.USERNAME_FIELD: username}
+            )
+        except UserModel.DoesNotExist:
+            # Même coût de hachage qu'un utilisateur existant (cf. ModelBackend)
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,323 @@
+import contextvars
+import http.client
+import json
+import random
+import statistics
+import threading
+import time
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.contrib.auth.models import User
+from django.core.wsgi import get_wsgi_application
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.test.utils import override_settings
+from rest_framework.authtoken.models import Token
+
+from .mesures import Chronometre, MesureSQL, mesurer_sql
+from .models import Village, Enfant, Vaccin
+
+# Routes mesurées : (nom, méthode, chemin, corps). Les chemins et corps sont des gabarits
+# complétés avec des identifiants tirés du jeu de données (`{enfant}`, `{village}`...).
+SCENARIOS = [
+    ('villages_liste', 'GET', '/api/villages/', None),
+    ('villages_detail', 'GET', '/api/villages/{village}/', None),
+    ('villages_creation', 'POST', '/api/villages/', {'nom': 'Village {n}'}),
+    ('enfants_liste', 'GET', '/api/enfants/', None),
+    ('enfants_liste_vaccins', 'GET', '/api/enfants/?expand=vaccins', None),
+    ('enfants_liste_filtree', 'GET', '/api/enfants/?village={village}&statut=retard', None),
+    ('enfants_detail', 'GET', '/api/enfants/{enfant}/', None),
+    ('enfants_creation', 'POST', '/api/enfants/',
+     {'nom': 'Enfant {n}', 'sexe': 'F', 'village_id': '{village}', 'date_naissance': '2024-01-01'}),
+    ('enfants_vaccins_liste', 'GET', '/api/enfants/{enfant}/vaccins/', None),
+    ('enfants_vaccins_creation', 'POST', '/api/enfants/{enfant}/vaccins/',
+     {'nom': 'Polio', 'date_administration': '2024-03-01', 'statut': 'recu'}),
+    ('enfants_lot', 'POST', '/api/enfants/bulk/', 'lot'),
+    ('vaccins_liste', 'GET', '/api/vaccins/', None),
+    ('vaccins_liste_filtree', 'GET', '/api/vaccins/?statut=retard&nom=DTC', None),
+    ('vaccins_detail', 'GET', '/api/vaccins/{vaccin}/', None),
+    ('vaccins_creation', 'POST', '/api/vaccins/',
+     {'enfant': '{enfant}', 'nom': 'BCG', 'date_administration': '2024-01-02', 'statut': 'recu'}),
+    ('enfants_recherche', 'GET', '/api/enfants/search/?q=fatou', None),
+    ('statistiques', 'GET', '/api/statistiques/', None),
+    ('rendez_vous_liste', 'GET', '/api/rendez-vous/', None),
+    ('rendez_vous_filtre', 'GET', '/api/rendez-vous/?village={village}&statut=en_retard', None),
+    ('export_csv', 'GET', '/api/export/enfants.csv?village={village}', None),
+    ('taches_liste', 'GET', '/api/taches/', None),
+    ('taches_creation', 'POST', '/api/taches/', {'nom': 'reconstruire_statistiques'}),
+    ('synchronisation', 'GET', '/api/sync/?limite=500', None),
+    ('cache', 'GET', '/api/cache/', None),
+    ('metriques', 'GET', '/api/metrics/', None),
+    ('connexion', 'POST', '/api/login/', 'connexion'),
+    ('deconnexion', 'POST', '/api/logout/', None),
+]
+
+# Routes réservées aux utilisateurs connectés : appelées avec le token de l'utilisateur de
+# benchmark, ou avec celui d'un utilisateur propre à l'itération pour la déconnexion (qui le supprime)
+AUTHENTIFICATION = {'export_csv': 'jeton', 'taches_liste': 'jeton', 'taches_creation': 'jeton',
+                    'deconnexion': 'jetable'}
+
+# La connexion est dominée par le hachage du mot de passe : moins d'itérations
+ITERATIONS_REDUITES = {'connexion': 10}
+
+# Nombre d'identifiants distincts parcourus par les routes de détail
+TAILLE_ECHANTILLON = 100
+
+
+def percentile(valeurs, rang):
+    if len(valeurs) == 1:
+        return valeurs[0]
+    return statistics.quantiles(valeurs, n=100, method='inclusive')[rang - 1]
+
+
+def echantillon(graine=42):
+    """Identifiants tirés du jeu de données, toujours les mêmes pour une même base."""
+    rng = random.Random(graine)
+    ids = {}
+    for cle, modele in [('village', Village), ('enfant', Enfant), ('vaccin', Vaccin)]:
+        tous = list(modele.objects.order_by('id').values_list('id', flat=True))
+        if not tous:
+            raise ValueError(f'Aucun {cle} dans la base : générer un jeu de données.')
+        ids[cle] = rng.sample(tous, min(TAILLE_ECHANTILLON, len(tous)))
+    return ids
+
+
+def remplir(gabarit, valeurs):
+    if isinstance(gabarit, dict):
+        return {cle: remplir(valeur, valeurs) for cle, valeur in gabarit.items()}
+    if isinstance(gabarit, str):
+        return gabarit.format(**valeurs)
+    return gabarit
+
+
+def jeton(username):
+    """Clé du token de `username`, créés au besoin (utilisateur sans mot de passe utilisable)."""
+    utilisateur, _ = User.objects.get_or_create(username=username)
+    return Token.objects.get_or_create(user=utilisateur)[0].key
+
+
+def requetes_scenario(nom, methode, chemin, corps, ids, iterations, identifiants):
+    """(méthode, chemin, corps JSON, token ou None) de chaque itération d'un scénario."""
+    authentification = AUTHENTIFICATION.get(nom)
+    for n in range(iterations):
+        valeurs = {cle: liste[n % len(liste)] for cle, liste in ids.items()}
+        valeurs['n'] = f'{nom}-{n}-{time.time_ns()}'
+        if corps == 'connexion':
+            donnees = identifiants
+        elif corps == 'lot':
+            donnees = {'enfants': [
+                {'cle': f'{valeurs["n"]}-{i}', 'nom': f'Enfant {i}', 'sexe': 'M', 'village_id': valeurs['village'],
+                 'date_naissance': '2024-01-01',
+                 'vaccins': [{'cle': f'{valeurs["n"]}-{i}-v', 'nom': 'BCG', 'date_administration': '2024-01-02',
+                              'statut': 'recu'}]}
+                for i in range(10)
+            ]}
+        else:
+            donnees = remplir(corps, valeurs)
+        if authentification == 'jeton':
+            cle = jeton(identifiants['username'])
+        elif authentification == 'jetable':
+            cle = jeton(f'{identifiants["username"]}-{nom}-{n}')
+        else:
+            cle = None
+        yield methode, remplir(chemin, valeurs), donnees, cle
+
+
+def entetes_auth(cle):
+    return {} if cle is None else {'Authorization': f'Token {cle}'}
+
+
+class ClientDjango:
+    """Requêtes via le client de test : pas de réseau, mesures SQL dans le même thread."""
+    mode = 'client'
+
+    def __init__(self, **defaults):
+        self.client = Client(**defaults)
+
+    def envoyer(self, methode, chemin, donnees, cle=None):
+        with mesurer_sql() as mesure:
+            debut = time.perf_counter()
+            if methode == 'GET':
+                reponse = self.client.get(chemin, headers=entetes_auth(cle))
+            else:
+                reponse = self.client.generic(methode, chemin, json.dumps(donnees), 'application/json',
+                                              headers=entetes_auth(cle))
+            contenu = b''.join(reponse) if reponse.streaming else reponse.content
+            duree = time.perf_counter() - debut
+        return duree, reponse.status_code, mesure.requetes, mesure.lignes, len(contenu)
+
+    def fermer(self):
+        pass
+
+
+class ServeurSilencieux(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def application_mesuree(application):
+    """Application WSGI qui renvoie ses mesures SQL dans des en-têtes X-Requetes-SQL / X-Lignes-SQL."""
+    def wsgi(environ, start_response):
+        with mesurer_sql() as mesure:
+            def demarrer(statut, entetes, exc_info=None):
+                entetes = [*entetes, ('X-Requetes-SQL', str(mesure.requetes)), ('X-Lignes-SQL', str(mesure.lignes))]
+                return start_response(statut, entetes, exc_info)
+            return application(environ, demarrer)
+    return wsgi
+
+
+# Mesure de la requête ASGI en cours : la variable de contexte suit la requête jusque dans
+# les threads où sync_to_async exécute l'ORM, dont les connexions sont propres à chaque thread
+mesure_requete = contextvars.ContextVar('mesure_requete', default=None)
+
+
+def chronometre_requete(execute, sql, params, many, context):
+    mesure = mesure_requete.get()
+    if mesure is None:
+        return execute(sql, params, many, context)
+    return Chronometre(mesure)(execute, sql, params, many, context)
+
+
+def instrumenter_connexion(sender, connection, **kwargs):
+    """Récepteur de connection_created : chaque connexion ouverte compte pour la requête en cours."""
+    if chronometre_requete not in connection.execute_wrappers:
+        connection.execute_wrappers.append(chronometre_requete)
+
+
+def application_asgi_mesuree(application):
+    """Équivalent ASGI d'application_mesuree : en-têtes ajoutés au début de la réponse."""
+    async def asgi(scope, receive, send):
+        if scope['type'] != 'http':
+            return await application(scope, receive, send)
+        mesure = MesureSQL()
+
+        async def envoyer(message):
+            if message['type'] == 'http.response.start':
+                message = {**message, 'headers': [
+                    *message.get('headers', []),
+                    (b'x-requetes-sql', str(mesure.requetes).encode()),
+                    (b'x-lignes-sql', str(mesure.lignes).encode()),
+                ]}
+            await send(message)
+
+        jeton = mesure_requete.set(mesure)
+        try:
+            await application(scope, receive, envoyer)
+        finally:
+            mesure.active = False
+            mesure_requete.reset(jeton)
+    return asgi
+
+
+class ClientHTTP:
+    """Requêtes HTTP vers un serveur WSGI local lancé dans un thread (sérialisation et réseau compris)."""
+    mode = 'serveur'
+
+    def __init__(self):
+        self.connexion = http.client.HTTPConnection('127.0.0.1', self.demarrer())
+
+    def demarrer(self):
+        """Lance le serveur dans un thread ; renvoie son port."""
+        self.serveur = make_server(
+            '127.0.0.1', 0, application_mesuree(get_wsgi_application()),
+            server_class=WSGIServer, handler_class=ServeurSilencieux,
+        )
+        self.thread = threading.Thread(target=self.serveur.serve_forever, daemon=True)
+        self.thread.start()
+        return self.serveur.server_port
+
+    def envoyer(self, methode, chemin, donnees, cle=None):
+        corps = None if methode == 'GET' else json.dumps(donnees)
+        entetes = entetes_auth(cle)
+        if corps is not None:
+            entetes['Content-Type'] = 'application/json'
+        debut = time.perf_counter()
+        self.connexion.request(methode, chemin, body=corps, headers=entetes)
+        reponse = self.connexion.getresponse()
+        contenu = reponse.read()
+        duree = time.perf_counter() - debut
+        # wsgiref ferme la connexion après chaque réponse ; même chose pour les autres serveurs
+        self.connexion.close()
+        return (duree, reponse.status, int(reponse.getheader('X-Requetes-SQL', 0)),
+                int(reponse.getheader('X-Lignes-SQL', 0)), len(contenu))
+
+    def fermer(self):
+        self.serveur.shutdown()
+        self.serveur.server_close()
+
+
+class ClientASGI(ClientHTTP):
+    """
+    Mêmes requêtes HTTP vers uvicorn servant backend_api.asgi dans un thread : lectures par
+    les vues asynchrones (routes de backend_api/urls_asgi.py). Demande le paquet uvicorn.
+    """
+    mode = 'asgi'
+
+    def demarrer(self):
+        import uvicorn
+
+        from backend_api.asgi import application
+
+        self.routes = override_settings(ROOT_URLCONF='backend_api.urls_asgi')
+        self.routes.enable()
+        connection_created.connect(instrumenter_connexion)
+        self.serveur = uvicorn.Server(uvicorn.Config(
+            application_asgi_mesuree(application), host='127.0.0.1', port=0,
+            lifespan='off', log_level='warning', access_log=False,
+        ))
+        self.thread = threading.Thread(target=self.serveur.run, daemon=True)
+        self.thread.start()
+        while not self.serveur.started:
+            if not self.thread.is_alive():
+                raise RuntimeError('uvicorn ne démarre pas.')
+            time.sleep(0.01)
+        return self.serveur.servers[0].sockets[0].getsockname()[1]
+
+    def fermer(self):
+        self.serveur.should_exit = True
+        self.thread.join()
+        connection_created.disconnect(instrumenter_connexion)
+        self.routes.disable()
+
+
+def mesurer_routes(client, ids, iterations, identifiants, scenarios=SCENARIOS):
+    """{route: mesures} ; une première requête par route sert d'échauffement, hors mesure."""
+    resultats = {}
+    for nom, methode, chemin, corps in scenarios:
+        nombre = min(iterations, ITERATIONS_REDUITES.get(nom, iterations))
+        requetes = list(requetes_scenario(nom, methode, chemin, corps, ids, nombre + 1, identifiants))
+        client.envoyer(*requetes[0])
+        durees, statuts, nb_requetes, lignes, octets = zip(*(client.envoyer(*r) for r in requetes[1:]))
+        durees = [duree * 1000 for duree in durees]
+        resultats[nom] = {
+            'iterations': nombre,
+            'p50_ms': round(percentile(durees, 50), 3),
+            'p95_ms': round(percentile(durees, 95), 3),
+            'p99_ms': round(percentile(durees, 99), 3),
+            'moyenne_ms': round(statistics.fmean(durees), 3),
+            'requetes_sql': round(statistics.fmean(nb_requetes), 2),
+            'lignes_lues': round(statistics.fmean(lignes), 2),
+            'octets': round(statistics.fmean(octets)),
+            'statuts': sorted(set(statuts)),
+        }
+    return resultats
+
+
+def comparer(reference, actuel, tolerance=0.25, marge_ms=1.0):
+    """
+    Régressions de `actuel` par rapport à `reference` (mêmes structures que le JSON produit) :
+    p95 plus lent au-delà de la tolérance relative et de la marge absolue, ou plus de requêtes SQL.
+    """
+    regressions = []
+    for mode, routes in actuel['resultats'].items():
+        for nom, mesure in routes.items():
+            ancienne = reference.get('resultats', {}).get(mode, {}).get(nom)
+            if ancienne is None:
+                continue
+            if mesure['p95_ms'] > ancienne['p95_ms'] * (1 + tolerance) + marge_ms:
+                regressions.append(f'{mode}/{nom} : p95 {ancienne["p95_ms"]} -> {mesure["p95_ms"]} ms')
+            if mesure['requetes_sql'] > ancienne['requetes_sql']:
+                regressions.append(
+                    f'{mode}/{nom} : requêtes SQL {ancienne["requetes_sql"]} -> {mesure["requetes_sql"]}'
+                )
+    return regressions
@@ -0,0 +1,160 @@
+import pickle
+import threading
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db import transaction
+from rest_framework.response import Response
+
+from . import routage
+
+# Alias de settings.CACHES utilisé pour les réponses de lecture
+ALIAS = 'vaccination'
+
+_compteurs = Counter()
+_verrou = threading.Lock()
+
+
+def compter(nom, pas=1):
+    with _verrou:
+        _compteurs[nom] += pas
+
+
+def compteurs():
+    """Compteurs du processus courant : succès, échecs, entrées ignorées, invalidations."""
+    with _verrou:
+        valeurs = {nom: _compteurs[nom] for nom in ['succes', 'echecs', 'ignores', 'invalidations']}
+    lectures = valeurs['succes'] + valeurs['echecs']
+    valeurs['taux_succes'] = round(valeurs['succes'] / lectures, 4) if lectures else 0.0
+    valeurs['backend'] = settings.CACHES[ALIAS]['BACKEND']
+    return valeurs
+
+
+def stockage():
+    return caches[ALIAS]
+
+
+def taille_max_entree():
+    return getattr(settings, 'CACHE_VACCINATION_TAILLE_MAX_ENTREE', 512 * 1024)
+
+
+# Générations : chaque réponse est rangée sous les générations des données dont elle dépend
+# ('table:enfant', 'enfant:12'...). Invalider revient à changer la génération, ce qui rend
+# les anciennes entrées inaccessibles ; l'éviction LRU du backend les retire ensuite.
+
+def generations(noms):
+    """Génération courante de chaque nom ; une génération absente (évincée) en reçoit une nouvelle."""
+    valeurs = stockage().get_many(noms)
+    manquantes = {nom: uuid.uuid4().hex for nom in noms if nom not in valeurs}
+    if manquantes:
+        stockage().set_many(manquantes, timeout=None)
+        valeurs.update(manquantes)
+    return [valeurs[nom] for nom in noms]
+
+
+async def agenerations(noms):
+    valeurs = await stockage().aget_many(noms)
+    manquantes = {nom: uuid.uuid4().hex for nom in noms if nom not in valeurs}
+    if manquantes:
+        await stockage().aset_many(manquantes, timeout=None)
+        valeurs.update(manquantes)
+    return [valeurs[nom] for nom in noms]
+
+
+def _renouveler(noms):
+    stockage().set_many({nom: uuid.uuid4().hex for nom in noms}, timeout=None)
+
+
+def invalider(*noms):
+    """
+    Invalide tout de suite et à nouveau au commit : une lecture concurrente qui aurait
+    mis en cache l'état d'avant la transaction ne peut pas survivre à celle-ci.
+    """
+    noms = [nom for nom in noms if nom]
+    if not noms:
+        return
+    compter('invalidations', len(noms))
+    _renouveler(noms)
+    transaction.on_commit(lambda: _renouveler(noms))
+
+
+def cle_reponse(vue, noms, request, valeurs=None):
+    valeurs = generations(noms) if valeurs is None else valeurs
+    # La version lue en base par ConditionnelMixin fait partie de la clé : une écriture d'un
+    # autre processus (travailleur, commande) dont l'invalidation n'a pas atteint ce cache
+    # (locmem) rend les anciennes entrées inaccessibles au lieu de les servir sous un nouvel ETag
+    version = getattr(request, 'version_donnees', '')
+    cle = f'reponse:{vue}:{":".join(valeurs)}:{version}:{request.get_full_path()}'
+    # Lue sur la réplique, la réponse peut précéder la dernière invalidation : rangée à
+    # part, elle ne vit que le temps du délai de réplication toléré
+    replique = routage.base_lecture()
+    return f'{cle}:{replique}' if replique else cle
+
+
+def entree(donnees):
+    """(données sérialisées, durée de vie) de l'entrée à ranger, ou None si elle est trop grosse."""
+    donnees = pickle.dumps(donnees, pickle.HIGHEST_PROTOCOL)
+    if len(donnees) > taille_max_entree():
+        compter('ignores')
+        return None
+    if routage.base_lecture():
+        return donnees, routage.delai_collant()
+    return donnees, DEFAULT_TIMEOUT
+
+
+async def adonnees_en_cache(vue, request, noms, produire):
+    """
+    Pour les vues asynchrones : données de la réponse sous la même clé que
+    CacheReponseMixin.reponse_en_cache de la vue `vue` ; `produire` est une coroutine.
+    """
+    cle = cle_reponse(vue, noms, request, await agenerations(noms))
+    donnees = await stockage().aget(cle)
+    if donnees is not None:
+        compter('succes')
+        return pickle.loads(donnees)
+    compter('echecs')
+    resultat = await produire()
+    a_ranger = entree(resultat)
+    if a_ranger:
+        await stockage().aset(cle, *a_ranger)
+    return resultat
+
+
+class CacheReponseMixin:
+    """
+    Met en cache les données sérialisées des réponses GET 200 (list, retrieve).
+    Les sous-classes déclarent les générations dont dépendent leurs réponses.
+    """
+    generations_liste = []
+
+    def generations_detail(self, pk):
+        return [f'{self.queryset.model._meta.model_name}:{pk}']
+
+    def reponse_en_cache(self, request, noms, produire):
+        if request.method != 'GET':
+            return produire()
+        cle = cle_reponse(self.__class__.__name__, noms, request)
+        donnees = stockage().get(cle)
+        if donnees is not None:
+            compter('succes')
+            return Response(pickle.loads(donnees))
+        compter('echecs')
+        reponse = produire()
+        if reponse.status_code == 200:
+            a_ranger = entree(reponse.data)
+            if a_ranger:
+                stockage().set(cle, *a_ranger)
+        return reponse
+
+    def list(self, request, *args, **kwargs):
+        produire = super().list
+        return self.reponse_en_cache(request, self.generations_liste, lambda: produire(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        produire = super().retrieve
+        return self.reponse_en_cache(
+            request, self.generations_detail(kwargs['pk']), lambda: produire(request, *args, **kwargs)
+        )
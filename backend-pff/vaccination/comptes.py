@@ -0,0 +1,124 @@
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .models import Profile
+
+TAILLE_BATCH = 1000
+CHAMPS = ['username', 'email', 'password', 'role', 'first_name', 'last_name']
+ROLES = {code for code, _ in Profile.USER_ROLES}
+
+
+class ComptesInvalides(ValueError):
+    def __init__(self, erreurs):
+        super().__init__(f'{len(erreurs)} ligne(s) invalide(s)')
+        self.erreurs = erreurs
+
+
+class FichierInvalide(ValueError):
+    """Fichier illisible : JSON mal formé, autre chose qu'une liste d'objets, encodage."""
+
+
+def lire_comptes(chemin):
+    """Liste de dicts depuis un CSV (avec en-tête) ou un JSON (liste d'objets)."""
+    chemin = Path(chemin)
+    try:
+        with open(chemin, encoding='utf-8', newline='') as fichier:
+            if chemin.suffix.lower() == '.json':
+                lignes = json.load(fichier)
+            else:
+                lignes = list(csv.DictReader(fichier))
+    except json.JSONDecodeError as erreur:
+        raise FichierInvalide(f'JSON invalide : {erreur}')
+    except (UnicodeDecodeError, csv.Error) as erreur:
+        raise FichierInvalide(f'encodage ou CSV invalide : {erreur}')
+    if not isinstance(lignes, list) or not all(isinstance(ligne, dict) for ligne in lignes):
+        raise FichierInvalide("liste d'objets JSON attendue")
+    return [{champ: str(ligne.get(champ) or '').strip() for champ in CHAMPS} for ligne in lignes]
+
+
+def valider(comptes, role_defaut='parent'):
+    """Complète les rôles, vérifie noms et rôles ; lève ComptesInvalides avant toute écriture."""
+    erreurs = {}
+    vus = set()
+    for numero, compte in enumerate(comptes, start=1):
+        compte['role'] = compte['role'].lower() or role_defaut
+        if not compte['username']:
+            erreurs[numero] = 'username manquant'
+        elif compte['username'] in vus:
+            erreurs[numero] = f'username en double : {compte["username"]}'
+        elif compte['role'] not in ROLES:
+            erreurs[numero] = f'rôle inconnu : {compte["role"]}'
+        vus.add(compte['username'])
+    if erreurs:
+        raise ComptesInvalides(erreurs)
+    return comptes
+
+
+def ids_par_nom(noms):
+    """{username: id} des noms existants, par tranches pour rester sous la limite de paramètres SQL."""
+    ids = {}
+    for i in range(0, len(noms), TAILLE_BATCH):
+        ids.update(User.objects.filter(username__in=noms[i:i + TAILLE_BATCH]).values_list('username', 'id'))
+    return ids
+
+
+def exclure_existants(comptes):
+    """Retire les comptes dont le nom est déjà pris (inutile de hacher leur mot de passe)."""
+    existants = ids_par_nom([c['username'] for c in comptes])
+    return [c for c in comptes if c['username'] not in existants], len(existants)
+
+
+def initialiser_processus():
+    """Initialiseur des processus de travail (démarrage par spawn comme par fork)."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend_api.settings')
+    django.setup()
+
+
+def _hacher(mot_de_passe):
+    # Sans mot de passe, le compte ne peut pas se connecter tant qu'il n'en a pas reçu un
+    return make_password(mot_de_passe or None)
+
+
+def hacher(mots_de_passe, processus=None):
+    """
+    Hache les mots de passe en parallèle : chaque hachage PBKDF2 coûte plusieurs centaines
+    de millisecondes, c'est l'essentiel du temps d'un import. `processus=1` reste en local.
+    """
+    if processus == 1 or len(mots_de_passe) < 2:
+        return [_hacher(mot) for mot in mots_de_passe]
+    with ProcessPoolExecutor(max_workers=processus, initializer=initialiser_processus) as executeur:
+        taille = max(1, len(mots_de_passe) // ((processus or os.cpu_count() or 1) * 4))
+        return list(executeur.map(_hacher, mots_de_passe, chunksize=taille))
+
+
+def creer_comptes(comptes, hachages, taille_batch=TAILLE_BATCH):
+    """
+    Crée utilisateurs et profils par bulk_create : les signaux de User (création puis
+    ré-enregistrement du profil) sont contournés, chaque profil est écrit une seule fois.
+    Les noms pris entre-temps sont ignorés. Renvoie (créés, ignorés).
+    """
+    with transaction.atomic():
+        libres, ignores = exclure_existants(comptes)
+        libres = {c['username'] for c in libres}
+        nouveaux = [(c, h) for c, h in zip(comptes, hachages) if c['username'] in libres]
+        users = User.objects.bulk_create([
+            User(username=c['username'], email=c['email'], password=h,
+                 first_name=c['first_name'], last_name=c['last_name'])
+            for c, h in nouveaux
+        ], batch_size=taille_batch)
+        if any(user.pk is None for user in users):
+            ids = ids_par_nom([user.username for user in users])
+            for user in users:
+                user.pk = ids[user.username]
+        Profile.objects.bulk_create([
+            Profile(user_id=user.pk, role=c['role']) for user, (c, _) in zip(users, nouveaux)
+        ], batch_size=taille_batch)
+    return len(users), ignores
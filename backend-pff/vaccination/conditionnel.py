@@ -0,0 +1,139 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .models import Compteur, Enfant, version_table
+
+
+def _requete_versions(modeles):
+    noms = [version_table(modele) for modele in modeles]
+    return noms, Compteur.objects.filter(nom__in=noms).values_list('nom', 'valeur', 'modifie_le')
+
+
+def _cle_versions(noms, lignes):
+    lignes = {nom: (valeur, date) for nom, valeur, date in lignes}
+    valeurs = [lignes.get(nom, (0, None)) for nom in noms]
+    dates = [date for _, date in valeurs if date]
+    return '-'.join(str(valeur) for valeur, _ in valeurs), max(dates) if dates else None
+
+
+def versions_tables(*modeles):
+    """
+    (clé de version, date de dernière modification) des tables données, en une requête
+    sur les compteurs tenus à jour à chaque écriture : rien n'est lu dans les tables elles-mêmes.
+    """
+    noms, requete = _requete_versions(modeles)
+    return _cle_versions(noms, requete)
+
+
+async def aversions_tables(*modeles):
+    noms, requete = _requete_versions(modeles)
+    return _cle_versions(noms, [ligne async for ligne in requete])
+
+
+def _requete_objet(modele, pk):
+    return modele.objects.filter(pk=pk).values_list('revision', 'updated_at')
+
+
+def _version_objet(ligne):
+    if ligne is None:
+        return None
+    return str(ligne[0]), ligne[1]
+
+
+def version_objet(modele, pk):
+    return _version_objet(_requete_objet(modele, pk).first())
+
+
+async def aversion_objet(modele, pk):
+    return _version_objet(await _requete_objet(modele, pk).afirst())
+
+
+def _requete_enfant(pk):
+    return (
+        Enfant.objects.filter(pk=pk)
+        .annotate(vaccins_revision=Max('vaccins__revision'), vaccins_date=Max('vaccins__updated_at'),
+                  vaccins_nombre=Count('vaccins'))
+        .values_list('revision', 'updated_at', 'village__revision', 'village__updated_at',
+                     'vaccins_revision', 'vaccins_date', 'vaccins_nombre',
+                     'doses_manquantes', 'prochaine_echeance')
+    )
+
+
+def _version_enfant(ligne):
+    if ligne is None:
+        return None
+    revision, date, village_revision, village_date, vaccins_revision, vaccins_date, nombre, *couverture = ligne
+    cle = '-'.join(str(valeur) for valeur in [revision, village_revision, vaccins_revision or 0, nombre, *couverture])
+    return cle, max(d for d in (date, village_date, vaccins_date) if d)
+
+
+def version_enfant(pk):
+    """
+    Version de la fiche d'un enfant : sa ligne, son village, ses vaccins et sa couverture
+    (recalculée sans nouvelle révision), en une requête.
+    """
+    return _version_enfant(_requete_enfant(pk).first())
+
+
+async def aversion_enfant(pk):
+    return _version_enfant(await _requete_enfant(pk).afirst())
+
+
+def condition(request, validateurs, media_type=''):
+    """
+    (ETag, Last-Modified, réponse) pour des validateurs (clé, date) : la réponse est un 304
+    (ou 412) si le client est à jour, None s'il faut produire la réponse complète.
+    """
+    cle, date = validateurs
+    empreinte = hashlib.sha1(f'{cle}|{request.get_full_path()}|{media_type}'.encode()).hexdigest()
+    etag = quote_etag(empreinte)
+    last_modified = int(date.timestamp()) if date else None
+    return etag, last_modified, get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+def poser_validateurs(reponse, etag, last_modified):
+    if reponse.status_code in (200, 304):
+        reponse['ETag'] = etag
+        if last_modified is not None:
+            reponse['Last-Modified'] = http_date(last_modified)
+    return reponse
+
+
+class ConditionnelMixin:
+    """
+    GET conditionnels (If-None-Match / If-Modified-Since) : les validateurs sont calculés
+    à partir des compteurs de version avant toute sérialisation, et un client à jour
+    reçoit un 304 sans corps.
+    """
+    # Tables dont dépend le contenu des listes de la vue
+    tables_versionnees = []
+
+    def validateurs_liste(self, request, *args, **kwargs):
+        return versions_tables(*self.tables_versionnees)
+
+    def validateurs_detail(self, request, *args, **kwargs):
+        return version_objet(self.queryset.model, kwargs[self.lookup_url_kwarg or self.lookup_field])
+
+    def repondre_si_modifie(self, request, validateurs, produire):
+        """`validateurs` : (clé, date) ou None ; `produire` construit la réponse complète."""
+        if validateurs is None:
+            return produire()
+        # Version lue en base, reprise dans la clé du cache de réponses (cache.cle_reponse)
+        request.version_donnees = validateurs[0]
+        etag, last_modified, reponse = condition(request, validateurs, getattr(request, 'accepted_media_type', ''))
+        return poser_validateurs(reponse or produire(), etag, last_modified)
+
+    def list(self, request, *args, **kwargs):
+        produire = super().list
+        return self.repondre_si_modifie(
+            request, self.validateurs_liste(request, *args, **kwargs), lambda: produire(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        produire = super().retrieve
+        return self.repondre_si_modifie(
+            request, self.validateurs_detail(request, *args, **kwargs), lambda: produire(request, *args, **kwargs)
+        )
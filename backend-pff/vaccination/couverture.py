@@ -0,0 +1,63 @@
+from django.db.models import Count, F, FloatField, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, Least, Round
+
+from . import cache
+from .models import REVISION, VACCINS_RECOMMANDES, Compteur, Enfant, RendezVous, Vaccin, version_table
+
+# Génération de cache des réponses qui exposent la couverture de tous les enfants
+GENERATION = 'couverture'
+
+
+def taux(recus):
+    """Expression SQL du taux de couverture (en %, plafonné à 100) pour `recus` doses reçues."""
+    return Round(Least(Cast(recus, FloatField()) * 100.0 / VACCINS_RECOMMANDES, Value(100.0)), 2)
+
+
+def ajuster(enfant_id, **deltas):
+    """
+    Incrémente les compteurs de doses de l'enfant et son taux en un seul UPDATE, dans la
+    transaction de l'écriture du vaccin (mêmes deltas que statistiques.ajuster).
+    """
+    deltas = {champ: delta for champ, delta in deltas.items() if delta}
+    if enfant_id is None or not deltas:
+        return
+    valeurs = {champ: F(champ) + delta for champ, delta in deltas.items()}
+    if 'vaccins_recus' in valeurs:
+        # Dans un UPDATE, F() désigne l'ancienne valeur de la colonne
+        valeurs['taux_couverture'] = taux(valeurs['vaccins_recus'])
+    Enfant.objects.filter(pk=enfant_id).update(**valeurs)
+
+
+def _nombre(requete):
+    return Coalesce(Subquery(requete.order_by().values('enfant').annotate(n=Count('*')).values('n')), 0)
+
+
+def recalculer(enfants=None):
+    """
+    Recalcule les colonnes de couverture de tous les enfants, ou de ceux d'identifiants
+    `enfants`, en deux UPDATE à sous-requêtes corrélées : doses reçues et en retard depuis
+    les vaccins, doses manquantes et prochaine échéance depuis les rendez-vous.
+    """
+    lignes = Enfant.objects.all() if enfants is None else Enfant.objects.filter(pk__in=enfants)
+    vaccins = Vaccin.objects.filter(enfant=OuterRef('pk'))
+    rendez_vous = RendezVous.objects.filter(enfant=OuterRef('pk'))
+    nombre = lignes.update(
+        vaccins_recus=_nombre(vaccins.filter(statut='recu')),
+        vaccins_retard=_nombre(vaccins.filter(statut='retard')),
+        doses_manquantes=_nombre(rendez_vous),
+        prochaine_echeance=Subquery(rendez_vous.filter(prochaine=True).values('date_prevue')[:1]),
+    )
+    lignes.update(taux_couverture=taux(F('vaccins_recus')))
+    return nombre
+
+
+def publier(enfants=None):
+    """
+    Après un recalcul : nouvelle version de la table des enfants (ETag des listes) et
+    invalidation des réponses en cache, toutes ou celles des enfants donnés.
+    """
+    Compteur.marquer(version_table(Enfant), Compteur.incrementer(REVISION))
+    if enfants is None:
+        cache.invalider(version_table(Enfant), GENERATION)
+    else:
+        cache.invalider(version_table(Enfant), *(f'enfant:{pk}' for pk in enfants))
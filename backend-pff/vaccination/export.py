@@ -0,0 +1,114 @@
+import csv
+import io
+import json
+import zlib
+from itertools import groupby
+from operator import itemgetter
+
+from .filters import filtre_intervalle, filtre_village
+from .models import Enfant
+
+COLONNES = [
+    'enfant_id', 'nom', 'sexe', 'date_naissance', 'village_id', 'village',
+    'vaccin_id', 'vaccin', 'date_administration', 'statut', 'notes',
+]
+CHAMPS = [
+    'id', 'nom', 'sexe', 'date_naissance', 'village_id', 'village__nom',
+    'vaccins__id', 'vaccins__nom', 'vaccins__date_administration', 'vaccins__statut', 'vaccins__notes',
+]
+# Paramètres de filtre acceptés par `filtres`
+PARAMETRES = [
+    'village', 'date_naissance_min', 'date_naissance_max', 'date_administration_min', 'date_administration_max',
+]
+TYPES = {'csv': 'text/csv; charset=utf-8', 'ndjson': 'application/x-ndjson'}
+
+# Lignes lues par aller-retour en base, et taille des blocs envoyés au client
+TAILLE_LOT = 2000
+TAILLE_BLOC = 64 * 1024
+
+
+def filtres(params):
+    """
+    Filtres de l'export : village (id ou nom), date_naissance_min/max et
+    date_administration_min/max (seules les doses de l'intervalle sont exportées).
+    """
+    resultat = {**filtre_village(params), **filtre_intervalle(params, 'date_naissance')}
+    for cle, valeur in filtre_intervalle(params, 'date_administration').items():
+        resultat[f'vaccins__{cle}'] = valeur
+    return resultat
+
+
+def lignes(filtres, using=None):
+    """
+    Une ligne par dose (une seule, sans dose, pour un enfant jamais vacciné), triées par enfant.
+    Village et vaccins sont joints dans l'unique requête, lue par lots de TAILLE_LOT lignes.
+    """
+    queryset = Enfant.objects.filter(**filtres).order_by('id', 'vaccins__date_administration', 'vaccins__id')
+    if using:
+        queryset = queryset.using(using)
+    return queryset.values_list(*CHAMPS).iterator(chunk_size=TAILLE_LOT)
+
+
+def par_blocs(textes):
+    """Regroupe les textes produits en blocs d'environ TAILLE_BLOC octets."""
+    tampon, taille = [], 0
+    for texte in textes:
+        tampon.append(texte)
+        taille += len(texte)
+        if taille >= TAILLE_BLOC:
+            yield ''.join(tampon).encode()
+            tampon, taille = [], 0
+    if tampon:
+        yield ''.join(tampon).encode()
+
+
+def textes_csv(lignes):
+    tampon = io.StringIO()
+    ecrivain = csv.writer(tampon)
+    ecrivain.writerow(COLONNES)
+    for ligne in lignes:
+        ecrivain.writerow(ligne)
+        yield tampon.getvalue()
+        tampon.seek(0)
+        tampon.truncate()
+    yield tampon.getvalue()
+
+
+def date_iso(valeur):
+    return valeur.isoformat() if valeur else None
+
+
+def textes_ndjson(lignes):
+    """Un objet JSON par enfant et par ligne, avec l'historique de ses vaccins."""
+    for _, doses in groupby(lignes, key=itemgetter(0)):
+        doses = list(doses)
+        enfant_id, nom, sexe, naissance, village_id, village = doses[0][:6]
+        objet = {
+            'id': enfant_id,
+            'nom': nom,
+            'sexe': sexe,
+            'date_naissance': date_iso(naissance),
+            'village': {'id': village_id, 'nom': village},
+            'vaccins': [
+                {'id': dose[6], 'nom': dose[7], 'date_administration': date_iso(dose[8]),
+                 'statut': dose[9], 'notes': dose[10]}
+                for dose in doses if dose[6] is not None
+            ],
+        }
+        yield json.dumps(objet, ensure_ascii=False) + '\n'
+
+
+def exporter(extension, filtres, using=None):
+    """Blocs d'octets de l'export au format `extension` ('csv' ou 'ndjson')."""
+    textes = textes_csv if extension == 'csv' else textes_ndjson
+    return par_blocs(textes(lignes(filtres, using)))
+
+
+def compresser(blocs):
+    """Compression gzip au fil de l'eau."""
+    compresseur = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for bloc in blocs:
+        donnees = compresseur.compress(bloc)
+        if donnees:
+            yield donnees
+    yield compresseur.flush()
@@ -0,0 +1,162 @@
+from django.db.models import Exists, OuterRef, Q
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Vaccin
+from .rendez_vous import STATUTS as STATUTS_RENDEZ_VOUS, filtre_statut
+
+STATUTS_VACCIN = {code for code, _ in Vaccin.STATUT_CHOICES}
+# Statut vaccinal d'un enfant envoyé par l'application mobile, d'après son taux de couverture
+STATUTS_COUVERTURE = {
+    'complet': Q(taux_couverture__gte=100),
+    'partiel': Q(taux_couverture__gt=0, taux_couverture__lt=100),
+    'non_vacciné': Q(taux_couverture=0),
+}
+
+
+def parametre_date(params, nom):
+    valeur = params.get(nom)
+    if not valeur:
+        return None
+    try:
+        resultat = parse_date(valeur)
+    except ValueError:
+        resultat = None
+    if resultat is None:
+        raise ValidationError({nom: 'Date invalide, format attendu AAAA-MM-JJ.'})
+    return resultat
+
+
+def parametre_taux(params, nom):
+    valeur = params.get(nom)
+    if not valeur:
+        return None
+    try:
+        resultat = float(valeur)
+    except ValueError:
+        resultat = None
+    if resultat is None or not 0 <= resultat <= 100:
+        raise ValidationError({nom: 'Taux invalide, nombre attendu entre 0 et 100.'})
+    return resultat
+
+
+def parametre_statut(params, nom='statut', autres=()):
+    """Statut de vaccin, ou l'une des valeurs `autres` également admises."""
+    valeur = params.get(nom)
+    if not valeur:
+        return None
+    if valeur not in STATUTS_VACCIN and valeur not in autres:
+        possibles = ', '.join([*sorted(STATUTS_VACCIN), *autres])
+        raise ValidationError({nom: f'Statut inconnu, valeurs possibles : {possibles}.'})
+    return valeur
+
+
+def filtre_village(params, prefixe=''):
+    """`?village=` accepte l'identifiant ou le nom exact du village."""
+    valeur = params.get('village')
+    if not valeur:
+        return {}
+    if valeur.isdigit():
+        return {f'{prefixe}village_id': int(valeur)}
+    return {f'{prefixe}village__nom': valeur}
+
+
+def filtre_intervalle(params, champ):
+    filtres = {}
+    debut = parametre_date(params, f'{champ}_min')
+    fin = parametre_date(params, f'{champ}_max')
+    if debut:
+        filtres[f'{champ}__gte'] = debut
+    if fin:
+        filtres[f'{champ}__lte'] = fin
+    return filtres
+
+
+class EnfantFilter(BaseFilterBackend):
+    """
+    Filtres de /api/enfants/ : village (id ou nom), statut et nom de vaccin
+    (enfants ayant au moins un tel vaccin) ou statut vaccinal (complet, partiel,
+    non_vacciné : taux de couverture de 100, entre 0 et 100, nul), date_naissance_min/max,
+    couverture_min/max (taux en %), prochaine_echeance_min/max.
+    Chaque filtre s'appuie sur un index déclaré dans Meta.indexes.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        queryset = queryset.filter(
+            **filtre_village(params),
+            **filtre_intervalle(params, 'date_naissance'),
+            **filtre_intervalle(params, 'prochaine_echeance'),
+        )
+        couverture_min = parametre_taux(params, 'couverture_min')
+        couverture_max = parametre_taux(params, 'couverture_max')
+        if couverture_min is not None:
+            queryset = queryset.filter(taux_couverture__gte=couverture_min)
+        if couverture_max is not None:
+            queryset = queryset.filter(taux_couverture__lte=couverture_max)
+        vaccins = {}
+        statut = parametre_statut(params, autres=STATUTS_COUVERTURE)
+        if statut in STATUTS_COUVERTURE:
+            queryset = queryset.filter(STATUTS_COUVERTURE[statut])
+        elif statut:
+            vaccins['statut'] = statut
+        if params.get('vaccin'):
+            vaccins['nom'] = params['vaccin']
+        if vaccins:
+            # EXISTS corrélé plutôt qu'une jointure : pas de doublons ni de DISTINCT
+            queryset = queryset.filter(Exists(Vaccin.objects.filter(enfant=OuterRef('pk'), **vaccins)))
+        return queryset
+
+
+class RendezVousFilter(BaseFilterBackend):
+    """
+    Filtres de /api/rendez-vous/ : from et to (date prévue), village (id ou nom),
+    statut (a_venir, du, en_retard), prochaine=1 (première dose attendue de chaque enfant).
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        filtres = filtre_village(params)
+        debut = parametre_date(params, 'from')
+        fin = parametre_date(params, 'to')
+        if debut:
+            filtres['date_prevue__gte'] = debut
+        if fin:
+            filtres['date_prevue__lte'] = fin
+        if params.get('prochaine') in ('1', 'true'):
+            filtres['prochaine'] = True
+        queryset = queryset.filter(**filtres)
+        statut = params.get('statut')
+        if statut:
+            if statut not in STATUTS_RENDEZ_VOUS:
+                raise ValidationError(
+                    {'statut': f'Statut inconnu, valeurs possibles : {", ".join(STATUTS_RENDEZ_VOUS)}.'}
+                )
+            queryset = queryset.filter(filtre_statut(statut))
+        return queryset
+
+
+class VaccinFilter(BaseFilterBackend):
+    """
+    Filtres de /api/vaccins/ : enfant, village (id ou nom), statut, nom,
+    date_administration_min/max.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        filtres = {
+            **filtre_village(params, prefixe='enfant__'),
+            **filtre_intervalle(params, 'date_administration'),
+        }
+        enfant = params.get('enfant')
+        if enfant:
+            if not enfant.isdigit():
+                raise ValidationError({'enfant': 'Identifiant invalide.'})
+            filtres['enfant_id'] = int(enfant)
+        statut = parametre_statut(params)
+        if statut:
+            filtres['statut'] = statut
+        if params.get('nom'):
+            filtres['nom'] = params['nom']
+        return queryset.filter(**filtres)
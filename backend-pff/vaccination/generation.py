@@ -0,0 +1,100 @@
+import random
+from collections import Counter
+from datetime import timedelta
+
+from django.db import transaction
+
+from . import rendez_vous, statistiques
+from .lots import TAILLE_BATCH, reserver_revisions, completer_ids
+from .models import Compteur, Village, Enfant, Vaccin, version_table
+from .verrous import reessayer_si_verrouillee
+
+NOMS_VILLAGES = ['Thiès', 'Mbour', 'Joal', 'Ngaparou', 'Popenguine', 'Fatick', 'Kaolack', 'Louga', 'Kolda', 'Matam']
+PRENOMS = ['Fatou', 'Moussa', 'Aissatou', 'Ibrahima', 'Mariama', 'Ousmane', 'Aminata', 'Mamadou', 'Fatima', 'Abdou']
+NOMS = ['Diop', 'Ndiaye', 'Fall', 'Sow', 'Ba', 'Sarr', 'Faye', 'Gueye', 'Diallo', 'Mbaye']
+
+# Enfants nés sur les cinq dernières années, cohortes récentes un peu plus nombreuses
+AGE_MAX_JOURS = 5 * 365
+
+
+def cle_enfant(graine, index, numero):
+    return f'gen-{graine}-{index}-{numero}'
+
+
+def generer_village(index, graine, enfants_par_village, reference, calendrier=None):
+    """
+    Contenu du village `index` : (nom, [(enfant, [vaccins])]). Chaque village a son propre
+    générateur, dérivé de la graine : le résultat ne dépend ni de l'ordre ni du nombre de processus.
+    Les doses suivent `calendrier` (rendez_vous.calendrier(), lu en base par défaut).
+    """
+    if calendrier is None:
+        calendrier = rendez_vous.calendrier()
+    rng = random.Random(f'{graine}:{index}')
+    nom = f'{NOMS_VILLAGES[index % len(NOMS_VILLAGES)]} {index // len(NOMS_VILLAGES) + 1}'
+    nombre = max(1, round(rng.gauss(enfants_par_village, enfants_par_village / 4)))
+    enfants = []
+    for numero in range(nombre):
+        naissance = reference - timedelta(days=int(AGE_MAX_JOURS * rng.random() ** 1.2))
+        # Assiduité propre à chaque famille : la plupart des enfants suivent le calendrier
+        assiduite = rng.betavariate(8, 2)
+        vaccins = []
+        for vaccin, _, decalage, _ in calendrier:
+            prevue = naissance + decalage
+            if prevue > reference:
+                break
+            if rng.random() < assiduite:
+                # Reçu, le plus souvent dans les jours qui suivent l'échéance
+                administre = min(prevue + timedelta(days=int(rng.expovariate(1 / 7))), reference)
+                vaccins.append({'nom': vaccin, 'date_administration': administre, 'statut': 'recu',
+                                'notes': 'Administré sans problème'})
+            elif rng.random() < 0.5:
+                # Rattrapage tardif
+                administre = min(prevue + timedelta(days=rng.randint(30, 180)), reference)
+                vaccins.append({'nom': vaccin, 'date_administration': administre, 'statut': 'recu',
+                                'notes': 'Dose de rattrapage'})
+            else:
+                vaccins.append({'nom': vaccin, 'date_administration': prevue, 'statut': 'retard',
+                                'notes': 'Retard dû à absence'})
+        enfants.append(({
+            'cle_client': cle_enfant(graine, index, numero),
+            'nom': f'{rng.choice(PRENOMS)} {rng.choice(NOMS)}',
+            'sexe': rng.choice('MF'),
+            'date_naissance': naissance,
+        }, vaccins))
+    return nom, enfants
+
+
+def ecrire_village(index, graine, enfants_par_village, reference, taille_batch=TAILLE_BATCH, calendrier=None):
+    """
+    Génère et écrit un village en une transaction (bulk_create par lots, révisions réservées
+    d'un bloc, statistiques ajustées d'un coup). Un village déjà écrit avec la même graine
+    est sauté : relancer la commande reprend là où elle s'était arrêtée.
+    Renvoie (enfants, vaccins) écrits.
+    """
+    if Enfant.objects.filter(cle_client=cle_enfant(graine, index, 0)).exists():
+        return 0, 0
+    nom, enfants = generer_village(index, graine, enfants_par_village, reference, calendrier)
+    with transaction.atomic():
+        village = Village.objects.create(nom=nom)
+        revisions = reserver_revisions(len(enfants) + sum(len(vaccins) for _, vaccins in enfants))
+        objets = Enfant.objects.bulk_create(
+            [Enfant(village=village, revision=next(revisions), **enfant) for enfant, _ in enfants],
+            batch_size=taille_batch,
+        )
+        completer_ids(Enfant, objets)
+        vaccins = Vaccin.objects.bulk_create([
+            Vaccin(enfant_id=objet.pk, revision=next(revisions), **vaccin)
+            for objet, (_, liste) in zip(objets, enfants) for vaccin in liste
+        ], batch_size=taille_batch)
+        Compteur.marquer(version_table(Enfant), objets[-1].revision)
+        if vaccins:
+            Compteur.marquer(version_table(Vaccin), vaccins[-1].revision)
+        compte = Counter(statistiques.COMPTEURS_STATUT.get(vaccin.statut) for vaccin in vaccins)
+        compte.pop(None, None)
+        statistiques.ajuster(village.id, nombre_enfants=len(objets), **compte)
+    return len(objets), len(vaccins)
+
+
+def ecrire_village_avec_reprise(arguments):
+    """Variante pour les processus de travail : SQLite n'admet qu'un écrivain à la fois."""
+    return reessayer_si_verrouillee(ecrire_village, tentatives=5, delai=0.2)(*arguments)
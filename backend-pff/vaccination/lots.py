@@ -0,0 +1,112 @@
+from collections import Counter
+
+from django.db import transaction
+
+from . import cache, rendez_vous, statistiques
+from .models import REVISION, Compteur, Enfant, Vaccin, version_table
+
+TAILLE_BATCH = 500
+
+
+def reserver_revisions(nombre):
+    """Itérateur sur un bloc de `nombre` révisions consécutives (dans la transaction en cours)."""
+    if not nombre:
+        return iter(())
+    fin = Compteur.incrementer(REVISION, nombre)
+    return iter(range(fin - nombre + 1, fin + 1))
+
+
+def completer_ids(modele, objets):
+    """Relit les identifiants si la base ne les renvoie pas lors d'un bulk_create."""
+    if all(objet.pk is not None for objet in objets):
+        return
+    ids = dict(modele.objects.filter(cle_client__in=[o.cle_client for o in objets]).values_list('cle_client', 'id'))
+    for objet in objets:
+        objet.pk = ids[objet.cle_client]
+
+
+def enregistrer_lot(enfants):
+    """
+    Écrit un lot validé (EnfantLotSerializer(many=True)) en une transaction :
+    quelques requêtes par lot au lieu de plusieurs par ligne. Les lignes dont la clé
+    existe déjà ne sont pas recréées, ce qui rend le renvoi d'un lot sans effet.
+    Renvoie un résultat par enfant, dans l'ordre du lot.
+    """
+    cles_enfants = [e['cle'] for e in enfants]
+    cles_vaccins = [v['cle'] for e in enfants for v in e.get('vaccins', [])]
+
+    with transaction.atomic():
+        existants = {
+            ligne['cle_client']: ligne
+            for ligne in Enfant.objects.filter(cle_client__in=cles_enfants).values('cle_client', 'id', 'village_id')
+        }
+        vaccins_existants = dict(
+            Vaccin.objects.filter(cle_client__in=cles_vaccins).values_list('cle_client', 'id')
+        )
+
+        nouveaux = [e for e in enfants if e['cle'] not in existants]
+        nouveaux_vaccins = [
+            (e, v) for e in enfants for v in e.get('vaccins', []) if v['cle'] not in vaccins_existants
+        ]
+        revisions = reserver_revisions(len(nouveaux) + len(nouveaux_vaccins))
+
+        crees = Enfant.objects.bulk_create([
+            Enfant(
+                cle_client=e['cle'], nom=e['nom'], sexe=e['sexe'], village_id=e['village_id'],
+                date_naissance=e['date_naissance'], revision=next(revisions),
+            )
+            for e in nouveaux
+        ], batch_size=TAILLE_BATCH)
+        completer_ids(Enfant, crees)
+        for enfant in crees:
+            existants[enfant.cle_client] = {'id': enfant.pk, 'village_id': enfant.village_id}
+
+        vaccins = Vaccin.objects.bulk_create([
+            Vaccin(
+                cle_client=v['cle'], enfant_id=existants[e['cle']]['id'], nom=v['nom'],
+                date_administration=v['date_administration'], statut=v['statut'],
+                notes=v.get('notes'), revision=next(revisions),
+            )
+            for e, v in nouveaux_vaccins
+        ], batch_size=TAILLE_BATCH)
+        completer_ids(Vaccin, vaccins)
+        ids_vaccins = {v.cle_client: v.pk for v in vaccins}
+        if crees:
+            Compteur.marquer(version_table(Enfant), crees[-1].revision)
+        if vaccins:
+            Compteur.marquer(version_table(Vaccin), vaccins[-1].revision)
+
+        # bulk_create ne déclenche pas les signaux : statistiques ajustées par village
+        deltas = {}
+        for enfant in crees:
+            deltas.setdefault(enfant.village_id, Counter())['nombre_enfants'] += 1
+        for e, v in nouveaux_vaccins:
+            champ = statistiques.COMPTEURS_STATUT.get(v['statut'])
+            if champ:
+                deltas.setdefault(existants[e['cle']]['village_id'], Counter())[champ] += 1
+        for village_id, compte in deltas.items():
+            statistiques.ajuster(village_id, **compte)
+
+        # Ni les signaux du cache : seules les fiches des enfants existants ayant reçu
+        # un vaccin sont invalidées, les nouveaux n'ont encore aucune réponse en cache
+        ids_enfants = {existants[e['cle']]['id'] for e, _ in nouveaux_vaccins} - {enfant.pk for enfant in crees}
+        if crees or vaccins:
+            cache.invalider(version_table(Enfant), version_table(Vaccin), *(f'enfant:{i}' for i in ids_enfants))
+        rendez_vous.recalculer_apres_commit(*ids_enfants, *(enfant.pk for enfant in crees))
+
+    ids_crees = {enfant.cle_client for enfant in crees}
+    resultats = []
+    for e in enfants:
+        resultat_vaccins = []
+        for v in e.get('vaccins', []):
+            if v['cle'] in ids_vaccins:
+                resultat_vaccins.append({'cle': v['cle'], 'id': ids_vaccins[v['cle']], 'statut': 'cree'})
+            else:
+                resultat_vaccins.append({'cle': v['cle'], 'id': vaccins_existants.get(v['cle']), 'statut': 'existant'})
+        resultats.append({
+            'cle': e['cle'],
+            'id': existants[e['cle']]['id'],
+            'statut': 'cree' if e['cle'] in ids_crees else 'existant',
+            'vaccins': resultat_vaccins,
+        })
+    return resultats
@@ -0,0 +1,138 @@
+import importlib.util
+import json
+import platform
+from contextlib import nullcontext
+from datetime import date
+from io import StringIO
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from vaccination.benchmark import ClientASGI, ClientDjango, ClientHTTP, comparer, echantillon, mesurer_routes
+from vaccination.models import Village, Enfant, Vaccin
+
+# Date fixe : une base conservée (--garder-base) est regénérée à l'identique
+DATE_REFERENCE = date(2025, 6, 1)
+IDENTIFIANTS = {'username': 'benchmark', 'password': 'benchmark-motdepasse'}
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure chaque route de l'API (latences p50/p95/p99, requêtes SQL, lignes lues, octets) "
+        "sur un jeu de données généré dans une base de test, via le client Django, un serveur WSGI local "
+        "et uvicorn (vues asynchrones, si uvicorn est installé)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--villages', type=int, default=20)
+        parser.add_argument('--enfants-par-village', type=int, default=100)
+        parser.add_argument('--graine', type=int, default=42)
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--mode', choices=['client', 'serveur', 'asgi', 'tous'], default='tous')
+        parser.add_argument('--sans-cache', action='store_true', help='Désactive le cache des réponses.')
+        parser.add_argument('--garder-base', action='store_true',
+                            help='Conserve la base de benchmark entre deux exécutions.')
+        parser.add_argument('--sortie', help='Fichier JSON des résultats.')
+        parser.add_argument('--reference', help='Résultats JSON précédents : échoue en cas de régression.')
+        parser.add_argument('--tolerance', type=float, default=0.25, help='Hausse relative admise du p95.')
+        parser.add_argument('--marge-ms', type=float, default=1.0, help='Hausse absolue admise du p95.')
+
+    def handle(self, *args, **options):
+        reference = None
+        if options['reference']:
+            with open(options['reference'], encoding='utf-8') as fichier:
+                reference = json.load(fichier)
+
+        connexion = connections['default']
+        if connexion.vendor == 'sqlite':
+            # Fichier plutôt que mémoire : le thread du serveur WSGI ouvre sa propre connexion
+            connexion.settings_dict['TEST']['NAME'] = str(settings.BASE_DIR / 'benchmark.sqlite3')
+        nom_initial = connexion.settings_dict['NAME']
+        connexion.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['garder_base'])
+        try:
+            resultats = self.executer(options)
+        finally:
+            connexion.creation.destroy_test_db(nom_initial, verbosity=0, keepdb=options['garder_base'])
+
+        self.afficher(resultats)
+        if options['sortie']:
+            with open(options['sortie'], 'w', encoding='utf-8') as fichier:
+                json.dump(resultats, fichier, indent=2, ensure_ascii=False)
+        if reference is not None:
+            regressions = comparer(reference, resultats, options['tolerance'], options['marge_ms'])
+            for regression in regressions:
+                self.stderr.write(regression)
+            if regressions:
+                raise CommandError(f'{len(regressions)} régression(s) par rapport à {options["reference"]}.')
+            self.stdout.write(self.style.SUCCESS('Aucune régression.'))
+
+    def executer(self, options):
+        call_command(
+            'generer_donnees', villages=options['villages'], enfants_par_village=options['enfants_par_village'],
+            graine=options['graine'], date_reference=DATE_REFERENCE, stdout=StringIO(),
+        )
+        if not User.objects.filter(username=IDENTIFIANTS['username']).exists():
+            User.objects.create_user(**IDENTIFIANTS)
+        # Administrateur : la création de tâches lui est réservée
+        User.objects.filter(username=IDENTIFIANTS['username']).update(is_staff=True)
+        ids = echantillon(options['graine'])
+        modes = self.modes(options['mode'])
+        clients = {'client': lambda: ClientDjango(SERVER_NAME='localhost'), 'serveur': ClientHTTP, 'asgi': ClientASGI}
+        sans_cache = override_settings(CACHES={
+            **settings.CACHES, 'vaccination': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+        })
+
+        mesures = {}
+        with sans_cache if options['sans_cache'] else nullcontext():
+            for mode in modes:
+                client = clients[mode]()
+                try:
+                    mesures[mode] = mesurer_routes(client, ids, options['iterations'], IDENTIFIANTS)
+                finally:
+                    client.fermer()
+        return {
+            'meta': {
+                'date': timezone.now().isoformat(),
+                'villages': Village.objects.count(),
+                'enfants': Enfant.objects.count(),
+                'vaccins': Vaccin.objects.count(),
+                'iterations': options['iterations'],
+                'cache': not options['sans_cache'],
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'base': connections['default'].vendor,
+            },
+            'resultats': mesures,
+        }
+
+    def modes(self, mode):
+        uvicorn = importlib.util.find_spec('uvicorn') is not None
+        if mode == 'asgi' and not uvicorn:
+            raise CommandError('Le mode asgi demande uvicorn (pip install uvicorn).')
+        if mode != 'tous':
+            return [mode]
+        if not uvicorn:
+            self.stderr.write('uvicorn absent : mode asgi ignoré.')
+        return ['client', 'serveur', 'asgi'] if uvicorn else ['client', 'serveur']
+
+    def afficher(self, resultats):
+        meta = resultats['meta']
+        self.stdout.write(
+            f'{meta["villages"]} villages, {meta["enfants"]} enfants, {meta["vaccins"]} vaccins, '
+            f'cache {"actif" if meta["cache"] else "désactivé"}'
+        )
+        self.stdout.write(
+            f'{"route":<34} {"p50":>8} {"p95":>8} {"p99":>8} {"SQL":>6} {"lignes":>8} {"octets":>9}'
+        )
+        for mode, routes in resultats['resultats'].items():
+            for nom, m in routes.items():
+                self.stdout.write(
+                    f'{mode + "/" + nom:<34} {m["p50_ms"]:>8.2f} {m["p95_ms"]:>8.2f} {m["p99_ms"]:>8.2f} '
+                    f'{m["requetes_sql"]:>6.1f} {m["lignes_lues"]:>8.1f} {m["octets"]:>9}'
+                )
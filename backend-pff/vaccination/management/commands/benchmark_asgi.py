@@ -0,0 +1,150 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO, StringIO
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.test.utils import override_settings
+
+from vaccination.models import Village, Enfant
+
+# Routes lues par chaque client, à tour de rôle
+ROUTES = ['/api/enfants/?page_size=20', '/api/enfants/{enfant}/', '/api/villages/', '/api/statistiques/']
+
+
+class Command(BaseCommand):
+    help = (
+        "Débit des lectures de l'API sous N clients concurrents lents (réseau mobile simulé) : "
+        "application ASGI avec vues asynchrones, pilotée par une boucle asyncio comme sous uvicorn, "
+        "contre l'application WSGI servie par un nombre fixe de threads."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, nargs='+', default=[100, 500, 1000])
+        parser.add_argument('--requetes-par-client', type=int, default=1,
+                            help='Requêtes de chaque client, toutes arrivées au départ de la mesure.')
+        parser.add_argument('--latence', type=float, default=1.0,
+                            help='Secondes de réseau par requête (moitié à la réception, moitié à l\'envoi).')
+        parser.add_argument('--threads-wsgi', type=int, default=32,
+                            help='Threads du serveur WSGI (workers x threads d\'un gunicorn, par exemple).')
+        parser.add_argument('--villages', type=int, default=10)
+        parser.add_argument('--enfants-par-village', type=int, default=50)
+
+    def handle(self, *args, **options):
+        connexion = connections['default']
+        if connexion.vendor == 'sqlite':
+            # Fichier plutôt que mémoire : chaque thread ouvre sa propre connexion
+            connexion.settings_dict['TEST']['NAME'] = str(settings.BASE_DIR / 'benchmark.sqlite3')
+        nom_initial = connexion.settings_dict['NAME']
+        connexion.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            call_command('generer_donnees', villages=options['villages'],
+                         enfants_par_village=options['enfants_par_village'], stdout=StringIO())
+            enfants = list(Enfant.objects.values_list('id', flat=True)[:50])
+            chemins = [route.format(enfant=enfants[i % len(enfants)]) for i, route in enumerate(ROUTES * 25)]
+            self.stdout.write(
+                f'{Village.objects.count()} villages, {Enfant.objects.count()} enfants, '
+                f'latence {options["latence"] * 1000:.0f} ms, {options["threads_wsgi"]} threads WSGI'
+            )
+            self.stdout.write(f'{"serveur":<8} {"clients":>8} {"requêtes/s":>11} {"p50 (ms)":>9} {"p95 (ms)":>9}')
+            # Cache des réponses désactivé (chaque requête lit la base), requêtes lentes non journalisées
+            with override_settings(CACHES={
+                **settings.CACHES, 'vaccination': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+            }, METRIQUES_SEUIL_LENT=float('inf')):
+                for clients in options['clients']:
+                    for serveur, mesurer in [('wsgi', self.mesurer_wsgi), ('asgi', self.mesurer_asgi)]:
+                        durees, total = mesurer(clients, chemins, options)
+                        self.afficher(serveur, clients, durees, total)
+        finally:
+            connections.close_all()
+            connexion.creation.destroy_test_db(nom_initial, verbosity=0)
+
+    def afficher(self, serveur, clients, durees, total):
+        durees.sort()
+        self.stdout.write(
+            f'{serveur:<8} {clients:>8} {len(durees) / total:>11.1f} {statistics.median(durees) * 1000:>9.0f} '
+            f'{durees[int(len(durees) * 0.95) - 1] * 1000:>9.0f}'
+        )
+
+    def demandes(self, clients, chemins, options):
+        return [chemins[i % len(chemins)] for i in range(clients * options['requetes_par_client'])]
+
+    def mesurer_wsgi(self, clients, chemins, options):
+        """Chaque requête occupe un thread du serveur pendant son traitement et les échanges réseau."""
+        application = get_wsgi_application()
+        demi_latence = options['latence'] / 2
+        debut = time.perf_counter()
+
+        def requete(chemin):
+            time.sleep(demi_latence)
+            adresse = urlsplit(chemin)
+            statut = []
+            corps = b''.join(application({
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': adresse.path, 'QUERY_STRING': adresse.query,
+                'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+                'HTTP_ACCEPT': 'application/json', 'wsgi.input': BytesIO(), 'wsgi.url_scheme': 'http',
+                'wsgi.errors': StringIO(),
+            }, lambda etat, entetes: statut.append(etat)))
+            time.sleep(demi_latence)
+            if not statut[0].startswith('200') or not corps:
+                raise CommandError(f'{chemin} : {statut[0]}.')
+            connections.close_all()
+            # Attente d'un thread libre comprise : toutes les requêtes arrivent au départ
+            return time.perf_counter() - debut
+
+        with ThreadPoolExecutor(max_workers=options['threads_wsgi']) as serveur:
+            durees = list(serveur.map(requete, self.demandes(clients, chemins, options)))
+        return durees, time.perf_counter() - debut
+
+    def mesurer_asgi(self, clients, chemins, options):
+        """Les attentes réseau sont des await : seuls les accès à la base passent par des threads."""
+        with override_settings(ROOT_URLCONF='backend_api.urls_asgi'):
+            return asyncio.run(self.clients_asgi(get_asgi_application(), clients, chemins, options))
+
+    async def clients_asgi(self, application, clients, chemins, options):
+        demi_latence = options['latence'] / 2
+        debut = time.perf_counter()
+
+        async def requete(chemin):
+            adresse = urlsplit(chemin)
+            recue = False
+            deconnexion = asyncio.Event()
+            statut = []
+
+            async def recevoir():
+                nonlocal recue
+                if recue:
+                    # Django attend une éventuelle déconnexion du client pendant la réponse
+                    await deconnexion.wait()
+                    return {'type': 'http.disconnect'}
+                recue = True
+                await asyncio.sleep(demi_latence)
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def envoyer(message):
+                if message['type'] == 'http.response.start':
+                    statut.append(message['status'])
+                elif not message.get('more_body'):
+                    await asyncio.sleep(demi_latence)
+
+            await application({
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                'scheme': 'http', 'path': adresse.path, 'raw_path': adresse.path.encode(),
+                'query_string': adresse.query.encode(), 'root_path': '',
+                'headers': [(b'host', b'localhost'), (b'accept', b'application/json')],
+                'server': ('localhost', 80), 'client': ('127.0.0.1', 0),
+            }, recevoir, envoyer)
+            deconnexion.set()
+            if statut != [200]:
+                raise CommandError(f'{chemin} : statut {statut}.')
+            return time.perf_counter() - debut
+
+        durees = await asyncio.gather(*(requete(chemin) for chemin in self.demandes(clients, chemins, options)))
+        return list(durees), time.perf_counter() - debut
@@ -0,0 +1,134 @@
+import copy
+import os
+import random
+import threading
+import time
+from datetime import date
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connections
+
+from vaccination.benchmark import percentile
+from vaccination.models import Enfant, Vaccin
+from vaccination.verrous import base_verrouillee
+
+DATE_REFERENCE = date(2025, 6, 1)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare les profils SQLite (settings.PROFILS_SQLITE) sous charge concurrente : "
+        "N clients mêlant lectures et écritures pendant une durée fixe, sur une base de test générée."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=8)
+        parser.add_argument('--duree', type=float, default=10.0, help='Durée de chaque mesure (secondes).')
+        parser.add_argument('--ecritures', type=float, default=0.2, help='Part des opérations en écriture.')
+        parser.add_argument('--profils', default='simple,production')
+        parser.add_argument('--villages', type=int, default=10)
+        parser.add_argument('--enfants-par-village', type=int, default=50)
+        parser.add_argument('--graine', type=int, default=42)
+
+    def handle(self, *args, **options):
+        connexion = connections['default']
+        if connexion.vendor != 'sqlite':
+            raise CommandError('Ce benchmark ne concerne que SQLite.')
+        profils = options['profils'].split(',')
+        inconnus = set(profils) - set(settings.PROFILS_SQLITE)
+        if inconnus:
+            raise CommandError(f'Profils inconnus : {", ".join(sorted(inconnus))}.')
+
+        initial = copy.deepcopy(connexion.settings_dict)
+        fichier = str(settings.BASE_DIR / 'benchmark_concurrence.sqlite3')
+        self.stdout.write(
+            f'{"profil":<12} {"lect./s":>9} {"écr./s":>9} {"p50 lect.":>10} {"p95 lect.":>10} '
+            f'{"p50 écr.":>10} {"p95 écr.":>10} {"verrous":>8}'
+        )
+        for profil in profils:
+            # Les threads créent leurs connexions à partir de ce même dictionnaire
+            connexion.close()
+            connexion.settings_dict.clear()
+            connexion.settings_dict.update(copy.deepcopy(initial))
+            connexion.settings_dict.update(copy.deepcopy(settings.PROFILS_SQLITE[profil]))
+            connexion.settings_dict['TEST']['NAME'] = fichier
+            connexion.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                call_command(
+                    'generer_donnees', villages=options['villages'],
+                    enfants_par_village=options['enfants_par_village'], graine=options['graine'],
+                    date_reference=DATE_REFERENCE, stdout=StringIO(),
+                )
+                resultat = self.mesurer(options)
+            finally:
+                connexion.creation.destroy_test_db(initial['NAME'], verbosity=0)
+                for suffixe in ('-wal', '-shm'):
+                    if os.path.exists(fichier + suffixe):
+                        os.remove(fichier + suffixe)
+            self.afficher(profil, resultat)
+        connexion.settings_dict.clear()
+        connexion.settings_dict.update(initial)
+
+    def mesurer(self, options):
+        ids = list(Enfant.objects.values_list('id', flat=True))
+        connections['default'].close()
+        lectures, ecritures, verrous = [], [], [0]
+        verrou = threading.Lock()
+        depart = threading.Barrier(options['clients'])
+
+        def client(numero):
+            rng = random.Random(f'{options["graine"]}:{numero}')
+            mes_lectures, mes_ecritures, mes_verrous = [], [], 0
+            depart.wait()
+            fin = time.perf_counter() + options['duree']
+            try:
+                while time.perf_counter() < fin:
+                    ecriture = rng.random() < options['ecritures']
+                    # Une opération = une requête HTTP : connexion rendue ou conservée selon CONN_MAX_AGE
+                    close_old_connections()
+                    debut = time.perf_counter()
+                    try:
+                        if ecriture:
+                            Vaccin(enfant_id=rng.choice(ids), nom='Polio', date_administration=DATE_REFERENCE,
+                                   statut=rng.choice(['recu', 'retard'])).save()
+                        else:
+                            enfant = Enfant.objects.select_related('village').get(pk=rng.choice(ids))
+                            list(enfant.vaccins.all())
+                    except OperationalError as erreur:
+                        if not base_verrouillee(erreur):
+                            raise
+                        mes_verrous += 1
+                        continue
+                    finally:
+                        close_old_connections()
+                    (mes_ecritures if ecriture else mes_lectures).append(time.perf_counter() - debut)
+            finally:
+                connections.close_all()
+            with verrou:
+                lectures.extend(mes_lectures)
+                ecritures.extend(mes_ecritures)
+                verrous[0] += mes_verrous
+
+        threads = [threading.Thread(target=client, args=(numero,)) for numero in range(options['clients'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return {
+            'lectures_par_seconde': len(lectures) / options['duree'],
+            'ecritures_par_seconde': len(ecritures) / options['duree'],
+            'lectures_ms': [percentile(lectures, rang) * 1000 if lectures else 0.0 for rang in (50, 95)],
+            'ecritures_ms': [percentile(ecritures, rang) * 1000 if ecritures else 0.0 for rang in (50, 95)],
+            'verrous': verrous[0],
+        }
+
+    def afficher(self, profil, resultat):
+        lectures, ecritures = resultat['lectures_ms'], resultat['ecritures_ms']
+        self.stdout.write(
+            f'{profil:<12} {resultat["lectures_par_seconde"]:>9.1f} {resultat["ecritures_par_seconde"]:>9.1f} '
+            f'{lectures[0]:>10.2f} {lectures[1]:>10.2f} {ecritures[0]:>10.2f} {ecritures[1]:>10.2f} '
+            f'{resultat["verrous"]:>8}'
+        )
@@ -0,0 +1,100 @@
+import time
+
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from vaccination.authentification import TokenEnCacheAuthentication
+from vaccination.cache import stockage
+from vaccination.views import CustomLoginView
+
+HACHEUR_RAPIDE = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+class ConnexionHistorique(APIView):
+    """Ancien chemin de connexion : ModelBackend, get_or_create du token, profil relu."""
+    authentication_classes = []
+
+    def post(self, request):
+        user = ModelBackend().authenticate(
+            request, username=request.data.get('username'), password=request.data.get('password')
+        )
+        token, _ = Token.objects.get_or_create(user=user)
+        user = User.objects.get(pk=user.pk)
+        role = user.profile.role if hasattr(user, 'profile') else 'parent'
+        return Response({'token': token.key, 'role': role})
+
+
+class Annulation(Exception):
+    pass
+
+
+def mesurer(fonction, iterations):
+    """(appels par seconde, requêtes par appel) ; un premier appel hors mesure."""
+    fonction()
+    with CaptureQueriesContext(connection) as requetes:
+        debut = time.perf_counter()
+        for _ in range(iterations):
+            fonction()
+        duree = time.perf_counter() - debut
+    return iterations / duree, len(requetes) / iterations
+
+
+class Command(BaseCommand):
+    help = "Mesure le débit de /api/login/ et de l'authentification par token, avant et après cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+
+    def handle(self, *args, **options):
+        # Tout est écrit dans une transaction annulée à la fin : la base reste intacte
+        try:
+            with transaction.atomic():
+                self.mesures(options['iterations'])
+                raise Annulation
+        except Annulation:
+            pass
+
+    def ligne(self, libelle, debit, requetes):
+        self.stdout.write(f'{libelle:<40} {debit:>10.1f} /s {requetes:>6.1f} requêtes')
+
+    def mesures(self, iterations):
+        user = User.objects.create_user('benchmark_connexion', password='motdepasse-benchmark')
+        user.profile.role = 'agent'
+        user.profile.save()
+        factory = APIRequestFactory()
+        identifiants = {'username': user.username, 'password': 'motdepasse-benchmark'}
+        vues = [('avant', ConnexionHistorique.as_view()), ('après', CustomLoginView.as_view())]
+
+        debit, _ = mesurer(lambda: user.check_password('motdepasse-benchmark'), iterations)
+        self.stdout.write(f'Hachage ({user.password.split("$")[0]}) : {1000 / debit:.1f} ms par vérification')
+
+        for libelle, vue in vues:
+            self.ligne(f'Connexion {libelle}', *mesurer(
+                lambda: vue(factory.post('/api/login/', identifiants, format='json')), iterations
+            ))
+
+        # Sans le coût du hachage, seul reste le travail propre à la vue
+        with override_settings(PASSWORD_HASHERS=HACHEUR_RAPIDE):
+            user.set_password('motdepasse-benchmark')
+            user.save()
+            for libelle, vue in vues:
+                self.ligne(f'Connexion {libelle} (hachage MD5)', *mesurer(
+                    lambda: vue(factory.post('/api/login/', identifiants, format='json')), iterations * 50
+                ))
+
+        key = Token.objects.get(user=user).key
+        stockage().delete(f'auth:token:{key}')
+        for libelle, authentification in [('avant', TokenAuthentication()), ('après', TokenEnCacheAuthentication())]:
+            self.ligne(f'Token {libelle}', *mesurer(
+                lambda: authentification.authenticate_credentials(key), iterations * 50
+            ))
+        # Le token disparaît avec la transaction annulée
+        stockage().delete(f'auth:token:{key}')
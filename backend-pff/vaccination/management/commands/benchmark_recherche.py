@@ -0,0 +1,114 @@
+import random
+import time
+from datetime import date, timedelta
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+
+from vaccination import recherche
+from vaccination.benchmark import percentile
+from vaccination.generation import NOMS, NOMS_VILLAGES, PRENOMS
+from vaccination.models import Village, Enfant
+
+# Prénoms et noms accentués en plus de ceux de generation.py : les recherches se font sans accents
+PRENOMS_RECHERCHE = PRENOMS + [
+    'Aïssatou', 'Ndèye', 'Khadidiatou', 'Seynabou', 'Adama', 'Cheikh', 'Babacar', 'Coumba',
+    'Souleymane', 'Awa', 'Binta', 'Mouhamed', 'Rokhaya', 'Penda', 'Alioune', 'Dièynaba',
+]
+NOMS_RECHERCHE = NOMS + ['Kane', 'Cissé', 'Thiam', 'Sène', 'Touré', 'Niang', 'Camara', 'Wade', 'Dièye', 'Seck']
+
+# Préfixes courts (des centaines de milliers de correspondances), noms complets, villages
+PAGE_PROFONDE = 1000
+
+REQUETES = ['aissa', 'ka', 'fa', 'ndeye', 'mamadou diallo', 'cisse', 'thies', 'kaolack 7', 'seynabou ka', 'zz']
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure la recherche d'enfants (/api/enfants/search/) sur un grand jeu de noms généré dans une "
+        "base de test : durée de la requête sur l'index seule, puis de la réponse complète, cache désactivé."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--enfants', type=int, default=1_000_000)
+        parser.add_argument('--villages', type=int, default=1000)
+        parser.add_argument('--graine', type=int, default=42)
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--batch', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        if options['enfants'] < 1 or options['villages'] < 1:
+            raise CommandError('--enfants et --villages doivent être positifs.')
+        connexion = connections['default']
+        if not recherche.indexee(connexion):
+            raise CommandError("La recherche n'est indexée que sous SQLite.")
+        nom_initial = connexion.settings_dict['NAME']
+        connexion.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            debut = time.perf_counter()
+            self.remplir(options)
+            self.stdout.write(f'{options["enfants"]} enfants indexés en {time.perf_counter() - debut:.0f} s.')
+            with override_settings(CACHES={
+                **settings.CACHES, 'vaccination': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+            }):
+                resultats = self.mesurer(options['iterations'])
+        finally:
+            connexion.creation.destroy_test_db(nom_initial, verbosity=0, keepdb=False)
+        self.afficher(resultats)
+
+    def remplir(self, options):
+        """Enfants écrits par bulk_create : les déclencheurs alimentent l'index au passage."""
+        rng = random.Random(options['graine'])
+        villages = Village.objects.bulk_create([
+            Village(nom=f'{NOMS_VILLAGES[index % len(NOMS_VILLAGES)]} {index // len(NOMS_VILLAGES) + 1}')
+            for index in range(options['villages'])
+        ])
+        restants = options['enfants']
+        while restants:
+            taille = min(restants, options['batch'])
+            Enfant.objects.bulk_create([
+                Enfant(nom=f'{rng.choice(PRENOMS_RECHERCHE)} {rng.choice(NOMS_RECHERCHE)}', sexe=rng.choice('MF'),
+                       village=rng.choice(villages), date_naissance=date(2020, 1, 1) + timedelta(days=rng.randrange(1500)))
+                for _ in range(taille)
+            ])
+            restants -= taille
+        recherche.optimiser()
+
+    def mesurer(self, iterations):
+        client = Client(SERVER_NAME='localhost')
+        resultats = {}
+        for q in REQUETES:
+            mots = recherche.termes(q)
+            url = f'/api/enfants/search/?{urlencode({"q": q})}'
+            reponse = client.get(url)
+            if reponse.status_code != 200:
+                raise CommandError(f'{url} : statut {reponse.status_code}.')
+            index, profond, api = [], [], []
+            for _ in range(iterations):
+                debut = time.perf_counter()
+                recherche.rechercher(mots, 21)
+                index.append((time.perf_counter() - debut) * 1000)
+                # 50e page de 20 : les 1000 premiers résultats sont sautés
+                debut = time.perf_counter()
+                recherche.rechercher(mots, 21, PAGE_PROFONDE)
+                profond.append((time.perf_counter() - debut) * 1000)
+                debut = time.perf_counter()
+                client.get(url)
+                api.append((time.perf_counter() - debut) * 1000)
+            resultats[q] = (len(reponse.json()['results']), index, profond, api)
+        return resultats
+
+    def afficher(self, resultats):
+        self.stdout.write(
+            f'{"requête":<16} {"page":>5} {"index p50":>10} {"p95":>7} {"page 50 p95":>12} '
+            f'{"api p50":>8} {"p95":>7}  (ms)'
+        )
+        for q, (nombre, index, profond, api) in resultats.items():
+            self.stdout.write(
+                f'{q:<16} {nombre:>5} {percentile(index, 50):>10.2f} {percentile(index, 95):>7.2f} '
+                f'{percentile(profond, 95):>12.2f} {percentile(api, 50):>8.2f} {percentile(api, 95):>7.2f}'
+            )
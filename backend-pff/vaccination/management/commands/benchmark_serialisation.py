@@ -0,0 +1,100 @@
+import json
+import statistics
+import time
+from contextlib import ExitStack
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+
+from vaccination import rapide
+
+ROUTES = [
+    ('enfants', '/api/enfants/?page_size={taille}'),
+    ('enfants_vaccins', '/api/enfants/?expand=vaccins&page_size={taille}'),
+    ('vaccins', '/api/vaccins/?page_size={taille}'),
+]
+
+# (nom, listes par values(), encodage orjson)
+CHEMINS = [
+    ('serializers', False, False),
+    ('values', True, False),
+    ('values+orjson', True, True),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare le débit (lignes/s) des listes de l'API sérialisées par ModelSerializer et par le "
+        "chemin rapide (values() puis orjson), sur un jeu de données généré dans une base de test, cache désactivé."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--villages', type=int, default=20)
+        parser.add_argument('--enfants-par-village', type=int, default=100)
+        parser.add_argument('--graine', type=int, default=42)
+        parser.add_argument('--taille-page', type=int, default=500)
+        parser.add_argument('--iterations', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if rapide.orjson is None:
+            self.stderr.write("orjson n'est pas installé : le dernier chemin utilise l'encodeur de DRF.")
+        connexion = connections['default']
+        nom_initial = connexion.settings_dict['NAME']
+        connexion.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            call_command(
+                'generer_donnees', villages=options['villages'], enfants_par_village=options['enfants_par_village'],
+                graine=options['graine'], stdout=StringIO(),
+            )
+            with override_settings(CACHES={
+                **settings.CACHES, 'vaccination': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+            }):
+                resultats = self.mesurer(options['taille_page'], options['iterations'])
+        finally:
+            connexion.creation.destroy_test_db(nom_initial, verbosity=0)
+        self.afficher(resultats)
+
+    def mesurer(self, taille, iterations):
+        client = Client(SERVER_NAME='localhost')
+        resultats = {}
+        for route, gabarit in ROUTES:
+            url = gabarit.format(taille=taille)
+            contenus = set()
+            for nom, listes, encodage in CHEMINS:
+                with ExitStack() as pile:
+                    pile.enter_context(override_settings(LISTES_RAPIDES=listes))
+                    if not encodage:
+                        pile.enter_context(mock.patch.object(rapide, 'orjson', None))
+                    # Premier appel hors mesure : connexions et caches de Django chauds
+                    reponse = client.get(url)
+                    if reponse.status_code != 200:
+                        raise CommandError(f'{url} : statut {reponse.status_code}.')
+                    contenus.add(reponse.content)
+                    lignes = len(json.loads(reponse.content)['results'])
+                    durees = []
+                    for _ in range(iterations):
+                        debut = time.perf_counter()
+                        client.get(url)
+                        durees.append(time.perf_counter() - debut)
+                resultats[route, nom] = {
+                    'lignes_par_s': lignes * iterations / sum(durees),
+                    'p50_ms': statistics.median(durees) * 1000,
+                }
+            if len(contenus) != 1:
+                raise CommandError(f'{url} : réponses différentes selon le chemin de sérialisation.')
+        return resultats
+
+    def afficher(self, resultats):
+        self.stdout.write(f'{"route":<18} {"chemin":<15} {"lignes/s":>10} {"p50 (ms)":>9} {"gain":>6}')
+        for (route, nom), mesure in resultats.items():
+            reference = resultats[route, CHEMINS[0][0]]['lignes_par_s']
+            self.stdout.write(
+                f'{route:<18} {nom:<15} {mesure["lignes_par_s"]:>10.0f} {mesure["p50_ms"]:>9.2f} '
+                f'{mesure["lignes_par_s"] / reference:>5.1f}x'
+            )
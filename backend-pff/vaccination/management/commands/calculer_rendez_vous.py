@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from vaccination.rendez_vous import calculer
+
+
+class Command(BaseCommand):
+    help = "Recalcule les rendez-vous (doses attendues) de tous les enfants depuis le calendrier vaccinal."
+
+    def handle(self, *args, **options):
+        debut = time.perf_counter()
+        nombre = calculer()
+        self.stdout.write(self.style.SUCCESS(
+            f'{nombre} rendez-vous calculés en {time.perf_counter() - debut:.1f} s.'
+        ))
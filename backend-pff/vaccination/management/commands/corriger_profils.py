@@ -0,0 +1,22 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from vaccination.models import Profile
+from vaccination.roles import creer_profils_manquants
+
+
+class Command(BaseCommand):
+    help = "Crée un profil pour chaque utilisateur qui n'en a pas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--role', default='parent', choices=[code for code, _ in Profile.USER_ROLES])
+
+    def handle(self, *args, **options):
+        try:
+            crees = creer_profils_manquants(options['role'])
+        except IntegrityError:
+            raise CommandError("Profil créé pendant la correction, rien n'a été écrit : relancer la commande.")
+        self.stdout.write(self.style.SUCCESS(
+            f'Profils créés: {crees} (rôle {options["role"]}) sur {User.objects.count()} utilisateur(s).'
+        ))
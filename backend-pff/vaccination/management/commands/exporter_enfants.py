@@ -0,0 +1,43 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from vaccination import export
+
+
+class Command(BaseCommand):
+    help = "Exporte les enfants et l'historique de leurs vaccins en CSV ou NDJSON, au fil de la lecture."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=['csv', 'ndjson'], default='csv')
+        parser.add_argument('--sortie', help='Fichier de sortie (sortie standard par défaut).')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--village', help='Identifiant ou nom du village.')
+        for champ in ['date_naissance', 'date_administration']:
+            for borne in ['min', 'max']:
+                parser.add_argument(f'--{champ.replace("_", "-")}-{borne}', dest=f'{champ}_{borne}')
+
+    def handle(self, *args, **options):
+        params = {cle: options[cle] for cle in export.PARAMETRES if options[cle]}
+        try:
+            filtres = export.filtres(params)
+        except ValidationError as erreur:
+            raise CommandError(' '.join(f'{cle} : {message}' for cle, message in erreur.detail.items()))
+
+        blocs = export.exporter(options['format'], filtres)
+        if options['gzip']:
+            blocs = export.compresser(blocs)
+        if options['sortie']:
+            with open(options['sortie'], 'wb') as fichier:
+                taille = sum(fichier.write(bloc) for bloc in blocs)
+            self.stderr.write(f'{taille} octets écrits dans {options["sortie"]}.')
+        elif options['gzip']:
+            # Export compressé : octets bruts sur la sortie standard du processus
+            for bloc in blocs:
+                sys.stdout.buffer.write(bloc)
+            sys.stdout.buffer.flush()
+        else:
+            for bloc in blocs:
+                self.stdout.write(bloc.decode(), ending='')
+            self.stdout.flush()
@@ -0,0 +1,73 @@
+import time
+from datetime import date
+from multiprocessing import Pool
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from vaccination import cache, rendez_vous
+from vaccination.comptes import initialiser_processus
+from vaccination.generation import ecrire_village_avec_reprise
+from vaccination.lots import TAILLE_BATCH
+from vaccination.models import Village, Enfant, Vaccin, version_table
+
+
+class Command(BaseCommand):
+    help = (
+        "Génère un jeu de données synthétique reproductible (villages, enfants, vaccins) "
+        "pour les tests de charge. Même graine et même date de référence : mêmes données."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--villages', type=int, default=100)
+        parser.add_argument('--enfants-par-village', type=int, default=200)
+        parser.add_argument('--graine', type=int, default=42)
+        parser.add_argument('--date-reference', type=date.fromisoformat, default=None,
+                            help="Date du « jour » simulé (AAAA-MM-JJ), aujourd'hui par défaut.")
+        parser.add_argument('--processus', type=int, default=1,
+                            help='Processus de travail, chacun écrivant ses propres villages.')
+        parser.add_argument('--batch', type=int, default=TAILLE_BATCH)
+
+    def handle(self, *args, **options):
+        if options['villages'] < 1 or options['enfants_par_village'] < 1:
+            raise CommandError('--villages et --enfants-par-village doivent être positifs.')
+        reference = options['date_reference'] or timezone.localdate()
+        # Calendrier lu une fois et transmis aux processus de travail
+        calendrier = rendez_vous.calendrier()
+        taches = [
+            (index, options['graine'], options['enfants_par_village'], reference, options['batch'], calendrier)
+            for index in range(options['villages'])
+        ]
+
+        debut = time.perf_counter()
+        if options['processus'] > 1:
+            # Les processus ouvrent leurs propres connexions
+            connections.close_all()
+            with Pool(options['processus'], initializer=initialiser_processus) as pool:
+                self.suivre(pool.imap_unordered(ecrire_village_avec_reprise, taches), len(taches), debut)
+        else:
+            self.suivre(map(ecrire_village_avec_reprise, taches), len(taches), debut)
+        # Les réponses en cache et les rendez-vous ne connaissent pas ces lignes écrites sans signaux
+        cache.invalider(version_table(Village), version_table(Enfant), version_table(Vaccin))
+        debut = time.perf_counter()
+        nombre = rendez_vous.calculer()
+        self.stdout.write(f'{nombre} rendez-vous calculés en {time.perf_counter() - debut:.1f} s.')
+
+    def suivre(self, resultats, total, debut):
+        enfants = vaccins = 0
+        dernier_affichage = 0
+        for fait, (nb_enfants, nb_vaccins) in enumerate(resultats, start=1):
+            enfants += nb_enfants
+            vaccins += nb_vaccins
+            maintenant = time.perf_counter()
+            if maintenant - dernier_affichage >= 1 or fait == total:
+                dernier_affichage = maintenant
+                duree = maintenant - debut
+                self.stdout.write(
+                    f'{fait}/{total} villages, {enfants} enfants, {vaccins} vaccins '
+                    f'({(enfants + vaccins) / duree if duree else 0:.0f} lignes/s)'
+                )
+        self.stdout.write(self.style.SUCCESS(
+            f'{enfants} enfants et {vaccins} vaccins écrits en {time.perf_counter() - debut:.1f} s.'
+        ))
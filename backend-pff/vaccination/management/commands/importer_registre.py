@@ -0,0 +1,105 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from vaccination import cache, rendez_vous, taches
+from vaccination.lots import TAILLE_BATCH
+from vaccination.models import Compteur, Village, Enfant, Vaccin, version_table
+from vaccination.registres import (
+    LIGNES_PAR_TRANSACTION, Importateur, journaliser_rejets, lire_registre, valider,
+)
+from vaccination.verrous import reessayer_si_verrouillee
+
+
+class Command(BaseCommand):
+    help = (
+        "Importe un registre de vaccination numérisé (CSV, une ligne par dose : "
+        "village, enfant, nom, sexe, date_naissance, vaccin, date_administration, statut, notes). "
+        "Relancée après une interruption, la commande reprend à la première ligne non importée."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('fichier')
+        parser.add_argument('--lignes-par-transaction', type=int, default=LIGNES_PAR_TRANSACTION)
+        parser.add_argument('--batch', type=int, default=TAILLE_BATCH)
+        parser.add_argument('--rejets', help='CSV des lignes rejetées (par défaut <fichier>.rejets.csv).')
+        parser.add_argument('--recommencer', action='store_true', help='Ignore la reprise et relit tout le fichier.')
+        parser.add_argument('--differe', action='store_true',
+                            help="Met l'import en file pour `manage.py travailleur` au lieu de l'exécuter.")
+
+    def handle(self, *args, **options):
+        if options['differe']:
+            tache = taches.mettre_en_file('importer_registre', {
+                'fichier': os.path.abspath(options['fichier']),
+                **{cle: options[cle] for cle in ['lignes_par_transaction', 'batch', 'rejets', 'recommencer']},
+            })
+            self.stdout.write(self.style.SUCCESS(f'Import mis en file : tâche {tache.pk}.'))
+            return
+        chemin_rejets = options['rejets'] or f'{options["fichier"]}.rejets.csv'
+        # Doses d'un enfant qui ne correspond pas à celui déjà inscrit sous ce numéro :
+        # journalisées dans la transaction de leur lot, avant que la reprise n'avance
+        importateur = Importateur(options['fichier'], options['batch'],
+                                  rejeter=lambda rejets: journaliser_rejets(chemin_rejets, rejets))
+        if options['recommencer']:
+            Compteur.marquer(importateur.reprise, 0)
+        deja = importateur.deja_importees()
+        if deja:
+            self.stdout.write(f'Reprise après la ligne {deja}.')
+        ecrire = reessayer_si_verrouillee(importateur.ecrire)
+
+        debut = dernier_affichage = time.perf_counter()
+        position = debut_lot = deja
+        lot, rejets, total_rejets = [], [], 0
+        try:
+            with open(options['fichier'], encoding='utf-8-sig', newline='') as fichier:
+                try:
+                    lignes = lire_registre(fichier, deja)
+                except ValueError as erreur:
+                    raise CommandError(str(erreur))
+                for numero, ligne in lignes:
+                    try:
+                        lot.append({**valider(ligne), 'numero': numero})
+                    except ValueError as erreur:
+                        rejets.append((numero, str(erreur), ligne))
+                    position = numero
+                    if position - debut_lot >= options['lignes_par_transaction']:
+                        total_rejets += self.ecrire_lot(ecrire, lot, rejets, position, chemin_rejets)
+                        lot, rejets, debut_lot = [], [], position
+                        if time.perf_counter() - dernier_affichage >= 1:
+                            dernier_affichage = time.perf_counter()
+                            self.progression(position, deja, debut, importateur.totaux)
+                if position > debut_lot:
+                    total_rejets += self.ecrire_lot(ecrire, lot, rejets, position, chemin_rejets)
+        except OSError as erreur:
+            raise CommandError(f'Lecture impossible : {erreur}')
+        finally:
+            if importateur.totaux:
+                # Lignes écrites sans signaux : les réponses en cache sont invalidées, fiches
+                # d'enfant comprises (elles dépendent aussi de la version des villages)
+                cache.invalider(version_table(Village), version_table(Enfant), version_table(Vaccin))
+
+        totaux = importateur.totaux
+        total_rejets += totaux['rejets']
+        self.progression(position, deja, debut, totaux)
+        if totaux['vaccins'] or totaux['enfants']:
+            self.stdout.write(f'{rendez_vous.calculer()} rendez-vous recalculés.')
+        self.stdout.write(self.style.SUCCESS(
+            f'{totaux["vaccins"]} vaccins, {totaux["enfants"]} enfants et {totaux["villages"]} villages créés, '
+            f'{totaux["doublons"]} doublons ignorés, {total_rejets} lignes rejetées'
+            + (f' (voir {chemin_rejets})' if total_rejets else '') + '.'
+        ))
+
+    def ecrire_lot(self, ecrire, lot, rejets, position, chemin_rejets):
+        # Rejets journalisés avant que la reprise n'avance : aucun ne se perd
+        if rejets:
+            journaliser_rejets(chemin_rejets, rejets)
+        ecrire(lot, position)
+        return len(rejets)
+
+    def progression(self, position, deja, debut, totaux):
+        duree = time.perf_counter() - debut
+        self.stdout.write(
+            f'{position} lignes lues, {totaux["vaccins"]} vaccins créés '
+            f'({(position - deja) / duree if duree else 0:.0f} lignes/s)'
+        )
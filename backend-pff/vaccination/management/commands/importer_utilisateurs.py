@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from vaccination.comptes import (
+    TAILLE_BATCH, ComptesInvalides, FichierInvalide, lire_comptes, valider, exclure_existants, hacher, creer_comptes,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Crée des comptes en masse depuis un CSV ou un JSON "
+        "(username, email, password, role, first_name, last_name)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('fichier')
+        parser.add_argument('--role', default='parent', help="Rôle des lignes qui n'en précisent pas.")
+        parser.add_argument('--processus', type=int, default=None,
+                            help='Processus de hachage (défaut : nombre de CPU).')
+        parser.add_argument('--batch', type=int, default=TAILLE_BATCH)
+
+    def handle(self, *args, **options):
+        debut = time.perf_counter()
+        try:
+            comptes = valider(lire_comptes(options['fichier']), options['role'])
+        except (OSError, FichierInvalide) as erreur:
+            raise CommandError(f'Lecture impossible : {erreur}')
+        except ComptesInvalides as erreur:
+            for numero, message in erreur.erreurs.items():
+                self.stderr.write(f'Ligne {numero} : {message}')
+            raise CommandError(f'{erreur} : aucun compte créé.')
+
+        comptes, deja_pris = exclure_existants(comptes)
+        debut_hachage = time.perf_counter()
+        hachages = hacher([c['password'] for c in comptes], options['processus'])
+        debut_insertion = time.perf_counter()
+        crees, ignores = creer_comptes(comptes, hachages, options['batch'])
+        fin = time.perf_counter()
+
+        duree = fin - debut
+        self.stdout.write(
+            f'Hachage : {debut_insertion - debut_hachage:.2f} s, insertion : {fin - debut_insertion:.2f} s'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{crees} compte(s) créé(s), {deja_pris + ignores} déjà existant(s), '
+            f'en {duree:.2f} s ({crees / duree if duree else 0:.0f} comptes/s).'
+        ))
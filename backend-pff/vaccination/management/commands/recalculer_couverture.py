@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from vaccination import couverture
+
+
+class Command(BaseCommand):
+    help = ("Recalcule la couverture dénormalisée de chaque enfant (taux, doses reçues, en retard, "
+            "manquantes, prochaine échéance) depuis les vaccins et les rendez-vous.")
+
+    def handle(self, *args, **options):
+        debut = time.perf_counter()
+        with transaction.atomic():
+            nombre = couverture.recalculer()
+            couverture.publier()
+        self.stdout.write(self.style.SUCCESS(
+            f'Couverture recalculée pour {nombre} enfant(s) en {time.perf_counter() - debut:.1f} s.'
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from vaccination.statistiques import reconstruire
+
+
+class Command(BaseCommand):
+    help = "Reconstruit la table des statistiques par village à partir des enfants et vaccins."
+
+    def handle(self, *args, **options):
+        nombre = reconstruire()
+        self.stdout.write(self.style.SUCCESS(f'Statistiques recalculées pour {nombre} village(s).'))
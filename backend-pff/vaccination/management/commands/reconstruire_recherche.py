@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from vaccination.recherche import reconstruire
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de recherche des enfants (nom et village) à partir des tables."
+
+    def handle(self, *args, **options):
+        nombre = reconstruire()
+        self.stdout.write(self.style.SUCCESS(f'Index de recherche reconstruit : {nombre} enfant(s).'))
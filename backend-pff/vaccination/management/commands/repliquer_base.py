@@ -0,0 +1,55 @@
+import os
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def copier(source, chemin, pages=1024):
+    """
+    Copie en ligne (API de sauvegarde SQLite) de la base `source` vers le fichier `chemin`,
+    écrite d'abord à côté puis renommée : les lecteurs de la réplique ne voient jamais
+    une copie partielle.
+    """
+    temporaire = f'{chemin}.copie'
+    destination = sqlite3.connect(temporaire)
+    try:
+        source.connection.backup(destination, pages=pages)
+        # La copie hérite du mode WAL de la source : elle doit tenir dans un seul fichier
+        destination.execute('PRAGMA journal_mode=DELETE')
+    finally:
+        destination.close()
+    os.replace(temporaire, chemin)
+
+
+class Command(BaseCommand):
+    help = (
+        "Tient à jour la réplique SQLite locale (settings.REPLIQUE_ALIAS) en y copiant la base principale, "
+        "une fois ou en continu."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vers', help='Fichier de la réplique (par défaut celui de REPLIQUE_ALIAS).')
+        parser.add_argument('--continu', action='store_true', help='Recopie la base toutes les --intervalle secondes.')
+        parser.add_argument('--intervalle', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        source = connections[DEFAULT_DB_ALIAS]
+        if source.vendor != 'sqlite':
+            raise CommandError('Seule une base principale SQLite peut être répliquée par copie.')
+        chemin = options['vers']
+        if not chemin and settings.REPLIQUE_ALIAS:
+            chemin = settings.DATABASES[settings.REPLIQUE_ALIAS]['NAME']
+        if not chemin:
+            raise CommandError('Aucune réplique : définissez SQLITE_REPLIQUE ou passez --vers.')
+
+        source.ensure_connection()
+        while True:
+            debut = time.perf_counter()
+            copier(source, str(chemin))
+            self.stdout.write(f'Réplique {chemin} à jour ({(time.perf_counter() - debut) * 1000:.0f} ms).')
+            if not options['continu']:
+                break
+            time.sleep(options['intervalle'])
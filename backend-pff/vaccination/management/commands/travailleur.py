@@ -0,0 +1,104 @@
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from vaccination import taches
+
+
+class Command(BaseCommand):
+    help = (
+        "Exécute les tâches différées (table Tache) : réservation atomique, un processus par tâche "
+        "dans la limite de --processus, nouvelles tentatives après un échec et arrêt des tâches "
+        "qui dépassent leur délai. Plusieurs travailleurs peuvent tourner sur la même base."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processus', type=int, default=2,
+                            help='Tâches exécutées en parallèle ; 0 les exécute dans ce processus, sans délai maximal '
+                                 'ni reprise par un autre travailleur.')
+        parser.add_argument('--attente', type=float, default=1.0, help='Secondes entre deux lectures de la file.')
+        parser.add_argument('--taches', nargs='+', metavar='NOM', help='Ne réserve que ces tâches.')
+        parser.add_argument('--une-fois', action='store_true',
+                            help="S'arrête dès que la file ne contient plus de tâche prête.")
+
+    def handle(self, *args, **options):
+        self.nom = f'{socket.gethostname()}:{os.getpid()}'
+        # (id, tentative) -> (processus, échéance en temps monotone)
+        self.en_cours = {}
+        self.arret = False
+        signal.signal(signal.SIGTERM, self.arreter)
+        # fork : les processus héritent de Django déjà configuré (tâches enregistrées comprises)
+        self.contexte = multiprocessing.get_context('fork') if options['processus'] else None
+        self.stdout.write(f'Travailleur {self.nom} : {options["processus"]} processus.')
+        try:
+            self.boucle(options)
+        except KeyboardInterrupt:
+            # Arrêt immédiat : les tâches interrompues repartent sans perdre de tentative
+            for (pk, tentative), (processus, _) in self.en_cours.items():
+                self.tuer(processus)
+                taches.relacher(pk, tentative)
+            self.stdout.write(f'{len(self.en_cours)} tâche(s) remise(s) en attente.')
+
+    def arreter(self, *args):
+        """SIGTERM : plus de nouvelle réservation, les tâches en cours se terminent."""
+        self.arret = True
+
+    def boucle(self, options):
+        while True:
+            taches.reprendre_expirees()
+            self.surveiller()
+            libres = max(options['processus'], 1) - len(self.en_cours)
+            reservees = (taches.reserver(self.nom, libres, options['taches'], echeance=self.contexte is not None)
+                         if libres and not self.arret else [])
+            for pk, tentative, delai in reservees:
+                self.lancer(pk, tentative, delai)
+            if not self.en_cours and not reservees and (self.arret or options['une_fois']):
+                return
+            if not reservees:
+                time.sleep(options['attente'])
+
+    def lancer(self, pk, tentative, delai):
+        self.stdout.write(f'Tâche {pk} (tentative {tentative}) démarrée.')
+        if self.contexte is None:
+            taches.executer(pk, tentative)
+            self.compte_rendu(pk)
+            return
+        # Aucune connexion partagée avec le processus enfant
+        connections.close_all()
+        processus = self.contexte.Process(target=taches.executer_dans_processus, args=(pk, tentative), daemon=True)
+        processus.start()
+        self.en_cours[pk, tentative] = (processus, time.monotonic() + delai)
+
+    def surveiller(self):
+        """Processus terminés ou arrêtés faute d'avoir fini dans le délai de leur tâche."""
+        for (pk, tentative), (processus, echeance) in list(self.en_cours.items()):
+            if processus.is_alive():
+                if time.monotonic() < echeance:
+                    continue
+                self.tuer(processus)
+                taches.echouer(pk, tentative, 'Délai dépassé : processus arrêté.')
+                self.stdout.write(self.style.WARNING(f'Tâche {pk} arrêtée après son délai.'))
+            else:
+                processus.join()
+                # Sortie sans résultat enregistré (processus tué, erreur hors Python)
+                if taches.echouer(pk, tentative, f'Processus terminé (code {processus.exitcode}).'):
+                    self.stdout.write(self.style.WARNING(f'Tâche {pk} interrompue (code {processus.exitcode}).'))
+                self.compte_rendu(pk)
+            del self.en_cours[pk, tentative]
+
+    def tuer(self, processus, attente=5):
+        processus.terminate()
+        processus.join(attente)
+        if processus.is_alive():
+            processus.kill()
+            processus.join()
+
+    def compte_rendu(self, pk):
+        statut = taches.Tache.objects.values_list('statut', flat=True).get(pk=pk)
+        style = self.style.SUCCESS if statut == taches.Tache.TERMINEE else self.style.WARNING
+        self.stdout.write(style(f'Tâche {pk} : {statut}.'))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from vaccination.roles import compter_roles, lister_utilisateurs, libelle
+
+
+class Command(BaseCommand):
+    help = "Liste les utilisateurs et leurs rôles, puis le nombre d'utilisateurs par rôle."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--statistiques', action='store_true', help='Seulement le nombre par rôle.')
+
+    def handle(self, *args, **options):
+        if not options['statistiques']:
+            self.lister()
+        self.stdout.write('=== STATISTIQUES PAR RÔLE ===')
+        comptes = compter_roles()
+        if not comptes:
+            self.stdout.write('Aucun utilisateur trouvé.')
+        for role, nombre in comptes.items():
+            self.stdout.write(f'{libelle(role)}: {nombre}')
+
+    def lister(self):
+        self.stdout.write('=== UTILISATEURS ET LEURS RÔLES ===')
+        entete = "Nom d'utilisateur"
+        self.stdout.write(f"{'ID':<7} {entete:<20} {'Email':<30} {'Rôle':<15}")
+        self.stdout.write('-' * 72)
+        for user_id, username, email, role in lister_utilisateurs():
+            self.stdout.write(f'{user_id:<7} {username:<20} {email:<30} {libelle(role):<15}')
+        self.stdout.write('')
@@ -0,0 +1,101 @@
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+
+class MesureSQL:
+    """Requêtes exécutées, lignes lues et temps passé en base pendant une mesure."""
+
+    # Nombre maximal d'instructions gardées avec garder_sql
+    INSTRUCTIONS_MAX = 200
+
+    def __init__(self, garder_sql=False):
+        self.requetes = 0
+        self.lignes = 0
+        self.duree = 0.0
+        self.active = True
+        # (sql, durée) de chaque requête, si demandé
+        self.instructions = [] if garder_sql else None
+
+
+class LignesMesurees:
+    """
+    Curseur DB-API compté : les lignes lues s'ajoutent aux mesures encore actives sous
+    lesquelles il a été exécuté. execute_wrapper ne voit que l'exécution, pas la lecture.
+    """
+
+    def __init__(self, curseur):
+        self.curseur = curseur
+        self.mesures = []
+
+    def __getattr__(self, nom):
+        return getattr(self.curseur, nom)
+
+    def compter(self, nombre):
+        for mesure in self.mesures:
+            if mesure.active:
+                mesure.lignes += nombre
+
+    def __iter__(self):
+        for ligne in self.curseur:
+            self.compter(1)
+            yield ligne
+
+    def fetchone(self):
+        ligne = self.curseur.fetchone()
+        if ligne is not None:
+            self.compter(1)
+        return ligne
+
+    def fetchmany(self, *args, **kwargs):
+        lignes = self.curseur.fetchmany(*args, **kwargs)
+        self.compter(len(lignes))
+        return lignes
+
+    def fetchall(self):
+        lignes = self.curseur.fetchall()
+        self.compter(len(lignes))
+        return lignes
+
+
+class Chronometre:
+    """Fonction de connection.execute_wrapper : compte et chronomètre les requêtes d'une mesure."""
+
+    def __init__(self, mesure):
+        self.mesure = mesure
+
+    def __call__(self, execute, sql, params, many, context):
+        curseur = context['cursor']
+        if not isinstance(curseur.cursor, LignesMesurees):
+            curseur.cursor = LignesMesurees(curseur.cursor)
+        if self.mesure not in curseur.cursor.mesures:
+            curseur.cursor.mesures.append(self.mesure)
+        self.mesure.requetes += 1
+        debut = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duree = time.perf_counter() - debut
+            self.mesure.duree += duree
+            instructions = self.mesure.instructions
+            if instructions is not None and len(instructions) < MesureSQL.INSTRUCTIONS_MAX:
+                instructions.append((sql, duree))
+
+
+@contextmanager
+def mesurer_sql(garder_sql=False):
+    """
+    Mesure les accès à la base faits par le thread courant, sur toutes les connexions
+    (principale et réplique), par connection.execute_wrapper. Les mesures peuvent s'imbriquer ;
+    chacune ne voit que ce qui s'exécute pendant qu'elle est active.
+    """
+    mesure = MesureSQL(garder_sql)
+    chronometre = Chronometre(mesure)
+    with ExitStack() as pile:
+        for connexion in connections.all():
+            pile.enter_context(connexion.execute_wrapper(chronometre))
+        try:
+            yield mesure
+        finally:
+            mesure.active = False
@@ -0,0 +1,98 @@
+import threading
+from collections import Counter
+
+from . import cache
+
+# Limites (secondes) des seaux de l'histogramme des durées de requête
+SEAUX = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+COMPTEURS = [
+    ('sql_requetes', 'vaccination_sql_requetes_total', 'Requêtes SQL exécutées.'),
+    ('sql_duree', 'vaccination_sql_duree_secondes_total', 'Temps passé en base.'),
+    ('rendu', 'vaccination_rendu_duree_secondes_total', 'Temps de rendu des réponses (JSON, HTML).'),
+    ('octets', 'vaccination_reponse_octets_total', 'Taille des corps de réponse.'),
+]
+
+
+def echapper(valeur):
+    return str(valeur).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def etiquettes(**valeurs):
+    return '{' + ','.join(f'{nom}="{echapper(valeur)}"' for nom, valeur in valeurs.items()) + '}'
+
+
+def nombre(valeur):
+    return repr(float(valeur)) if isinstance(valeur, float) else str(valeur)
+
+
+class Registre:
+    """Métriques du processus courant, au format texte de Prometheus."""
+
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self.reinitialiser()
+
+    def reinitialiser(self):
+        with self._verrou:
+            self.requetes = Counter()
+            # (vue, méthode) -> [nombre par seau..., somme, nombre]
+            self.durees = {}
+            self.compteurs = {cle: Counter() for cle, _, _ in COMPTEURS}
+
+    def observer(self, vue, methode, statut, duree, sql_requetes, sql_duree, rendu, octets):
+        with self._verrou:
+            self.requetes[vue, methode, statut] += 1
+            histogramme = self.durees.setdefault((vue, methode), [0] * len(SEAUX) + [0.0, 0])
+            for i, limite in enumerate(SEAUX):
+                if duree <= limite:
+                    histogramme[i] += 1
+            histogramme[-2] += duree
+            histogramme[-1] += 1
+            for cle, valeur in [('sql_requetes', sql_requetes), ('sql_duree', sql_duree),
+                                ('rendu', rendu), ('octets', octets)]:
+                self.compteurs[cle][vue] += valeur
+
+    def exposer(self):
+        with self._verrou:
+            requetes = dict(self.requetes)
+            durees = {cle: list(valeurs) for cle, valeurs in self.durees.items()}
+            compteurs = {cle: dict(valeurs) for cle, valeurs in self.compteurs.items()}
+        lignes = [
+            '# HELP vaccination_requetes_total Requêtes HTTP traitées.',
+            '# TYPE vaccination_requetes_total counter',
+        ]
+        for (vue, methode, statut), valeur in sorted(requetes.items()):
+            lignes.append(f'vaccination_requetes_total{etiquettes(vue=vue, methode=methode, statut=statut)} {valeur}')
+
+        lignes += [
+            '# HELP vaccination_requete_duree_secondes Durée de traitement des requêtes.',
+            '# TYPE vaccination_requete_duree_secondes histogram',
+        ]
+        for (vue, methode), valeurs in sorted(durees.items()):
+            # Les seaux sont cumulés à l'enregistrement : chacun compte les durées <= sa limite
+            for limite, valeur in zip(SEAUX, valeurs):
+                lignes.append(
+                    f'vaccination_requete_duree_secondes_bucket{etiquettes(vue=vue, methode=methode, le=limite)} {valeur}'
+                )
+            lignes.append(
+                f'vaccination_requete_duree_secondes_bucket{etiquettes(vue=vue, methode=methode, le="+Inf")} '
+                f'{valeurs[-1]}'
+            )
+            lignes.append(f'vaccination_requete_duree_secondes_sum{etiquettes(vue=vue, methode=methode)} '
+                          f'{nombre(valeurs[-2])}')
+            lignes.append(f'vaccination_requete_duree_secondes_count{etiquettes(vue=vue, methode=methode)} '
+                          f'{valeurs[-1]}')
+
+        for cle, nom, aide in COMPTEURS:
+            lignes += [f'# HELP {nom} {aide}', f'# TYPE {nom} counter']
+            for vue, valeur in sorted(compteurs[cle].items()):
+                lignes.append(f'{nom}{etiquettes(vue=vue)} {nombre(valeur)}')
+
+        for cle, valeur in cache.compteurs().items():
+            if cle in ('succes', 'echecs', 'ignores', 'invalidations'):
+                lignes += [f'# TYPE vaccination_cache_{cle}_total counter', f'vaccination_cache_{cle}_total {valeur}']
+        return '\n'.join(lignes) + '\n'
+
+
+registre = Registre()
@@ -0,0 +1,88 @@
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+from .mesures import mesurer_sql
+from .metriques import registre
+
+logger = logging.getLogger('vaccination.lent')
+
+# Instructions SQL reprises dans le journal d'une requête lente (les plus longues)
+INSTRUCTIONS_JOURNALISEES = 10
+
+
+class MetriquesMiddleware:
+    """
+    Mesure chaque requête échantillonnée : durée, requêtes et temps SQL, temps de rendu
+    et taille de la réponse, par vue (voir metriques.py, exposé sur /api/metrics/).
+    Une requête plus lente que METRIQUES_SEUIL_LENT est journalisée avec ses requêtes SQL.
+    Synchrone sous WSGI, asynchrone sous ASGI : la mesure SQL est alors posée sur le thread
+    où l'ORM asynchrone exécute les requêtes de la requête HTTP (un par requête sous ASGI).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= getattr(settings, 'METRIQUES_ECHANTILLONNAGE', 1.0):
+            return self.get_response(request)
+        request.metriques_rendu = 0.0
+        debut = time.perf_counter()
+        with mesurer_sql(garder_sql=True) as mesure:
+            response = self.get_response(request)
+        self.observer(request, response, time.perf_counter() - debut, mesure)
+        return response
+
+    async def __acall__(self, request):
+        if random.random() >= getattr(settings, 'METRIQUES_ECHANTILLONNAGE', 1.0):
+            return await self.get_response(request)
+        request.metriques_rendu = 0.0
+        debut = time.perf_counter()
+        contexte = mesurer_sql(garder_sql=True)
+        mesure = await sync_to_async(contexte.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(contexte.__exit__)(None, None, None)
+        self.observer(request, response, time.perf_counter() - debut, mesure)
+        return response
+
+    def observer(self, request, response, duree, mesure):
+        correspondance = request.resolver_match
+        vue = correspondance.view_name if correspondance else 'non_resolue'
+        octets = 0 if response.streaming else len(response.content)
+        registre.observer(
+            vue, request.method, response.status_code, duree,
+            mesure.requetes, mesure.duree, request.metriques_rendu, octets,
+        )
+        if duree >= getattr(settings, 'METRIQUES_SEUIL_LENT', 1.0):
+            self.journaliser(request, vue, duree, mesure)
+
+    def process_template_response(self, request, response):
+        # Appelé juste avant le rendu (réponses DRF) : le rappel en mesure la durée
+        if hasattr(request, 'metriques_rendu'):
+            debut = time.perf_counter()
+
+            def fin(reponse):
+                request.metriques_rendu += time.perf_counter() - debut
+
+            response.add_post_render_callback(fin)
+        return response
+
+    def journaliser(self, request, vue, duree, mesure):
+        lentes = sorted(mesure.instructions, key=lambda instruction: instruction[1], reverse=True)
+        detail = '\n'.join(f'  {d * 1000:.1f} ms  {sql}' for sql, d in lentes[:INSTRUCTIONS_JOURNALISEES])
+        logger.warning(
+            'Requête lente %s %s (%s) : %.0f ms, %d requêtes SQL (%.0f ms)\n%s',
+            request.method, request.get_full_path(), vue, duree * 1000,
+            mesure.requetes, mesure.duree * 1000, detail,
+        )
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def remplir_statistiques(apps, schema_editor):
+    # Même calcul que statistiques.reconstruire, recopié avec les modèles historiques
+    Village = apps.get_model('vaccination', 'Village')
+    Enfant = apps.get_model('vaccination', 'Enfant')
+    Vaccin = apps.get_model('vaccination', 'Vaccin')
+    StatistiqueVillage = apps.get_model('vaccination', 'StatistiqueVillage')
+
+    enfants = dict(
+        Enfant.objects.values('village_id').annotate(n=Count('id')).values_list('village_id', 'n')
+    )
+    vaccins = {
+        ligne['enfant__village_id']: ligne
+        for ligne in Vaccin.objects.values('enfant__village_id').annotate(
+            recus=Count('id', filter=Q(statut='recu')),
+            retard=Count('id', filter=Q(statut='retard')),
+        )
+    }
+    StatistiqueVillage.objects.bulk_create([
+        StatistiqueVillage(
+            village_id=village_id,
+            nombre_enfants=enfants.get(village_id, 0),
+            vaccins_recus=vaccins.get(village_id, {}).get('recus', 0),
+            vaccins_retard=vaccins.get(village_id, {}).get('retard', 0),
+        )
+        for village_id in Village.objects.values_list('id', flat=True).iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vaccination', '0002_profile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatistiqueVillage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre_enfants', models.IntegerField(default=0)),
+                ('vaccins_recus', models.IntegerField(default=0)),
+                ('vaccins_retard', models.IntegerField(default=0)),
+                ('village', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='statistique', to='vaccination.village')),
+            ],
+        ),
+        migrations.RunPython(remplir_statistiques, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vaccination', '0003_statistiquevillage'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='enfant',
+            index=models.Index(fields=['village', 'date_naissance'], name='enfant_village_naiss_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='enfant',
+            index=models.Index(fields=['date_naissance'], name='enfant_naissance_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vaccin',
+            index=models.Index(fields=['enfant', 'statut'], name='vaccin_enfant_statut_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vaccin',
+            index=models.Index(fields=['date_administration'], name='vaccin_date_admin_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vaccin',
+            index=models.Index(fields=['nom', 'enfant'], name='vaccin_nom_enfant_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='village',
+            index=models.Index(fields=['nom'], name='village_nom_idx'),
+        ),
+    ]
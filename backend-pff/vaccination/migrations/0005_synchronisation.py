@@ -0,0 +1,74 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:37
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def numeroter_lignes_existantes(apps, schema_editor):
+    # Révisions uniques pour les lignes existantes : village, puis enfant, puis vaccin
+    Compteur = apps.get_model('vaccination', 'Compteur')
+    decalage = 0
+    for nom in ['Village', 'Enfant', 'Vaccin']:
+        modele = apps.get_model('vaccination', nom)
+        modele.objects.update(revision=F('id') + decalage)
+        decalage += modele.objects.aggregate(m=Max('id'))['m'] or 0
+    Compteur.objects.update_or_create(nom='revision', defaults={'valeur': decalage})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vaccination', '0004_index_filtres'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Compteur',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nom', models.CharField(max_length=50, unique=True)),
+                ('valeur', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Suppression',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modele', models.CharField(max_length=20)),
+                ('objet_id', models.BigIntegerField()),
+                ('revision', models.BigIntegerField(db_index=True)),
+                ('supprime_le', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='enfant',
+            name='revision',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='enfant',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='vaccin',
+            name='revision',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='vaccin',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='village',
+            name='revision',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='village',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(numeroter_lignes_existantes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vaccination', '0005_synchronisation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enfant',
+            name='cle_client',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='vaccin',
+            name='cle_client',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+    ]
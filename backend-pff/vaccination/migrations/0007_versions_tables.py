@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vaccination', '0006_cle_client'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='compteur',
+            name='modifie_le',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
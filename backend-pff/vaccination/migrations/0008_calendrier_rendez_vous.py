@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Calendrier national initial (vaccin, dose, âge en jours, tolérance en jours), modifiable ensuite
+CALENDRIER = [
+    ('BCG', 1, 0, 28), ('Hépatite B', 1, 0, 7), ('Polio', 1, 0, 14),
+    ('DTC', 1, 42, 28), ('Pneumocoque', 1, 42, 28), ('Rotavirus', 1, 42, 28),
+    ('DTC', 2, 70, 28), ('DTC', 3, 98, 28),
+    ('Rougeole', 1, 270, 30), ('Fièvre jaune', 1, 270, 30),
+    ('Méningite', 1, 450, 60), ('ROR', 1, 450, 60),
+]
+
+
+def creer_calendrier(apps, schema_editor):
+    DoseCalendrier = apps.get_model('vaccination', 'DoseCalendrier')
+    DoseCalendrier.objects.bulk_create([
+        DoseCalendrier(vaccin=vaccin, dose=dose, age_jours=age, tolerance_jours=tolerance)
+        for vaccin, dose, age, tolerance in CALENDRIER
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vaccination', '0007_versions_tables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DoseCalendrier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vaccin', models.CharField(max_length=100)),
+                ('dose', models.PositiveSmallIntegerField(default=1)),
+                ('age_jours', models.PositiveIntegerField()),
+                ('tolerance_jours', models.PositiveIntegerField(default=28)),
+            ],
+            options={
+                'ordering': ['age_jours', 'vaccin', 'dose'],
+                'constraints': [models.UniqueConstraint(fields=('vaccin', 'dose'), name='dose_calendrier_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RendezVous',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vaccin', models.CharField(max_length=100)),
+                ('dose', models.PositiveSmallIntegerField()),
+                ('date_prevue', models.DateField()),
+                ('date_limite', models.DateField()),
+                ('prochaine', models.BooleanField(default=False)),
+                ('enfant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rendez_vous', to='vaccination.enfant')),
+                ('village', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='vaccination.village')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date_prevue'], name='rdv_date_prevue_idx'), models.Index(fields=['village', 'date_prevue'], name='rdv_village_date_idx'), models.Index(fields=['date_limite'], name='rdv_date_limite_idx')],
+            },
+        ),
+        migrations.RunPython(creer_calendrier, migrations.RunPython.noop),
+    ]
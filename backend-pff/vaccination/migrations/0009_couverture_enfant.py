@@ -0,0 +1,118 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:11
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import Count, F, FloatField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, Least, Round
+
+
+# Calcul de rendez_vous.calculer et couverture.recalculer tel qu'il était à cette migration,
+# recopié pour ne pas dépendre du code actuel
+VACCINS_RECOMMANDES = 12
+TAILLE_BATCH = 1000
+
+
+def remplir_rendez_vous(apps):
+    Enfant = apps.get_model('vaccination', 'Enfant')
+    RendezVous = apps.get_model('vaccination', 'RendezVous')
+    DoseCalendrier = apps.get_model('vaccination', 'DoseCalendrier')
+    doses = [
+        (vaccin, dose, timedelta(days=age), timedelta(days=tolerance))
+        for vaccin, dose, age, tolerance in DoseCalendrier.objects.order_by('age_jours', 'vaccin', 'dose')
+        .values_list('vaccin', 'dose', 'age_jours', 'tolerance_jours')
+    ]
+    vaccins = sorted({vaccin for vaccin, *_ in doses})
+    comptes = {
+        f'recus_{index}': Count('vaccins', filter=Q(vaccins__nom=vaccin, vaccins__statut='recu'))
+        for index, vaccin in enumerate(vaccins)
+    }
+    lignes = Enfant.objects.order_by().values_list('id', 'village_id', 'date_naissance').annotate(**comptes)
+    RendezVous.objects.all().delete()
+    lot = []
+    for enfant_id, village_id, naissance, *recus in lignes.iterator(chunk_size=TAILLE_BATCH):
+        prochaine = True
+        for vaccin, dose, decalage, tolerance in doses:
+            # La n-ième dose reçue d'un vaccin vaut pour la n-ième dose du calendrier
+            if recus[vaccins.index(vaccin)] >= dose:
+                continue
+            prevue = naissance + decalage
+            lot.append(RendezVous(
+                enfant_id=enfant_id, village_id=village_id, vaccin=vaccin, dose=dose,
+                date_prevue=prevue, date_limite=prevue + tolerance, prochaine=prochaine,
+            ))
+            prochaine = False
+        if len(lot) >= TAILLE_BATCH:
+            RendezVous.objects.bulk_create(lot)
+            lot = []
+    RendezVous.objects.bulk_create(lot)
+
+
+def nombre(requete):
+    return Coalesce(Subquery(requete.order_by().values('enfant').annotate(n=Count('*')).values('n')), 0)
+
+
+def remplir_couverture(apps, schema_editor):
+    # Doses manquantes et échéances se déduisent des rendez-vous, jamais calculés avant
+    # cette migration : la table est remplie d'abord
+    remplir_rendez_vous(apps)
+    Enfant = apps.get_model('vaccination', 'Enfant')
+    vaccins = apps.get_model('vaccination', 'Vaccin').objects.filter(enfant=OuterRef('pk'))
+    rendez_vous = apps.get_model('vaccination', 'RendezVous').objects.filter(enfant=OuterRef('pk'))
+    Enfant.objects.update(
+        vaccins_recus=nombre(vaccins.filter(statut='recu')),
+        vaccins_retard=nombre(vaccins.filter(statut='retard')),
+        doses_manquantes=nombre(rendez_vous),
+        prochaine_echeance=Subquery(rendez_vous.filter(prochaine=True).values('date_prevue')[:1]),
+    )
+    Enfant.objects.update(taux_couverture=Round(
+        Least(Cast(F('vaccins_recus'), FloatField()) * 100.0 / VACCINS_RECOMMANDES, Value(100.0)), 2,
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vaccination', '0008_calendrier_rendez_vous'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enfant',
+            name='doses_manquantes',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='enfant',
+            name='prochaine_echeance',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='enfant',
+            name='taux_couverture',
+            field=models.FloatField(default=0.0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='enfant',
+            name='vaccins_recus',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='enfant',
+            name='vaccins_retard',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='enfant',
+            index=models.Index(fields=['taux_couverture'], name='enfant_couverture_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='enfant',
+            index=models.Index(fields=['village', 'taux_couverture'], name='enfant_village_couv_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='enfant',
+            index=models.Index(fields=['prochaine_echeance'], name='enfant_echeance_idx'),
+        ),
+        migrations.RunPython(remplir_couverture, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:31
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vaccination', '0009_couverture_enfant'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nom', models.CharField(max_length=50)),
+                ('parametres', models.JSONField(blank=True, default=dict)),
+                ('statut', models.CharField(choices=[('en_attente', 'En attente'), ('en_cours', 'En cours'), ('terminee', 'Terminée'), ('echec', 'Échec')], default='en_attente', max_length=12)),
+                ('progression', models.FloatField(default=0.0)),
+                ('message', models.CharField(blank=True, default='', max_length=200)),
+                ('resultat', models.JSONField(blank=True, null=True)),
+                ('erreur', models.TextField(blank=True, default='')),
+                ('tentatives', models.PositiveSmallIntegerField(default=0)),
+                ('tentatives_max', models.PositiveSmallIntegerField(default=3)),
+                ('delai_max', models.PositiveIntegerField(default=600)),
+                ('travailleur', models.CharField(blank=True, default='', max_length=100)),
+                ('cree_le', models.DateTimeField(auto_now_add=True)),
+                ('executer_apres', models.DateTimeField(default=django.utils.timezone.now)),
+                ('debut', models.DateTimeField(blank=True, null=True)),
+                ('fin', models.DateTimeField(blank=True, null=True)),
+                ('expire_le', models.DateTimeField(blank=True, null=True)),
+                ('demandeur', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['statut', 'executer_apres'], name='tache_statut_apres_idx'), models.Index(fields=['demandeur', 'cree_le'], name='tache_demandeur_idx')],
+            },
+        ),
+    ]
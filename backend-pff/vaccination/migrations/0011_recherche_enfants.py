@@ -0,0 +1,67 @@
+from django.db import migrations
+
+# Tables FTS5 et déclencheurs propres à SQLite, hors des modèles (voir recherche.py). Le SQL
+# est recopié ici tel qu'il était à cette migration : recherche.py peut évoluer sans la changer.
+
+TABLE = 'vaccination_enfant_recherche'
+TABLE_NOMS = 'vaccination_enfant_recherche_nom'
+TOKENISEUR = "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4 5 6 7 8'"
+DECLENCHEURS = [f'{TABLE}_insertion', f'{TABLE}_modification', f'{TABLE}_suppression', f'{TABLE}_village']
+
+CREATION = [
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5(nom, village, {TOKENISEUR})',
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE_NOMS} USING fts5(nom, {TOKENISEUR})',
+    f"""CREATE TRIGGER {TABLE}_insertion AFTER INSERT ON vaccination_enfant BEGIN
+        INSERT INTO {TABLE} (rowid, nom, village)
+        SELECT new.id, new.nom, nom FROM vaccination_village WHERE id = new.village_id;
+        INSERT INTO {TABLE_NOMS} (rowid, nom) VALUES (new.id, new.nom);
+    END""",
+    f"""CREATE TRIGGER {TABLE}_modification AFTER UPDATE OF nom, village_id ON vaccination_enfant
+    WHEN new.nom IS NOT old.nom OR new.village_id IS NOT old.village_id BEGIN
+        UPDATE {TABLE} SET nom = new.nom,
+            village = (SELECT nom FROM vaccination_village WHERE id = new.village_id)
+        WHERE rowid = new.id;
+        UPDATE {TABLE_NOMS} SET nom = new.nom WHERE rowid = new.id AND new.nom IS NOT old.nom;
+    END""",
+    f"""CREATE TRIGGER {TABLE}_suppression AFTER DELETE ON vaccination_enfant BEGIN
+        DELETE FROM {TABLE} WHERE rowid = old.id;
+        DELETE FROM {TABLE_NOMS} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER {TABLE}_village AFTER UPDATE OF nom ON vaccination_village
+    WHEN new.nom IS NOT old.nom BEGIN
+        UPDATE {TABLE} SET village = new.nom
+        WHERE rowid IN (SELECT id FROM vaccination_enfant WHERE village_id = new.id);
+    END""",
+    f'INSERT INTO {TABLE} (rowid, nom, village) SELECT e.id, e.nom, v.nom '
+    f'FROM vaccination_enfant e JOIN vaccination_village v ON v.id = e.village_id',
+    f'INSERT INTO {TABLE_NOMS} (rowid, nom) SELECT id, nom FROM vaccination_enfant',
+    f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')",
+    f"INSERT INTO {TABLE_NOMS} ({TABLE_NOMS}) VALUES ('optimize')",
+]
+
+SUPPRESSION = [
+    *(f'DROP TRIGGER IF EXISTS {nom}' for nom in DECLENCHEURS),
+    f'DROP TABLE IF EXISTS {TABLE}',
+    f'DROP TABLE IF EXISTS {TABLE_NOMS}',
+]
+
+
+def executer(requetes):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        with schema_editor.connection.cursor() as curseur:
+            for sql in requetes:
+                curseur.execute(sql)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vaccination', '0010_taches'),
+    ]
+
+    operations = [
+        migrations.RunPython(executer(CREATION), executer(SUPPRESSION)),
+    ]
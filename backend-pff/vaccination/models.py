@@ -1,17 +1,84 @@
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from django.utils import timezone
 
 # Create your models here.
 
-class Village(models.Model):
+# Nombre de vaccins recommandés par enfant, utilisé pour le taux de couverture
+VACCINS_RECOMMANDES = 12
+
+# Nom du compteur global de révisions utilisé par la synchronisation
+REVISION = 'revision'
+
+def version_table(modele):
+    """Nom du compteur qui retient la dernière révision ayant modifié la table de `modele`."""
+    return f'table:{modele._meta.model_name}'
+
+class Compteur(models.Model):
+    """Compteurs nommés, incrémentés dans la transaction de l'écriture qu'ils versionnent."""
+    nom = models.CharField(max_length=50, unique=True)
+    valeur = models.BigIntegerField(default=0)
+    modifie_le = models.DateTimeField(null=True, blank=True)
+
+    @classmethod
+    def incrementer(cls, nom, pas=1):
+        """
+        Réserve `pas` valeurs et renvoie la dernière. L'UPDATE verrouille le compteur jusqu'à
+        la fin de la transaction appelante : l'ordre des valeurs suit l'ordre des commits.
+        """
+        if not cls.objects.filter(nom=nom).update(valeur=F('valeur') + pas):
+            cls.objects.get_or_create(nom=nom)
+            cls.objects.filter(nom=nom).update(valeur=F('valeur') + pas)
+        return cls.valeur_de(nom)
+
+    @classmethod
+    def marquer(cls, nom, valeur):
+        """Fixe la valeur du compteur et sa date de modification (versions de table)."""
+        maintenant = timezone.now()
+        if not cls.objects.filter(nom=nom).update(valeur=valeur, modifie_le=maintenant):
+            cls.objects.update_or_create(nom=nom, defaults={'valeur': valeur, 'modifie_le': maintenant})
+
+    @classmethod
+    def valeur_de(cls, nom):
+        return cls.objects.filter(nom=nom).values_list('valeur', flat=True).first() or 0
+
+    def __str__(self):
+        return f'{self.nom} = {self.valeur}'
+
+class ModeleSynchronise(models.Model):
+    """
+    Reçoit une nouvelle révision à chaque enregistrement (voir synchronisation.py) et
+    la reporte sur la version de sa table (validateurs HTTP, voir conditionnel.py).
+    """
+    revision = models.BigIntegerField(default=0, db_index=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'revision', 'updated_at'}
+        with transaction.atomic(using=kwargs.get('using')):
+            self.revision = Compteur.incrementer(REVISION)
+            super().save(*args, **kwargs)
+            Compteur.marquer(version_table(self), self.revision)
+
+class Village(ModeleSynchronise):
     nom = models.CharField(max_length=100)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['nom'], name='village_nom_idx'),
+        ]
+
     def __str__(self):
         return self.nom
 
-class Enfant(models.Model):
+class Enfant(ModeleSynchronise):
     SEXE_CHOICES = (
         ('M', 'Garçon'),
         ('F', 'Fille'),
@@ -20,11 +87,29 @@ class Enfant(models.Model):
     sexe = models.CharField(max_length=1, choices=SEXE_CHOICES)
     village = models.ForeignKey(Village, on_delete=models.CASCADE, related_name='enfants')
     date_naissance = models.DateField()
+    # Clé d'idempotence fournie par le client lors des envois en lot
+    cle_client = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
+    # Couverture dénormalisée, tenue à jour par couverture.py (signaux des vaccins et
+    # recalcul des rendez-vous) : jamais saisie par les clients
+    taux_couverture = models.FloatField(default=0.0, editable=False)
+    vaccins_recus = models.IntegerField(default=0, editable=False)
+    vaccins_retard = models.IntegerField(default=0, editable=False)
+    doses_manquantes = models.IntegerField(default=0, editable=False)
+    prochaine_echeance = models.DateField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['village', 'date_naissance'], name='enfant_village_naiss_idx'),
+            models.Index(fields=['date_naissance'], name='enfant_naissance_idx'),
+            models.Index(fields=['taux_couverture'], name='enfant_couverture_idx'),
+            models.Index(fields=['village', 'taux_couverture'], name='enfant_village_couv_idx'),
+            models.Index(fields=['prochaine_echeance'], name='enfant_echeance_idx'),
+        ]
 
     def __str__(self):
         return self.nom
 
-class Vaccin(models.Model):
+class Vaccin(ModeleSynchronise):
     STATUT_CHOICES = (
         ('recu', 'Reçu'),
         ('retard', 'Retard'),
@@ -34,10 +119,125 @@ class Vaccin(models.Model):
     date_administration = models.DateField()
     statut = models.CharField(max_length=10, choices=STATUT_CHOICES)
     notes = models.TextField(blank=True, null=True)
+    cle_client = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['enfant', 'statut'], name='vaccin_enfant_statut_idx'),
+            models.Index(fields=['date_administration'], name='vaccin_date_admin_idx'),
+            models.Index(fields=['nom', 'enfant'], name='vaccin_nom_enfant_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nom} - {self.enfant.nom}"
 
+class StatistiqueVillage(models.Model):
+    """Compteurs agrégés par village, tenus à jour par les signaux de signals.py."""
+    village = models.OneToOneField(Village, on_delete=models.CASCADE, related_name='statistique')
+    nombre_enfants = models.IntegerField(default=0)
+    vaccins_recus = models.IntegerField(default=0)
+    vaccins_retard = models.IntegerField(default=0)
+
+    @property
+    def taux_couverture(self):
+        if not self.nombre_enfants:
+            return 0.0
+        taux = 100.0 * self.vaccins_recus / (self.nombre_enfants * VACCINS_RECOMMANDES)
+        return round(min(taux, 100.0), 2)
+
+    def __str__(self):
+        return f'Statistiques {self.village_id}'
+
+class DoseCalendrier(models.Model):
+    """Dose du calendrier vaccinal national : âge recommandé et délai toléré avant le retard."""
+    vaccin = models.CharField(max_length=100)
+    dose = models.PositiveSmallIntegerField(default=1)
+    age_jours = models.PositiveIntegerField()
+    tolerance_jours = models.PositiveIntegerField(default=28)
+
+    class Meta:
+        ordering = ['age_jours', 'vaccin', 'dose']
+        constraints = [
+            models.UniqueConstraint(fields=['vaccin', 'dose'], name='dose_calendrier_unique'),
+        ]
+
+    def __str__(self):
+        return f'{self.vaccin} (dose {self.dose}, {self.age_jours} j)'
+
+class RendezVous(models.Model):
+    """Dose du calendrier pas encore reçue par un enfant, recalculée par rendez_vous.py."""
+    enfant = models.ForeignKey(Enfant, on_delete=models.CASCADE, related_name='rendez_vous')
+    # Village de l'enfant, recopié pour filtrer sans jointure
+    village = models.ForeignKey(Village, on_delete=models.CASCADE, related_name='+')
+    vaccin = models.CharField(max_length=100)
+    dose = models.PositiveSmallIntegerField()
+    date_prevue = models.DateField()
+    date_limite = models.DateField()
+    # Première dose en attente de l'enfant dans l'ordre du calendrier
+    prochaine = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date_prevue'], name='rdv_date_prevue_idx'),
+            models.Index(fields=['village', 'date_prevue'], name='rdv_village_date_idx'),
+            models.Index(fields=['date_limite'], name='rdv_date_limite_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.vaccin} {self.dose} - {self.enfant_id} le {self.date_prevue}'
+
+class Suppression(models.Model):
+    """Pierre tombale : trace d'une suppression à transmettre aux clients hors ligne."""
+    modele = models.CharField(max_length=20)
+    objet_id = models.BigIntegerField()
+    revision = models.BigIntegerField(db_index=True)
+    supprime_le = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.modele} {self.objet_id} supprimé'
+
+class Tache(models.Model):
+    """Travail différé, exécuté hors des requêtes par `manage.py travailleur` (voir taches.py)."""
+    EN_ATTENTE = 'en_attente'
+    EN_COURS = 'en_cours'
+    TERMINEE = 'terminee'
+    ECHEC = 'echec'
+    STATUT_CHOICES = (
+        (EN_ATTENTE, 'En attente'),
+        (EN_COURS, 'En cours'),
+        (TERMINEE, 'Terminée'),
+        (ECHEC, 'Échec'),
+    )
+    nom = models.CharField(max_length=50)
+    parametres = models.JSONField(default=dict, blank=True)
+    statut = models.CharField(max_length=12, choices=STATUT_CHOICES, default=EN_ATTENTE)
+    # Avancement (0 à 100) et dernier message publiés par la tâche en cours
+    progression = models.FloatField(default=0.0)
+    message = models.CharField(max_length=200, blank=True, default='')
+    resultat = models.JSONField(null=True, blank=True)
+    erreur = models.TextField(blank=True, default='')
+    tentatives = models.PositiveSmallIntegerField(default=0)
+    tentatives_max = models.PositiveSmallIntegerField(default=3)
+    # Durée maximale d'une tentative (secondes), au-delà le processus est arrêté
+    delai_max = models.PositiveIntegerField(default=600)
+    demandeur = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    travailleur = models.CharField(max_length=100, blank=True, default='')
+    cree_le = models.DateTimeField(auto_now_add=True)
+    # Pas exécutée avant cette date (attente entre deux tentatives)
+    executer_apres = models.DateTimeField(default=timezone.now)
+    debut = models.DateTimeField(null=True, blank=True)
+    fin = models.DateTimeField(null=True, blank=True)
+    expire_le = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['statut', 'executer_apres'], name='tache_statut_apres_idx'),
+            models.Index(fields=['demandeur', 'cree_le'], name='tache_demandeur_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.nom} #{self.pk} ({self.statut})'
+
 class Profile(models.Model):
     USER_ROLES = (
         ('parent', 'Parent'),
@@ -0,0 +1,187 @@
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, CursorPagination, _reverse_ordering
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class PaginationParCurseur(CursorPagination):
+    """
+    Pagination par clé (keyset) sur `id` : chaque page est un `WHERE id > curseur LIMIT n`,
+    donc le coût reste proportionnel à la taille de la page, même loin dans la table.
+    Avec un tri sur plusieurs champs, le curseur porte la valeur de chacun (DRF ne garde que
+    le premier, plus un décalage qui grandit avec les égalités).
+    paginate_queryset de DRF est découpé en deux étapes autour de la lecture de la page,
+    pour que les vues asynchrones la lisent par l'ORM asynchrone (apaginer).
+    """
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        requete = self.requete_page(queryset, request, view)
+        if requete is None:
+            return None
+        return self.terminer_page(list(requete))
+
+    async def apaginer(self, queryset, request, view=None):
+        requete = self.requete_page(queryset, request, view)
+        if requete is None:
+            return None
+        return self.terminer_page([ligne async for ligne in requete])
+
+    def requete_page(self, queryset, request, view=None):
+        """Requête (non évaluée) de la page demandée et d'un élément de plus ; None sans pagination."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            self.offset, self.reverse, self.current_position = 0, False, None
+        else:
+            self.offset, self.reverse, self.current_position = self.cursor
+
+        if self.reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if self.current_position is not None:
+            queryset = queryset.filter(self.apres_position(self.current_position, self.cursor.reverse))
+        return queryset[self.offset:self.offset + self.page_size + 1]
+
+    def apres_position(self, position, reverse):
+        """
+        Filtre des lignes qui suivent `position` dans l'ordre de parcours : pour (a, id),
+        `a >= v AND (a > v OR (a = v AND id > p))`, dont la borne sur `a` se lit sur l'index.
+        """
+        valeurs = position.split('|', len(self.ordering) - 1)
+        if len(valeurs) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        suite = Q()
+        egalites = {}
+        for order, valeur in zip(self.ordering, valeurs):
+            attribut = order.lstrip('-')
+            operateur = 'lt' if reverse != order.startswith('-') else 'gt'
+            suite |= Q(**egalites, **{f'{attribut}__{operateur}': valeur})
+            egalites[attribut] = valeur
+        if len(self.ordering) == 1:
+            return suite
+        attribut = self.ordering[0].lstrip('-')
+        operateur = 'lte' if reverse != self.ordering[0].startswith('-') else 'gte'
+        return Q(**{f'{attribut}__{operateur}': valeurs[0]}) & suite
+
+    def _get_position_from_instance(self, instance, ordering):
+        """Valeurs de tous les champs du tri, séparées par `|`."""
+        valeurs = []
+        for order in ordering:
+            attribut = order.lstrip('-')
+            valeurs.append(str(instance[attribut] if isinstance(instance, dict) else getattr(instance, attribut)))
+        return '|'.join(valeurs)
+
+    def terminer_page(self, resultats):
+        """Page et positions des liens suivant/précédent, comme CursorPagination.paginate_queryset."""
+        self.page = list(resultats[:self.page_size])
+        if len(resultats) > len(self.page):
+            suivante = True
+            position_suivante = self._get_position_from_instance(resultats[-1], self.ordering)
+        else:
+            suivante = False
+            position_suivante = None
+
+        if self.reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (self.current_position is not None) or (self.offset > 0)
+            self.has_previous = suivante
+            if self.has_next:
+                self.next_position = self.current_position
+            if self.has_previous:
+                self.previous_position = position_suivante
+        else:
+            self.has_next = suivante
+            self.has_previous = (self.current_position is not None) or (self.offset > 0)
+            if self.has_next:
+                self.next_position = position_suivante
+            if self.has_previous:
+                self.previous_position = self.current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+
+class PaginationRendezVous(PaginationParCurseur):
+    """Rendez-vous dans l'ordre des dates prévues (index rdv_date_prevue_idx)."""
+    ordering = ('date_prevue', 'id')
+
+
+class PaginationEnfants(PaginationParCurseur):
+    """
+    `?ordering=taux_couverture` (ou `-taux_couverture`) parcourt les enfants par taux de
+    couverture sur l'index enfant_couverture_idx ; l'identifiant départage les égalités.
+    """
+    ordering_query_param = 'ordering'
+    ordres = {
+        'id': ('id',),
+        'taux_couverture': ('taux_couverture', 'id'),
+        '-taux_couverture': ('-taux_couverture', '-id'),
+    }
+
+    def get_ordering(self, request, queryset, view):
+        valeur = request.query_params.get(self.ordering_query_param) or 'id'
+        if valeur not in self.ordres:
+            raise ValidationError(
+                {self.ordering_query_param: f'Tri inconnu, valeurs possibles : {", ".join(self.ordres)}.'}
+            )
+        return self.ordres[valeur]
+
+
+class PaginationRecherche(BasePagination):
+    """
+    Pages numérotées (`?page=2&page_size=20`) des résultats classés d'une recherche :
+    pas de COUNT, la page suivante existe si la recherche renvoie un résultat de plus.
+    Réponse de même forme que les listes (next, previous, results).
+    """
+    page_size = 20
+    max_page_size = 100
+    page_query_param = 'page'
+    page_size_query_param = 'page_size'
+
+    def entier(self, request, nom, defaut):
+        valeur = request.query_params.get(nom) or defaut
+        try:
+            valeur = int(valeur)
+        except (TypeError, ValueError):
+            valeur = 0
+        if valeur < 1:
+            raise ValidationError({nom: 'Entier positif attendu.'})
+        return valeur
+
+    def bornes(self, request):
+        """(décalage, taille) de la page demandée."""
+        self.request = request
+        self.numero = self.entier(request, self.page_query_param, 1)
+        self.taille = min(self.entier(request, self.page_size_query_param, self.page_size), self.max_page_size)
+        return (self.numero - 1) * self.taille, self.taille
+
+    def paginer(self, resultats):
+        """Page à partir des `taille + 1` premiers résultats à partir du décalage."""
+        self.suivante = len(resultats) > self.taille
+        return resultats[:self.taille]
+
+    def lien(self, numero):
+        url = self.request.build_absolute_uri()
+        if numero == 1:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, numero)
+
+    def get_next_link(self):
+        return self.lien(self.numero + 1) if self.suivante else None
+
+    def get_previous_link(self):
+        return self.lien(self.numero - 1) if self.numero > 1 else None
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'previous': self.get_previous_link(), 'results': data})
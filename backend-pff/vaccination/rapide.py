@@ -0,0 +1,90 @@
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .models import Vaccin
+
+try:
+    import orjson
+except ImportError:  # paquet optionnel : rendu par l'encodeur json de DRF
+    orjson = None
+
+# Options orjson : dates et dataclasses passent par l'encodeur de DRF (format des dates
+# identique), le reste (str, int, float, dict, list, None) est encodé en natif
+OPTIONS_ORJSON = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS) if orjson else 0
+
+
+class RenduJSONRapide(JSONRenderer):
+    """
+    JSONRenderer encodé par orjson, octet pour octet identique au rendu de DRF (JSON compact,
+    UTF-8, U+2028/U+2029 échappés). Repli sur DRF sans orjson, avec indentation ou sur
+    tout contenu qu'orjson refuse (clés non textuelles, entiers hors 64 bits).
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or not api_settings.COMPACT_JSON or not api_settings.UNICODE_JSON
+                or self.get_indent(accepted_media_type, renderer_context or {})):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            contenu = orjson.dumps(data, default=self.encoder_class().default, option=OPTIONS_ORJSON)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        return contenu.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+def date_iso(valeur):
+    return None if valeur is None else valeur.isoformat()
+
+
+def listes_rapides():
+    return getattr(settings, 'LISTES_RAPIDES', False)
+
+
+def _requete_vaccins(enfants):
+    return (
+        Vaccin.objects.filter(enfant_id__in=enfants).order_by('enfant_id', 'id')
+        .values_list('enfant_id', 'id', 'nom', 'date_administration', 'statut', 'notes')
+    )
+
+
+def _grouper_vaccins(lignes):
+    return {
+        enfant_id: [
+            {'id': pk, 'nom': nom, 'date_administration': date_iso(administration), 'statut': statut, 'notes': notes}
+            for _, pk, nom, administration, statut, notes in vaccins
+        ]
+        for enfant_id, vaccins in groupby(lignes, key=itemgetter(0))
+    }
+
+
+def vaccins_par_enfant(enfants):
+    """{enfant_id: [vaccin sérialisé, ...]} des enfants donnés, en une requête, par identifiant croissant."""
+    return _grouper_vaccins(_requete_vaccins(enfants))
+
+
+async def avaccins_par_enfant(enfants):
+    return _grouper_vaccins([ligne async for ligne in _requete_vaccins(enfants)])
+
+
+class ListeRapideMixin:
+    """
+    Listes en lecture sans ModelSerializer quand settings.LISTES_RAPIDES est vrai : les lignes
+    sont lues par values() (mêmes filtres, même pagination) et mises en forme par
+    `serialiser_lignes(lignes)`, défini par chaque vue, qui doit produire exactement les
+    données du serializer.
+    """
+    # Colonnes lues par values()
+    colonnes_rapides = []
+
+    def list(self, request, *args, **kwargs):
+        if not listes_rapides():
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None).values(*self.colonnes_rapides)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.serialiser_lignes(page))
+        return Response(self.serialiser_lignes(list(queryset)))
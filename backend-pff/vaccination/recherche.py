@@ -0,0 +1,190 @@
+import re
+
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+from .models import Enfant
+
+# Recherche plein texte des enfants par leur nom et celui de leur village. Sous SQLite,
+# une table FTS5 indexe les deux noms sans accents ni casse ("aissa" trouve "Aïssatou") ;
+# des déclencheurs SQL la tiennent à jour, y compris pour les écritures en masse
+# (bulk_create, update()) qui ne passent pas par les signaux. Les autres bases se
+# contentent d'un icontains, sans classement.
+
+TABLE = 'vaccination_enfant_recherche'
+# Noms seuls : un filtre de colonne sur TABLE ({nom} : ...) parcourrait aussi toutes les
+# occurrences du mot dans les villages, soit 100 000 lignes pour un nom de village courant
+TABLE_NOMS = 'vaccination_enfant_recherche_nom'
+
+# Classement par niveaux, du plus au moins pertinent, chacun parcouru du plus récent au plus
+# ancien sans limite : tous les mots sont des mots entiers du nom de l'enfant, puis tous sont
+# des débuts de mots du nom, puis les autres correspondances (au moins un mot dans le village).
+# Chaque niveau est lu par l'index dans l'ordre des rowid : une page ne coûte que ses lignes
+# et celles qu'elle saute, jamais un tri de toutes les correspondances.
+
+LONGUEUR_MIN = 2
+TERMES_MAX = 8
+
+TOKENISEUR = "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4 5 6 7 8'"
+
+DECLENCHEURS = [f'{TABLE}_insertion', f'{TABLE}_modification', f'{TABLE}_suppression', f'{TABLE}_village']
+
+CREATION = [
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5(nom, village, {TOKENISEUR})',
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE_NOMS} USING fts5(nom, {TOKENISEUR})',
+    f"""CREATE TRIGGER {TABLE}_insertion AFTER INSERT ON vaccination_enfant BEGIN
+        INSERT INTO {TABLE} (rowid, nom, village)
+        SELECT new.id, new.nom, nom FROM vaccination_village WHERE id = new.village_id;
+        INSERT INTO {TABLE_NOMS} (rowid, nom) VALUES (new.id, new.nom);
+    END""",
+    f"""CREATE TRIGGER {TABLE}_modification AFTER UPDATE OF nom, village_id ON vaccination_enfant
+    WHEN new.nom IS NOT old.nom OR new.village_id IS NOT old.village_id BEGIN
+        UPDATE {TABLE} SET nom = new.nom,
+            village = (SELECT nom FROM vaccination_village WHERE id = new.village_id)
+        WHERE rowid = new.id;
+        UPDATE {TABLE_NOMS} SET nom = new.nom WHERE rowid = new.id AND new.nom IS NOT old.nom;
+    END""",
+    f"""CREATE TRIGGER {TABLE}_suppression AFTER DELETE ON vaccination_enfant BEGIN
+        DELETE FROM {TABLE} WHERE rowid = old.id;
+        DELETE FROM {TABLE_NOMS} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER {TABLE}_village AFTER UPDATE OF nom ON vaccination_village
+    WHEN new.nom IS NOT old.nom BEGIN
+        UPDATE {TABLE} SET village = new.nom
+        WHERE rowid IN (SELECT id FROM vaccination_enfant WHERE village_id = new.id);
+    END""",
+]
+
+
+def indexee(connexion):
+    return connexion.vendor == 'sqlite'
+
+
+def objets_existants(connexion):
+    noms = [TABLE, TABLE_NOMS, *DECLENCHEURS]
+    with connexion.cursor() as curseur:
+        curseur.execute(f'SELECT name FROM sqlite_master WHERE name IN ({", ".join(["%s"] * len(noms))})', noms)
+        return {ligne[0] for ligne in curseur.fetchall()}
+
+
+def creer(connexion):
+    """
+    Tables FTS5 et déclencheurs (remplacés s'ils existent déjà), puis remplissage depuis
+    les enfants existants.
+    """
+    if not indexee(connexion):
+        return
+    with connexion.cursor() as curseur:
+        for nom in DECLENCHEURS:
+            curseur.execute(f'DROP TRIGGER IF EXISTS {nom}')
+        for sql in CREATION:
+            curseur.execute(sql)
+    reconstruire(connexion)
+
+
+def reparer(connexion):
+    """
+    Recrée les déclencheurs perdus et reconstruit l'index : SQLite reconstruit la table
+    vaccination_enfant lors de certaines migrations, et ses déclencheurs disparaissent avec
+    l'ancienne table. Sans effet si l'index n'a jamais été créé (migration 0011).
+    """
+    if not indexee(connexion):
+        return False
+    existants = objets_existants(connexion)
+    if TABLE not in existants or existants.issuperset([TABLE_NOMS, *DECLENCHEURS]):
+        return False
+    creer(connexion)
+    return True
+
+
+def supprimer(connexion):
+    if not indexee(connexion):
+        return
+    with connexion.cursor() as curseur:
+        for nom in DECLENCHEURS:
+            curseur.execute(f'DROP TRIGGER IF EXISTS {nom}')
+        curseur.execute(f'DROP TABLE IF EXISTS {TABLE}')
+        curseur.execute(f'DROP TABLE IF EXISTS {TABLE_NOMS}')
+
+
+def reconstruire(connexion=None):
+    """Réécrit l'index depuis les tables (réparation, base restaurée) ; renvoie le nombre d'enfants indexés."""
+    connexion = connexion or connections['default']
+    if not indexee(connexion):
+        return 0
+    with connexion.cursor() as curseur:
+        curseur.execute(f'DELETE FROM {TABLE}')
+        curseur.execute(f'DELETE FROM {TABLE_NOMS}')
+        curseur.execute(
+            f'INSERT INTO {TABLE} (rowid, nom, village) SELECT e.id, e.nom, v.nom '
+            f'FROM vaccination_enfant e JOIN vaccination_village v ON v.id = e.village_id'
+        )
+        nombre = curseur.rowcount
+        curseur.execute(f'INSERT INTO {TABLE_NOMS} (rowid, nom) SELECT id, nom FROM vaccination_enfant')
+    optimiser(connexion)
+    return nombre
+
+
+def optimiser(connexion=None):
+    """Fusionne les segments de l'index, après une écriture en masse."""
+    connexion = connexion or connections['default']
+    if indexee(connexion):
+        with connexion.cursor() as curseur:
+            for table in [TABLE, TABLE_NOMS]:
+                curseur.execute(f"INSERT INTO {table} ({table}) VALUES ('optimize')")
+
+
+def termes(q, parametre='q'):
+    """
+    Mots de la recherche d'au moins LONGUEUR_MIN caractères (un préfixe d'une lettre
+    parcourrait presque tout l'index) ; ValidationError s'il n'en reste aucun.
+    """
+    mots = [mot for mot in re.findall(r'\w+', q or '') if len(mot) >= LONGUEUR_MIN][:TERMES_MAX]
+    if not mots:
+        raise ValidationError({parametre: f'Au moins {LONGUEUR_MIN} caractères attendus.'})
+    return mots
+
+
+def niveaux(mots):
+    """(table, requête FTS5) de chaque niveau du classement, sans recouvrement entre niveaux."""
+    entiers = ' '.join(f'"{mot}"' for mot in mots)
+    prefixes = ' '.join(f'"{mot}"*' for mot in mots)
+    return [
+        (TABLE_NOMS, entiers),
+        (TABLE_NOMS, f'({prefixes}) NOT ({entiers})'),
+        (TABLE, f'({prefixes}) NOT {{nom}} : ({prefixes})'),
+    ]
+
+
+def rechercher(mots, limite, decalage=0, using='default'):
+    """
+    Identifiants des enfants correspondant à tous les `mots` (préfixes, dans le nom ou le
+    village), du plus pertinent au moins pertinent ; sans SQLite, les plus récents d'abord.
+    """
+    connexion = connections[using]
+    if not indexee(connexion):
+        filtre = Q()
+        for mot in mots:
+            filtre &= Q(nom__icontains=mot) | Q(village__nom__icontains=mot)
+        return list(Enfant.objects.using(using).filter(filtre).order_by('-id').values_list(
+            'id', flat=True)[decalage:decalage + limite])
+    resultats = []
+    with connexion.cursor() as curseur:
+        for table, requete in niveaux(mots):
+            curseur.execute(
+                f'SELECT rowid FROM {table} WHERE {table} MATCH %s ORDER BY rowid DESC LIMIT %s OFFSET %s',
+                [requete, limite - len(resultats), decalage],
+            )
+            lignes = [ligne[0] for ligne in curseur.fetchall()]
+            if not lignes and decalage:
+                # Niveau entièrement sauté : le décalage restant porte sur les suivants
+                curseur.execute(f'SELECT count(*) FROM (SELECT 1 FROM {table} WHERE {table} MATCH %s LIMIT %s)',
+                                [requete, decalage])
+                decalage -= curseur.fetchone()[0]
+            else:
+                decalage = 0
+            resultats += lignes
+            if len(resultats) == limite:
+                break
+    return resultats
@@ -0,0 +1,218 @@
+import csv
+import hashlib
+import os
+from collections import Counter
+from datetime import datetime
+
+from django.db import transaction
+
+from . import statistiques
+from .lots import TAILLE_BATCH, reserver_revisions, completer_ids
+from .models import Compteur, Village, Enfant, Vaccin, version_table
+
+# Colonnes attendues : une ligne par dose inscrite au registre ; `enfant` est le numéro
+# de l'enfant dans le registre de son village, répété sur chacune de ses doses
+COLONNES = ['village', 'enfant', 'nom', 'sexe', 'date_naissance', 'vaccin', 'date_administration', 'statut', 'notes']
+SEXES = {code for code, _ in Enfant.SEXE_CHOICES}
+STATUTS = {code for code, _ in Vaccin.STATUT_CHOICES}
+FORMATS_DATE = ['%Y-%m-%d', '%d/%m/%Y']
+
+# Lignes du registre validées et écrites par transaction
+LIGNES_PAR_TRANSACTION = 5000
+
+
+def lire_date(valeur):
+    for format_date in FORMATS_DATE:
+        try:
+            return datetime.strptime(valeur, format_date).date()
+        except ValueError:
+            pass
+    raise ValueError(f'date invalide : {valeur!r}')
+
+
+def cle_enfant(village, numero):
+    # Les numéros repartent de 1 dans chaque registre : la clé est propre au village
+    return 'reg-' + hashlib.sha1(f'{village}|{numero}'.encode()).hexdigest()
+
+
+def cle_vaccin(village, numero, vaccin, administration):
+    # Une même dose inscrite deux fois (ou relue après reprise) a la même clé
+    return 'reg-' + hashlib.sha1(f'{village}|{numero}|{vaccin}|{administration}'.encode()).hexdigest()
+
+
+def nom_reprise(chemin):
+    """Compteur (table Compteur) retenant les lignes déjà importées de ce fichier."""
+    return 'reprise:' + hashlib.sha1(os.path.abspath(chemin).encode()).hexdigest()[:16]
+
+
+def valider(ligne):
+    """Ligne du registre nettoyée ; lève ValueError si elle est inutilisable."""
+    ligne = {colonne: (ligne.get(colonne) or '').strip() for colonne in COLONNES}
+    for colonne in ['village', 'enfant', 'nom', 'date_naissance', 'vaccin', 'date_administration']:
+        if not ligne[colonne]:
+            raise ValueError(f'{colonne} manquant')
+    ligne['sexe'] = ligne['sexe'].upper()
+    if ligne['sexe'] not in SEXES:
+        raise ValueError(f'sexe inconnu : {ligne["sexe"]!r}')
+    ligne['statut'] = ligne['statut'].lower() or 'recu'
+    if ligne['statut'] not in STATUTS:
+        raise ValueError(f'statut inconnu : {ligne["statut"]!r}')
+    ligne['date_naissance'] = lire_date(ligne['date_naissance'])
+    ligne['date_administration'] = lire_date(ligne['date_administration'])
+    if ligne['date_administration'] < ligne['date_naissance']:
+        raise ValueError('vaccin administré avant la naissance')
+    ligne['notes'] = ligne['notes'] or None
+    return ligne
+
+
+def par_tranches(valeurs, taille=TAILLE_BATCH):
+    valeurs = list(valeurs)
+    for i in range(0, len(valeurs), taille):
+        yield valeurs[i:i + taille]
+
+
+class Importateur:
+    """
+    Import d'un registre par transactions de LIGNES_PAR_TRANSACTION lignes. Villages et enfants
+    sont résolus par des dictionnaires en mémoire, complétés par une requête par tranche
+    de clés inconnues ; les doses déjà présentes (même clé) ne sont pas recréées.
+    `rejeter` reçoit, dans la transaction du lot, les (numéro, erreur, ligne) des doses
+    dont la clé désigne un enfant déjà connu sous un autre nom ou une autre date de naissance.
+    """
+
+    def __init__(self, chemin, taille_batch=TAILLE_BATCH, rejeter=None):
+        self.reprise = nom_reprise(chemin)
+        self.taille_batch = taille_batch
+        self.rejeter = rejeter
+        self.villages = dict(Village.objects.values_list('nom', 'id'))
+        # clé client -> (id, village_id, nom, date_naissance)
+        self.enfants = {}
+        # Entrées ajoutées aux dictionnaires pendant la transaction en cours, retirées si elle échoue
+        self.ajouts = []
+        self.totaux = Counter()
+
+    def deja_importees(self):
+        return Compteur.valeur_de(self.reprise)
+
+    def resoudre_villages(self, lignes):
+        for nom in {ligne['village'] for ligne in lignes} - set(self.villages):
+            self.villages[nom] = Village.objects.create(nom=nom).pk
+            self.ajouts.append((self.villages, nom))
+
+    def resoudre_enfants(self, lignes):
+        """
+        Crée les enfants inconnus ; renvoie les lignes dont l'enfant correspond (les autres
+        sont rejetées) et les villages des enfants créés.
+        """
+        inconnus = {}
+        for ligne in lignes:
+            cle = cle_enfant(ligne['village'], ligne['enfant'])
+            if cle not in self.enfants:
+                inconnus.setdefault(cle, ligne)
+        for tranche in par_tranches(inconnus):
+            for cle, *enfant in Enfant.objects.filter(cle_client__in=tranche).values_list(
+                    'cle_client', 'id', 'village_id', 'nom', 'date_naissance'):
+                self.enfants[cle] = tuple(enfant)
+        nouveaux = [(cle, ligne) for cle, ligne in inconnus.items() if cle not in self.enfants]
+        revisions = reserver_revisions(len(nouveaux))
+        crees = Enfant.objects.bulk_create([
+            Enfant(cle_client=cle, nom=ligne['nom'], sexe=ligne['sexe'], date_naissance=ligne['date_naissance'],
+                   village_id=self.villages[ligne['village']], revision=next(revisions))
+            for cle, ligne in nouveaux
+        ], batch_size=self.taille_batch)
+        completer_ids(Enfant, crees)
+        for enfant in crees:
+            self.enfants[enfant.cle_client] = (enfant.pk, enfant.village_id, enfant.nom, enfant.date_naissance)
+            self.ajouts.append((self.enfants, enfant.cle_client))
+        if crees:
+            Compteur.marquer(version_table(Enfant), crees[-1].revision)
+        conformes, rejets = [], []
+        for ligne in lignes:
+            _, village_id, nom, naissance = self.enfants[cle_enfant(ligne['village'], ligne['enfant'])]
+            if (village_id, nom, naissance) == (self.villages[ligne['village']], ligne['nom'], ligne['date_naissance']):
+                conformes.append(ligne)
+            else:
+                rejets.append((ligne['numero'], f'enfant {ligne["enfant"]} déjà inscrit : {nom}, né le {naissance}',
+                               ligne))
+        if rejets and self.rejeter:
+            self.rejeter(rejets)
+        self.rejets_lot = len(rejets)
+        return conformes, Counter(enfant.village_id for enfant in crees)
+
+    def enfant(self, ligne):
+        """(id, village_id) de l'enfant de la ligne, déjà résolu."""
+        return self.enfants[cle_enfant(ligne['village'], ligne['enfant'])][:2]
+
+    def ecrire_vaccins(self, lignes):
+        doses = {}
+        for ligne in lignes:
+            doses.setdefault(
+                cle_vaccin(ligne['village'], ligne['enfant'], ligne['vaccin'], ligne['date_administration']), ligne
+            )
+        existantes = set()
+        for tranche in par_tranches(doses):
+            existantes.update(Vaccin.objects.filter(cle_client__in=tranche).values_list('cle_client', flat=True))
+        nouvelles = [(cle, ligne) for cle, ligne in doses.items() if cle not in existantes]
+        revisions = reserver_revisions(len(nouvelles))
+        vaccins = Vaccin.objects.bulk_create([
+            Vaccin(cle_client=cle, enfant_id=self.enfant(ligne)[0], nom=ligne['vaccin'],
+                   date_administration=ligne['date_administration'], statut=ligne['statut'],
+                   notes=ligne['notes'], revision=next(revisions))
+            for cle, ligne in nouvelles
+        ], batch_size=self.taille_batch)
+        if vaccins:
+            Compteur.marquer(version_table(Vaccin), vaccins[-1].revision)
+        # (village, statut) de chaque dose créée, et nombre de lignes déjà présentes
+        villages = [(self.enfant(ligne)[1], ligne['statut']) for _, ligne in nouvelles]
+        return villages, len(lignes) - len(nouvelles)
+
+    def ecrire(self, lignes, position):
+        """
+        Écrit un lot de lignes validées (avec leur `numero` dans le fichier) et avance la reprise
+        à `position` (lignes lues) dans la même transaction : après une interruption, l'import
+        repart exactement de là.
+        """
+        self.ajouts = []
+        try:
+            with transaction.atomic():
+                self.resoudre_villages(lignes)
+                lignes, enfants_par_village = self.resoudre_enfants(lignes)
+                doses, doublons = self.ecrire_vaccins(lignes)
+                deltas = {
+                    village_id: Counter(nombre_enfants=nombre) for village_id, nombre in enfants_par_village.items()
+                }
+                for village_id, statut in doses:
+                    deltas.setdefault(village_id, Counter())[statistiques.COMPTEURS_STATUT[statut]] += 1
+                for village_id, compte in deltas.items():
+                    statistiques.ajuster(village_id, **compte)
+                Compteur.marquer(self.reprise, position)
+        except Exception:
+            # Annulé avec la transaction : ces identifiants n'existent pas en base
+            for dictionnaire, cle in self.ajouts:
+                dictionnaire.pop(cle, None)
+            raise
+        self.totaux['villages'] += sum(1 for dictionnaire, _ in self.ajouts if dictionnaire is self.villages)
+        self.totaux['enfants'] += sum(enfants_par_village.values())
+        self.totaux['vaccins'] += len(doses)
+        self.totaux['doublons'] += doublons
+        self.totaux['rejets'] += self.rejets_lot
+
+
+def lire_registre(fichier, deja_importees=0):
+    """(numéro de ligne, dict) des lignes du CSV, en sautant celles déjà importées."""
+    lecteur = csv.DictReader(fichier)
+    manquantes = set(COLONNES) - {'statut', 'notes'} - set(lecteur.fieldnames or [])
+    if manquantes:
+        raise ValueError(f'colonnes manquantes : {", ".join(sorted(manquantes))}')
+    return ((numero, ligne) for numero, ligne in enumerate(lecteur, start=1) if numero > deja_importees)
+
+
+def journaliser_rejets(chemin, rejets):
+    """Ajoute les lignes rejetées (numéro, erreur, ligne) au CSV `chemin`."""
+    nouveau = not os.path.exists(chemin) or not os.path.getsize(chemin)
+    with open(chemin, 'a', encoding='utf-8', newline='') as fichier:
+        ecrivain = csv.writer(fichier)
+        if nouveau:
+            ecrivain.writerow(['ligne', 'erreur', *COLONNES])
+        for numero, erreur, ligne in rejets:
+            ecrivain.writerow([numero, erreur, *(ligne.get(colonne) or '' for colonne in COLONNES)])
@@ -0,0 +1,144 @@
+import threading
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Case, CharField, Count, Q, Value, When
+from django.utils import timezone
+
+from . import couverture
+from .models import DoseCalendrier, Enfant, RendezVous
+
+# Statut d'un rendez-vous par rapport à aujourd'hui
+A_VENIR, DU, EN_RETARD = 'a_venir', 'du', 'en_retard'
+STATUTS = (A_VENIR, DU, EN_RETARD)
+
+# Rendez-vous par bulk_create, et enfants recalculés par requête quand la liste est donnée
+TAILLE_BATCH = 1000
+TAILLE_TRANCHE = 500
+
+# Enfants à recalculer au prochain commit, par thread (une connexion par thread)
+_en_attente = threading.local()
+
+
+def calendrier():
+    """[(vaccin, dose, décalage, tolérance)] dans l'ordre du calendrier."""
+    return [
+        (vaccin, dose, timedelta(days=age), timedelta(days=tolerance))
+        for vaccin, dose, age, tolerance in DoseCalendrier.objects.order_by('age_jours', 'vaccin', 'dose')
+        .values_list('vaccin', 'dose', 'age_jours', 'tolerance_jours')
+    ]
+
+
+def doses_recues(enfants, vaccins):
+    """
+    (id, village_id, date_naissance, reçus du 1er vaccin, du 2e...) pour chaque enfant :
+    un seul GROUP BY sur la jointure enfants-vaccins, lu par lots.
+    """
+    comptes = {
+        f'recus_{index}': Count('vaccins', filter=Q(vaccins__nom=vaccin, vaccins__statut='recu'))
+        for index, vaccin in enumerate(vaccins)
+    }
+    return enfants.order_by().values_list('id', 'village_id', 'date_naissance').annotate(**comptes) \
+        .iterator(chunk_size=TAILLE_BATCH)
+
+
+def rendez_vous(lignes, doses, index):
+    """Rendez-vous (non enregistrés) des doses pas encore reçues, déduits des comptes de doses_recues."""
+    for enfant_id, village_id, naissance, *recus in lignes:
+        prochaine = True
+        for vaccin, dose, decalage, tolerance in doses:
+            # La n-ième dose reçue d'un vaccin vaut pour la n-ième dose du calendrier
+            if recus[index[vaccin]] >= dose:
+                continue
+            prevue = naissance + decalage
+            yield RendezVous(
+                enfant_id=enfant_id, village_id=village_id, vaccin=vaccin, dose=dose,
+                date_prevue=prevue, date_limite=prevue + tolerance, prochaine=prochaine,
+            )
+            prochaine = False
+
+
+def ecrire(modele, objets, taille_batch=TAILLE_BATCH):
+    """bulk_create des `objets` par lots de `taille_batch` ; renvoie le nombre écrit."""
+    ecrits = 0
+    lot = []
+    for objet in objets:
+        lot.append(objet)
+        if len(lot) >= taille_batch:
+            modele.objects.bulk_create(lot)
+            ecrits += len(lot)
+            lot = []
+    modele.objects.bulk_create(lot)
+    return ecrits + len(lot)
+
+
+def calculer(enfants=None, taille_batch=TAILLE_BATCH):
+    """
+    Recalcule la table des rendez-vous pour toute la population, ou pour les enfants
+    d'identifiants `enfants`, en une transaction : une requête d'agrégation pour lire
+    les doses reçues, puis des bulk_create. Les colonnes de couverture des mêmes enfants
+    sont recalculées dans la foulée. Renvoie le nombre de rendez-vous écrits.
+    """
+    doses = calendrier()
+    vaccins = sorted({vaccin for vaccin, *_ in doses})
+    index = {vaccin: i for i, vaccin in enumerate(vaccins)}
+    if enfants is None:
+        tranches = [None]
+    else:
+        enfants = sorted(set(enfants))
+        tranches = [enfants[i:i + TAILLE_TRANCHE] for i in range(0, len(enfants), TAILLE_TRANCHE)]
+
+    ecrits = 0
+    with transaction.atomic():
+        for tranche in tranches:
+            if tranche is None:
+                RendezVous.objects.all().delete()
+                lignes = doses_recues(Enfant.objects.all(), vaccins)
+            else:
+                RendezVous.objects.filter(enfant_id__in=tranche).delete()
+                lignes = doses_recues(Enfant.objects.filter(pk__in=tranche), vaccins)
+            ecrits += ecrire(RendezVous, rendez_vous(lignes, doses, index), taille_batch)
+            couverture.recalculer(tranche)
+        couverture.publier(enfants)
+    return ecrits
+
+
+def _recalculer_en_attente():
+    enfants = getattr(_en_attente, 'enfants', None)
+    _en_attente.enfants = set()
+    if enfants:
+        calculer(enfants)
+
+
+def recalculer_apres_commit(*enfants):
+    """
+    Recalcul des enfants donnés une fois la transaction en cours validée. Les enfants d'une
+    même transaction (suppression en cascade, lot) sont recalculés ensemble par le premier
+    rappel ; ceux d'une transaction annulée le sont au commit suivant, sans effet.
+    """
+    # L'identifiant peut venir de l'URL (vaccins imbriqués) : chaîne ramenée à un entier
+    enfants = {int(enfant) for enfant in enfants if enfant is not None}
+    if enfants:
+        if not hasattr(_en_attente, 'enfants'):
+            _en_attente.enfants = set()
+        _en_attente.enfants.update(enfants)
+        transaction.on_commit(_recalculer_en_attente)
+
+
+def avec_statut(queryset, aujourd_hui=None):
+    aujourd_hui = aujourd_hui or timezone.localdate()
+    return queryset.annotate(statut=Case(
+        When(date_limite__lt=aujourd_hui, then=Value(EN_RETARD)),
+        When(date_prevue__gt=aujourd_hui, then=Value(A_VENIR)),
+        default=Value(DU),
+        output_field=CharField(),
+    ))
+
+
+def filtre_statut(statut, aujourd_hui=None):
+    aujourd_hui = aujourd_hui or timezone.localdate()
+    return {
+        EN_RETARD: Q(date_limite__lt=aujourd_hui),
+        DU: Q(date_prevue__lte=aujourd_hui, date_limite__gte=aujourd_hui),
+        A_VENIR: Q(date_prevue__gt=aujourd_hui),
+    }[statut]
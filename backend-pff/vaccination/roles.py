@@ -0,0 +1,50 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Profile
+
+TAILLE_BATCH = 2000
+LIBELLES = dict(Profile.USER_ROLES)
+SANS_PROFIL = 'Aucun profil'
+
+
+def libelle(role):
+    return SANS_PROFIL if role is None else LIBELLES.get(role, role)
+
+
+def compter_roles():
+    """{rôle ou None (sans profil): nombre d'utilisateurs}, en un GROUP BY sur la jointure externe."""
+    return {
+        ligne['profile__role']: ligne['nombre']
+        for ligne in User.objects.values('profile__role').annotate(nombre=Count('id')).order_by('profile__role')
+    }
+
+
+def lister_utilisateurs(taille=TAILLE_BATCH):
+    """(id, username, email, rôle) de chaque utilisateur, lus par blocs sans tout charger."""
+    return (
+        User.objects.order_by('id')
+        .values_list('id', 'username', 'email', 'profile__role')
+        .iterator(chunk_size=taille)
+    )
+
+
+def creer_profils_manquants(role='parent', taille=TAILLE_BATCH):
+    """
+    Crée les profils absents (anti-jointure) par bulk_create, en une transaction ; renvoie le
+    nombre créé. Sans ignore_conflicts, ce nombre est exact : un profil créé entre-temps par un
+    autre processus lève IntegrityError et annule tout.
+    """
+    ids = User.objects.filter(profile__isnull=True).order_by('id').values_list('id', flat=True)
+    crees = 0
+    lot = []
+    with transaction.atomic():
+        for user_id in ids.iterator(chunk_size=taille):
+            lot.append(Profile(user_id=user_id, role=role))
+            if len(lot) == taille:
+                crees += len(Profile.objects.bulk_create(lot))
+                lot = []
+        if lot:
+            crees += len(Profile.objects.bulk_create(lot))
+    return crees
@@ -0,0 +1,118 @@
+import hashlib
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from . import cache
+
+# Base de lecture de la requête en cours (None : base principale)
+_base_lecture = ContextVar('base_lecture', default=None)
+
+METHODES_SURES = ('GET', 'HEAD', 'OPTIONS')
+COOKIE_COLLANT = 'ecriture_recente'
+
+
+def alias_replique():
+    """Alias de la réplique déclarée dans settings.DATABASES, ou None."""
+    alias = getattr(settings, 'REPLIQUE_ALIAS', None)
+    return alias if alias and alias != DEFAULT_DB_ALIAS else None
+
+
+def delai_collant():
+    """Durée (secondes) pendant laquelle un client qui vient d'écrire lit la base principale."""
+    return getattr(settings, 'REPLIQUE_DELAI_COLLANT', 30)
+
+
+def base_lecture():
+    return _base_lecture.get()
+
+
+def identite(request):
+    """Client à l'origine de la requête : jeton d'authentification ou cookie de session."""
+    valeur = request.META.get('HTTP_AUTHORIZATION') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not valeur:
+        return None
+    return 'collant:' + hashlib.sha256(valeur.encode()).hexdigest()
+
+
+def ecriture_recente(request):
+    if COOKIE_COLLANT in request.COOKIES:
+        return True
+    cle = identite(request)
+    return cle is not None and cache.stockage().get(cle) is not None
+
+
+def marquer_ecriture(request, response):
+    """Lectures suivantes de ce client sur la base principale : il relit ce qu'il vient d'écrire."""
+    response.set_cookie(COOKIE_COLLANT, '1', max_age=delai_collant(), httponly=True, samesite='Lax')
+    cle = identite(request)
+    if cle is not None:
+        cache.stockage().set(cle, 1, delai_collant())
+
+
+class RoutageMiddleware:
+    """
+    Oriente vers la réplique les lectures des vues qui l'acceptent (attribut `lecture_replique`),
+    sauf pour un client ayant écrit depuis moins de REPLIQUE_DELAI_COLLANT secondes.
+    Les écritures et les autres vues restent sur la base principale.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        jeton = _base_lecture.set(None)
+        try:
+            response = self.get_response(request)
+        finally:
+            _base_lecture.reset(jeton)
+        return self.apres_ecriture(request, response)
+
+    async def __acall__(self, request):
+        jeton = _base_lecture.set(None)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _base_lecture.reset(jeton)
+        return self.apres_ecriture(request, response)
+
+    def apres_ecriture(self, request, response):
+        if request.method not in METHODES_SURES and response.status_code < 400 and alias_replique():
+            marquer_ecriture(request, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Vue DRF (`cls`) ou vue Django, asynchrone comprise (`view_class`)
+        vue = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+        alias = alias_replique()
+        if (alias and request.method in METHODES_SURES and getattr(vue, 'lecture_replique', False)
+                and not ecriture_recente(request)):
+            _base_lecture.set(alias)
+
+
+class RoutageLectureEcriture:
+    """Routeur : lectures de l'application vaccination sur la base choisie par RoutageMiddleware."""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == 'vaccination':
+            return base_lecture()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # La réplique contient les mêmes lignes : les relations entre bases sont légitimes
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # La réplique reçoit le schéma par réplication (repliquer_base)
+        return db == DEFAULT_DB_ALIAS
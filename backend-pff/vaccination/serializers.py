@@ -1,5 +1,19 @@
+import inspect
+
 from rest_framework import serializers
-from .models import Village, Enfant, Vaccin
+from rest_framework.reverse import reverse
+from . import export
+from .models import Village, Enfant, Vaccin, StatistiqueVillage, RendezVous, Tache
+from .taches import TACHES
+
+class ChampsDynamiquesMixin:
+    """Accepte `champs` : ensemble des champs à conserver (None = tous)."""
+
+    def __init__(self, *args, champs=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if champs is not None:
+            for nom in set(self.fields) - set(champs):
+                self.fields.pop(nom)
 
 class VillageSerializer(serializers.ModelSerializer):
     class Meta:
@@ -9,13 +23,124 @@ class VillageSerializer(serializers.ModelSerializer):
 class VaccinSerializer(serializers.ModelSerializer):
     class Meta:
         model = Vaccin
+        fields = ['id', 'enfant', 'nom', 'date_administration', 'statut', 'notes']
+
+class VaccinImbriqueSerializer(VaccinSerializer):
+    """Vaccin vu depuis un enfant (fiche, /enfants/<id>/vaccins/) : `enfant` est implicite."""
+    class Meta(VaccinSerializer.Meta):
         fields = ['id', 'nom', 'date_administration', 'statut', 'notes']
 
-class EnfantSerializer(serializers.ModelSerializer):
+class EnfantSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     village = VillageSerializer(read_only=True)
     village_id = serializers.PrimaryKeyRelatedField(queryset=Village.objects.all(), source='village', write_only=True)
-    vaccins = VaccinSerializer(many=True, read_only=True)
+    vaccins = VaccinImbriqueSerializer(many=True, read_only=True)
 
     class Meta:
         model = Enfant
-        fields = ['id', 'nom', 'sexe', 'village', 'village_id', 'date_naissance', 'vaccins'] 
\ No newline at end of file
+        fields = [
+            'id', 'nom', 'sexe', 'village', 'village_id', 'date_naissance', 'taux_couverture',
+            'vaccins_recus', 'vaccins_retard', 'doses_manquantes', 'prochaine_echeance', 'vaccins',
+        ]
+
+class StatistiqueVillageSerializer(serializers.ModelSerializer):
+    village_id = serializers.IntegerField(read_only=True)
+    village = serializers.CharField(source='village.nom', read_only=True)
+    taux_couverture = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = StatistiqueVillage
+        fields = ['village_id', 'village', 'nombre_enfants', 'vaccins_recus', 'vaccins_retard', 'taux_couverture']
+
+class TacheSerializer(serializers.ModelSerializer):
+    """Tâche différée ; seuls `nom` et `parametres` sont fournis à la création."""
+    parametres = serializers.DictField(required=False)
+    # Dernière ligne de l'erreur (message de l'exception), sans la trace
+    erreur = serializers.SerializerMethodField()
+    fichier = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Tache
+        fields = [
+            'id', 'nom', 'parametres', 'statut', 'progression', 'message', 'resultat', 'erreur', 'fichier',
+            'tentatives', 'tentatives_max', 'cree_le', 'executer_apres', 'debut', 'fin',
+        ]
+        read_only_fields = [champ for champ in fields if champ not in ('nom', 'parametres')]
+
+    def validate_nom(self, nom):
+        if nom not in TACHES or not TACHES[nom].api:
+            raise serializers.ValidationError(f'Tâche inconnue : {nom}.')
+        return nom
+
+    def validate(self, attrs):
+        # Paramètres vérifiés contre la signature de la tâche dès la demande
+        try:
+            inspect.signature(TACHES[attrs['nom']].fonction).bind(None, **attrs.get('parametres', {}))
+        except TypeError as erreur:
+            raise serializers.ValidationError({'parametres': [str(erreur)]})
+        if attrs['nom'] == 'exporter_enfants':
+            # Filtres invalides refusés ici plutôt qu'à l'exécution
+            export.filtres(attrs.get('parametres', {}).get('filtres') or {})
+        return attrs
+
+    def get_erreur(self, tache):
+        lignes = tache.erreur.strip().splitlines()
+        return lignes[-1] if lignes else ''
+
+    def get_fichier(self, tache):
+        if tache.statut != Tache.TERMINEE or not (tache.resultat or {}).get('fichier'):
+            return None
+        return reverse('tache-fichier', args=[tache.pk], request=self.context.get('request'))
+
+class RendezVousSerializer(serializers.ModelSerializer):
+    enfant_nom = serializers.CharField(source='enfant.nom', read_only=True)
+    village = serializers.CharField(source='village.nom', read_only=True)
+    statut = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = RendezVous
+        fields = [
+            'id', 'enfant_id', 'enfant_nom', 'village_id', 'village', 'vaccin', 'dose',
+            'date_prevue', 'date_limite', 'statut', 'prochaine',
+        ]
+
+# Envoi en lot : serializers simples (pas de ModelSerializer) pour éviter une requête
+# de validation par ligne ; les contrôles qui touchent la base sont faits une fois pour le lot.
+
+class VaccinLotSerializer(serializers.Serializer):
+    cle = serializers.CharField(max_length=64)
+    nom = serializers.CharField(max_length=100)
+    date_administration = serializers.DateField()
+    statut = serializers.ChoiceField(choices=Vaccin.STATUT_CHOICES)
+    notes = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+
+class EnfantLotListSerializer(serializers.ListSerializer):
+
+    def validate(self, attrs):
+        villages = set(Village.objects.filter(id__in={e['village_id'] for e in attrs}).values_list('id', flat=True))
+        cles = set()
+        # Erreurs indexées par position dans le lot, comme les erreurs de champ de DRF
+        erreurs = {}
+        for position, enfant in enumerate(attrs):
+            erreur = {}
+            if enfant['village_id'] not in villages:
+                erreur['village_id'] = [f"Village {enfant['village_id']} inconnu."]
+            for cle in [enfant['cle']] + [v['cle'] for v in enfant.get('vaccins', [])]:
+                if cle in cles:
+                    erreur.setdefault('cle', []).append(f'Clé {cle} en double dans le lot.')
+                cles.add(cle)
+            if erreur:
+                erreurs[position] = erreur
+        if erreurs:
+            raise serializers.ValidationError(erreurs)
+        return attrs
+
+class EnfantLotSerializer(serializers.Serializer):
+    cle = serializers.CharField(max_length=64)
+    nom = serializers.CharField(max_length=100)
+    sexe = serializers.ChoiceField(choices=Enfant.SEXE_CHOICES)
+    village_id = serializers.IntegerField()
+    date_naissance = serializers.DateField()
+    vaccins = VaccinLotSerializer(many=True, required=False)
+
+    class Meta:
+        list_serializer_class = EnfantLotListSerializer
@@ -0,0 +1,164 @@
+from django.db.models.signals import pre_save, post_save, post_delete, post_migrate
+from django.db import connections, transaction
+from django.dispatch import receiver
+from django.utils import timezone
+
+from rest_framework.authtoken.models import Token
+
+from . import cache, couverture, recherche, rendez_vous, statistiques, taches
+from .authentification import revoquer, revoquer_utilisateur
+from .synchronisation import enregistrer_suppression
+from .models import Village, Enfant, Vaccin, StatistiqueVillage, Profile, DoseCalendrier, version_table
+
+# Mise à jour incrémentale de StatistiqueVillage : chaque écriture coûte O(1) requêtes.
+# Les opérations en masse (update(), bulk_create) contournent les signaux :
+# lancer ensuite `manage.py recalculer_statistiques`.
+
+
+@receiver(post_save, sender=Village)
+def creer_statistique_village(sender, instance, created, **kwargs):
+    if created:
+        StatistiqueVillage.objects.get_or_create(village=instance)
+
+
+@receiver(pre_save, sender=Enfant)
+def memoriser_village_enfant(sender, instance, **kwargs):
+    if not instance._state.adding and instance.pk:
+        instance._village_precedent = (
+            Enfant.objects.filter(pk=instance.pk).values_list('village_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Enfant)
+def statistiques_enfant_enregistre(sender, instance, created, **kwargs):
+    if created:
+        statistiques.ajuster(instance.village_id, nombre_enfants=1)
+        return
+    ancien = getattr(instance, '_village_precedent', None)
+    if ancien is None or ancien == instance.village_id:
+        return
+    # Changement de village : l'enfant emporte ses vaccins
+    compte = statistiques.compter_vaccins(instance.vaccins.all())
+    statistiques.ajuster(
+        ancien,
+        nombre_enfants=-1,
+        vaccins_recus=-compte['vaccins_recus'],
+        vaccins_retard=-compte['vaccins_retard'],
+    )
+    statistiques.ajuster(instance.village_id, nombre_enfants=1, **compte)
+
+
+@receiver(post_delete, sender=Enfant)
+def statistiques_enfant_supprime(sender, instance, **kwargs):
+    # Les vaccins supprimés en cascade ont déjà décompté leurs propres compteurs
+    statistiques.ajuster(instance.village_id, recalculer=False, nombre_enfants=-1)
+
+
+@receiver(pre_save, sender=Vaccin)
+def memoriser_etat_vaccin(sender, instance, **kwargs):
+    if not instance._state.adding and instance.pk:
+        instance._etat_precedent = (
+            Vaccin.objects.filter(pk=instance.pk).values_list('enfant_id', 'statut').first()
+        )
+
+
+@receiver(post_save, sender=Vaccin)
+def statistiques_vaccin_enregistre(sender, instance, created, **kwargs):
+    if not created:
+        ancien = getattr(instance, '_etat_precedent', None)
+        if ancien is None or ancien == (instance.enfant_id, instance.statut):
+            return
+        enfant_id, statut = ancien
+        statistiques.ajuster_par_enfant(enfant_id, **statistiques.deltas_vaccin(statut, -1))
+        couverture.ajuster(enfant_id, **statistiques.deltas_vaccin(statut, -1))
+    statistiques.ajuster_par_enfant(instance.enfant_id, **statistiques.deltas_vaccin(instance.statut))
+    couverture.ajuster(instance.enfant_id, **statistiques.deltas_vaccin(instance.statut))
+
+
+@receiver(post_delete, sender=Vaccin)
+def toucher_enfant(sender, instance, **kwargs):
+    # La fiche de l'enfant change : Last-Modified doit avancer (sans nouvelle révision)
+    Enfant.objects.filter(pk=instance.enfant_id).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=Vaccin)
+def statistiques_vaccin_supprime(sender, instance, **kwargs):
+    statistiques.ajuster_par_enfant(
+        instance.enfant_id, recalculer=False, **statistiques.deltas_vaccin(instance.statut, -1)
+    )
+    couverture.ajuster(instance.enfant_id, **statistiques.deltas_vaccin(instance.statut, -1))
+
+
+# Pierres tombales pour la synchronisation ; post_delete s'exécute dans la transaction
+# de la suppression, cascades comprises.
+@receiver(post_delete, sender=Village)
+@receiver(post_delete, sender=Enfant)
+@receiver(post_delete, sender=Vaccin)
+def tracer_suppression(sender, instance, **kwargs):
+    enregistrer_suppression(instance)
+
+
+# Cache des réponses : chaque écriture renouvelle les générations des réponses touchées
+@receiver(post_save, sender=Village)
+@receiver(post_delete, sender=Village)
+def invalider_cache_village(sender, instance, **kwargs):
+    cache.invalider(version_table(Village))
+
+
+@receiver(post_save, sender=Enfant)
+@receiver(post_delete, sender=Enfant)
+def invalider_cache_enfant(sender, instance, **kwargs):
+    cache.invalider(version_table(Enfant), f'enfant:{instance.pk}')
+
+
+@receiver(post_save, sender=Vaccin)
+@receiver(post_delete, sender=Vaccin)
+def invalider_cache_vaccin(sender, instance, **kwargs):
+    # Un vaccin déplacé change aussi la fiche de son ancien enfant
+    ancien = getattr(instance, '_etat_precedent', None)
+    cache.invalider(
+        version_table(Vaccin), f'vaccin:{instance.pk}', f'enfant:{instance.enfant_id}',
+        f'enfant:{ancien[0]}' if ancien and ancien[0] != instance.enfant_id else None,
+    )
+
+
+# Rendez-vous : recalculés après le commit pour l'enfant concerné (et l'ancien enfant d'un
+# vaccin déplacé), ou pour toute la population quand le calendrier change ; le recalcul
+# complète la couverture des enfants (doses manquantes, prochaine échéance)
+@receiver(post_save, sender=Enfant)
+def rendez_vous_enfant(sender, instance, **kwargs):
+    rendez_vous.recalculer_apres_commit(instance.pk)
+
+
+@receiver(post_save, sender=Vaccin)
+@receiver(post_delete, sender=Vaccin)
+def rendez_vous_vaccin(sender, instance, **kwargs):
+    ancien = getattr(instance, '_etat_precedent', None)
+    rendez_vous.recalculer_apres_commit(instance.enfant_id, ancien[0] if ancien else None)
+
+
+@receiver(post_save, sender=DoseCalendrier)
+@receiver(post_delete, sender=DoseCalendrier)
+def rendez_vous_calendrier(sender, instance, **kwargs):
+    # Toute la population est recalculée : par le travailleur, pas dans la requête de l'admin.
+    # Plusieurs doses modifiées avant son passage ne donnent qu'un recalcul.
+    transaction.on_commit(lambda: taches.mettre_en_file('recalculer_rendez_vous', unique=True))
+
+
+# Cache d'authentification : déconnexion et changement de rôle (ou de mot de passe,
+# User.save() enregistrant aussi le profil) retirent les tokens de l'utilisateur
+@receiver(post_delete, sender=Token)
+def revoquer_token(sender, instance, **kwargs):
+    revoquer(instance.key)
+
+
+@receiver(post_save, sender=Profile)
+def revoquer_tokens_profil(sender, instance, **kwargs):
+    revoquer_utilisateur(instance.user_id)
+
+
+@receiver(post_migrate)
+def reparer_recherche(sender, using, **kwargs):
+    # Les déclencheurs de l'index de recherche ne survivent pas à une reconstruction de table
+    if sender.name == 'vaccination':
+        recherche.reparer(connections[using])
@@ -0,0 +1,82 @@
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from .models import Village, Enfant, Vaccin, StatistiqueVillage
+
+# Compteur de StatistiqueVillage correspondant à chaque statut de vaccin
+COMPTEURS_STATUT = {
+    'recu': 'vaccins_recus',
+    'retard': 'vaccins_retard',
+}
+
+
+def deltas_vaccin(statut, signe=1):
+    champ = COMPTEURS_STATUT.get(statut)
+    return {champ: signe} if champ else {}
+
+
+def ajuster(village_id, recalculer=True, **deltas):
+    """
+    Incrémente les compteurs d'un village en une seule requête UPDATE.
+    `recalculer=False` pour les suppressions : pendant une cascade depuis Village,
+    la ligne de statistiques peut déjà avoir disparu et ne doit pas être recréée.
+    """
+    deltas = {champ: delta for champ, delta in deltas.items() if delta}
+    if village_id is None or not deltas:
+        return
+    lignes = StatistiqueVillage.objects.filter(village_id=village_id).update(
+        **{champ: F(champ) + delta for champ, delta in deltas.items()}
+    )
+    if not lignes and recalculer:
+        # Ligne absente (village créé hors signaux) : on la reconstruit depuis les tables
+        recalculer_village(village_id)
+
+
+def ajuster_par_enfant(enfant_id, recalculer=True, **deltas):
+    """Comme ajuster(), pour le village de l'enfant donné."""
+    village_id = Enfant.objects.filter(pk=enfant_id).values_list('village_id', flat=True).first()
+    ajuster(village_id, recalculer=recalculer, **deltas)
+
+
+def compter_vaccins(vaccins):
+    """Compteurs recus/retard d'un queryset de vaccins, en une requête agrégée."""
+    return vaccins.aggregate(
+        vaccins_recus=Count('id', filter=Q(statut='recu')),
+        vaccins_retard=Count('id', filter=Q(statut='retard')),
+    )
+
+
+def recalculer_village(village_id):
+    village = Village.objects.filter(pk=village_id).first()
+    if village is None:
+        return
+    valeurs = compter_vaccins(Vaccin.objects.filter(enfant__village_id=village_id))
+    valeurs['nombre_enfants'] = village.enfants.count()
+    StatistiqueVillage.objects.update_or_create(village=village, defaults=valeurs)
+
+
+def reconstruire():
+    """Reconstruit entièrement la table de statistiques avec deux requêtes GROUP BY."""
+    enfants = dict(
+        Enfant.objects.values('village_id').annotate(n=Count('id')).values_list('village_id', 'n')
+    )
+    vaccins = {
+        ligne['enfant__village_id']: ligne
+        for ligne in Vaccin.objects.values('enfant__village_id').annotate(
+            recus=Count('id', filter=Q(statut='recu')),
+            retard=Count('id', filter=Q(statut='retard')),
+        )
+    }
+    lignes = []
+    for village_id in Village.objects.values_list('id', flat=True).iterator():
+        compte = vaccins.get(village_id, {})
+        lignes.append(StatistiqueVillage(
+            village_id=village_id,
+            nombre_enfants=enfants.get(village_id, 0),
+            vaccins_recus=compte.get('recus', 0),
+            vaccins_retard=compte.get('retard', 0),
+        ))
+    with transaction.atomic():
+        StatistiqueVillage.objects.all().delete()
+        StatistiqueVillage.objects.bulk_create(lignes, batch_size=1000)
+    return len(lignes)
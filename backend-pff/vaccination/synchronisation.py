@@ -0,0 +1,68 @@
+from django.db import transaction
+
+from .models import REVISION, Compteur, Village, Enfant, Vaccin, Suppression, version_table
+
+# Colonnes transmises pour chaque modèle, à plat : les clients reconstruisent les relations
+CHAMPS_SYNCHRONISES = {
+    'villages': (Village, ['id', 'nom', 'revision', 'updated_at']),
+    'enfants': (Enfant, ['id', 'nom', 'sexe', 'village_id', 'date_naissance', 'revision', 'updated_at']),
+    'vaccins': (Vaccin, ['id', 'enfant_id', 'nom', 'date_administration', 'statut', 'notes', 'revision', 'updated_at']),
+}
+
+LIMITE_PAR_DEFAUT = 1000
+
+
+class TokenInvalide(ValueError):
+    pass
+
+
+def lire_token(valeur):
+    """Le token est la dernière révision reçue par le client ; absent = synchronisation complète."""
+    if valeur in (None, ''):
+        return 0
+    if not valeur.isdigit():
+        raise TokenInvalide('Token de synchronisation invalide.')
+    return int(valeur)
+
+
+def enregistrer_suppression(instance):
+    revision = Compteur.incrementer(REVISION)
+    Suppression.objects.create(modele=instance._meta.model_name, objet_id=instance.pk, revision=revision)
+    Compteur.marquer(version_table(instance), revision)
+
+
+def changements(depuis, limite=LIMITE_PAR_DEFAUT):
+    """
+    Lignes modifiées ou supprimées dont la révision est > `depuis`, lues dans une seule
+    transaction. Si plus de `limite` changements sont en attente, le lot est coupé à la
+    `limite`-ième révision et `complet` vaut False : le client rappelle avec le nouveau token.
+    """
+    with transaction.atomic():
+        haut = Compteur.valeur_de(REVISION)
+        if depuis > haut:
+            raise TokenInvalide('Token postérieur à la dernière révision du serveur.')
+
+        lignes = []
+        for cle, (modele, champs) in CHAMPS_SYNCHRONISES.items():
+            requete = modele.objects.filter(revision__gt=depuis, revision__lte=haut).order_by('revision')
+            lignes.extend((ligne['revision'], cle, ligne) for ligne in requete.values(*champs)[:limite + 1])
+        suppressions = (
+            Suppression.objects.filter(revision__gt=depuis, revision__lte=haut)
+            .order_by('revision').values('revision', 'modele', 'objet_id')[:limite + 1]
+        )
+        lignes.extend((ligne['revision'], 'suppressions', ligne) for ligne in suppressions)
+
+    lignes.sort(key=lambda element: element[0])
+    complet = len(lignes) <= limite
+    if not complet:
+        lignes = lignes[:limite]
+        haut = lignes[-1][0]
+
+    lot = {cle: [] for cle in CHAMPS_SYNCHRONISES}
+    lot['suppressions'] = {nom: [] for nom in ['village', 'enfant', 'vaccin']}
+    for _, cle, ligne in lignes:
+        if cle == 'suppressions':
+            lot['suppressions'].setdefault(ligne['modele'], []).append(ligne['objet_id'])
+        else:
+            lot[cle].append(ligne)
+    return {'token': str(haut), 'complet': complet, **lot}
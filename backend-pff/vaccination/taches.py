@@ -0,0 +1,264 @@
+import io
+import signal
+import time
+import traceback
+from collections import namedtuple
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import OperationalError, connections
+from django.db.models import F
+from django.utils import timezone
+
+from . import couverture, export, rendez_vous, statistiques
+from .models import Enfant, Tache
+from .verrous import base_verrouillee, reessayer_si_verrouillee
+
+# Tâches différées, exécutées par `manage.py travailleur` dans des processus à part : la
+# file est la table Tache, sans courtier externe. Une tâche est réservée par un UPDATE
+# conditionnel (statut en attente -> en cours), que deux travailleurs ne peuvent pas réussir
+# tous les deux ; chaque écriture suivante vérifie que la tentative est toujours la sienne.
+
+# fonction(execution, **parametres) -> résultat JSON ; `api` : peut être demandée par POST /api/taches/
+Definition = namedtuple('Definition', 'fonction tentatives delai api')
+TACHES = {}
+
+# Attente avant la deuxième tentative, doublée ensuite (secondes)
+DELAI_REPRISE = 30
+# Une tâche en cours dont l'échéance est dépassée de plus que cette marge a perdu son travailleur
+MARGE_EXPIRATION = 60
+# Intervalle minimal entre deux écritures de l'avancement (secondes)
+INTERVALLE_PROGRESSION = 1.0
+
+
+class TacheInconnue(ValueError):
+    pass
+
+
+def tache(nom, tentatives=3, delai=600, api=False):
+    """Enregistre une fonction comme tâche `nom` ; `delai` : durée maximale d'une tentative."""
+    def enregistrer(fonction):
+        TACHES[nom] = Definition(fonction, tentatives, delai, api)
+        return fonction
+    return enregistrer
+
+
+def dossier_fichiers():
+    """Dossier des fichiers produits par les tâches (exports)."""
+    dossier = Path(settings.TACHES_DOSSIER)
+    dossier.mkdir(parents=True, exist_ok=True)
+    return dossier
+
+
+@reessayer_si_verrouillee
+def mettre_en_file(nom, parametres=None, demandeur=None, apres=None, unique=False):
+    """
+    Ajoute une tâche à la file et la renvoie ; appelable depuis une vue comme depuis une commande.
+    `unique` : une tâche identique pas encore commencée suffit (recalculs complets), elle est renvoyée.
+    """
+    if nom not in TACHES:
+        raise TacheInconnue(f'Tâche inconnue : {nom}.')
+    if unique:
+        for tache in Tache.objects.filter(nom=nom, statut=Tache.EN_ATTENTE, tentatives=0).order_by('id'):
+            if tache.parametres == (parametres or {}):
+                return tache
+    definition = TACHES[nom]
+    return Tache.objects.create(
+        nom=nom, parametres=parametres or {}, demandeur=demandeur,
+        tentatives_max=definition.tentatives, delai_max=definition.delai,
+        executer_apres=apres or timezone.now(),
+    )
+
+
+@reessayer_si_verrouillee
+def reserver(travailleur, nombre, noms=None, echeance=True):
+    """
+    Réserve jusqu'à `nombre` tâches prêtes, les plus anciennes d'abord ; renvoie
+    les (id, tentative, délai maximal) obtenus. Chaque UPDATE ne réussit que si la tâche est encore en attente.
+    Sans `echeance` (exécution dans le processus du travailleur, jamais arrêtée), expire_le reste
+    vide : aucun autre travailleur ne reprend la tâche pendant qu'elle s'exécute.
+    """
+    maintenant = timezone.now()
+    candidates = Tache.objects.filter(statut=Tache.EN_ATTENTE, executer_apres__lte=maintenant)
+    if noms:
+        candidates = candidates.filter(nom__in=noms)
+    reservees = []
+    for pk, tentatives, delai in candidates.order_by('executer_apres', 'id').values_list(
+            'id', 'tentatives', 'delai_max')[:nombre * 2]:
+        if len(reservees) == nombre:
+            break
+        if Tache.objects.filter(pk=pk, statut=Tache.EN_ATTENTE, tentatives=tentatives).update(
+                statut=Tache.EN_COURS, tentatives=F('tentatives') + 1, travailleur=travailleur,
+                debut=maintenant, expire_le=maintenant + timedelta(seconds=delai) if echeance else None,
+                progression=0.0, message=''):
+            reservees.append((pk, tentatives + 1, delai))
+    return reservees
+
+
+def _tentative(pk, tentative):
+    """La tâche, tant que cette tentative est celle en cours."""
+    return Tache.objects.filter(pk=pk, statut=Tache.EN_COURS, tentatives=tentative)
+
+
+@reessayer_si_verrouillee
+def terminer(pk, tentative, resultat):
+    return _tentative(pk, tentative).update(
+        statut=Tache.TERMINEE, resultat=resultat, progression=100.0, erreur='', fin=timezone.now(),
+    )
+
+
+@reessayer_si_verrouillee
+def echouer(pk, tentative, erreur):
+    """
+    Échec d'une tentative : la tâche repasse en attente, avec un délai croissant, tant
+    qu'il reste des tentatives, et échoue définitivement sinon.
+    """
+    tache = _tentative(pk, tentative).values('tentatives_max').first()
+    if tache is None:
+        return 0
+    maintenant = timezone.now()
+    if tentative < tache['tentatives_max']:
+        return _tentative(pk, tentative).update(
+            statut=Tache.EN_ATTENTE, erreur=erreur, expire_le=None,
+            executer_apres=maintenant + timedelta(seconds=DELAI_REPRISE * 2 ** (tentative - 1)),
+        )
+    return _tentative(pk, tentative).update(statut=Tache.ECHEC, erreur=erreur, fin=maintenant, expire_le=None)
+
+
+@reessayer_si_verrouillee
+def relacher(pk, tentative):
+    """Remet en attente une tâche interrompue par l'arrêt du travailleur, sans compter la tentative."""
+    return _tentative(pk, tentative).update(
+        statut=Tache.EN_ATTENTE, tentatives=F('tentatives') - 1, expire_le=None, travailleur='',
+    )
+
+
+def reprendre_expirees(marge=MARGE_EXPIRATION):
+    """Tâches en cours bien au-delà de leur échéance (travailleur disparu) : tentative échouée."""
+    limite = timezone.now() - timedelta(seconds=marge)
+    reprises = 0
+    for pk, tentative in Tache.objects.filter(statut=Tache.EN_COURS, expire_le__lt=limite).values_list(
+            'id', 'tentatives'):
+        reprises += echouer(pk, tentative, 'Délai dépassé : travailleur arrêté ou disparu.')
+    return reprises
+
+
+class Execution:
+    """Tentative en cours, passée à la fonction de la tâche pour publier son avancement."""
+
+    def __init__(self, pk, tentative):
+        self.pk = pk
+        self.tentative = tentative
+        self.derniere_publication = 0.0
+
+    def avancer(self, progression=None, message='', forcer=False):
+        """
+        Avancement en pourcentage (None : inchangé) et message ; écrit au plus
+        toutes les INTERVALLE_PROGRESSION secondes, sauf avec `forcer`. Indicatif : une
+        base verrouillée par une autre écriture ne fait pas échouer la tâche.
+        """
+        maintenant = time.monotonic()
+        if not forcer and maintenant - self.derniere_publication < INTERVALLE_PROGRESSION:
+            return
+        self.derniere_publication = maintenant
+        valeurs = {'message': message[:200]}
+        if progression is not None:
+            valeurs['progression'] = round(min(max(progression, 0.0), 100.0), 1)
+        try:
+            _tentative(self.pk, self.tentative).update(**valeurs)
+        except OperationalError as erreur:
+            if not base_verrouillee(erreur):
+                raise
+
+
+def executer(pk, tentative):
+    """Exécute une tentative réservée par `reserver` et enregistre son résultat ou son erreur."""
+    tache = _tentative(pk, tentative).values('nom', 'parametres').first()
+    if tache is None:
+        return
+    try:
+        definition = TACHES[tache['nom']]
+        resultat = definition.fonction(Execution(pk, tentative), **tache['parametres'])
+    except Exception:
+        echouer(pk, tentative, traceback.format_exc())
+    else:
+        terminer(pk, tentative, resultat)
+
+
+def executer_dans_processus(pk, tentative):
+    """Point d'entrée des processus du travailleur, qui ouvrent leurs propres connexions."""
+    # Le gestionnaire de SIGTERM du travailleur est hérité : le processus doit pouvoir être arrêté
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    try:
+        executer(pk, tentative)
+    finally:
+        connections.close_all()
+
+
+@tache('recalculer_rendez_vous', api=True)
+def recalculer_rendez_vous(execution, enfants=None):
+    return {'rendez_vous': rendez_vous.calculer(enfants)}
+
+
+@tache('reconstruire_statistiques', api=True)
+def reconstruire_statistiques(execution):
+    return {'villages': statistiques.reconstruire()}
+
+
+@tache('recalculer_couverture', api=True)
+def recalculer_couverture(execution):
+    nombre = couverture.recalculer()
+    couverture.publier()
+    return {'enfants': nombre}
+
+
+@tache('exporter_enfants', api=True)
+def exporter_enfants(execution, extension='csv', gzip=False, filtres=None):
+    """Export (export.py) écrit dans TACHES_DOSSIER ; l'avancement suit les enfants déjà écrits."""
+    conditions = export.filtres(filtres or {})
+    total = Enfant.objects.filter(**{cle: valeur for cle, valeur in conditions.items()
+                                     if not cle.startswith('vaccins__')}).count()
+    vus = set()
+
+    def suivre(lignes):
+        for ligne in lignes:
+            if ligne[0] not in vus:
+                vus.add(ligne[0])
+                execution.avancer(100.0 * len(vus) / (total or 1), f'{len(vus)} enfants sur {total}')
+            yield ligne
+
+    textes = export.textes_csv if extension == 'csv' else export.textes_ndjson
+    blocs = export.par_blocs(textes(suivre(export.lignes(conditions))))
+    nom = f'tache-{execution.pk}-enfants.{extension}'
+    if gzip:
+        blocs, nom = export.compresser(blocs), nom + '.gz'
+    chemin = dossier_fichiers() / nom
+    with open(chemin, 'wb') as fichier:
+        octets = sum(fichier.write(bloc) for bloc in blocs)
+    return {'fichier': nom, 'octets': octets, 'enfants': len(vus)}
+
+
+class SortieProgression(io.StringIO):
+    """Sortie d'une commande dont chaque ligne devient le message d'avancement."""
+
+    def __init__(self, execution):
+        super().__init__()
+        self.execution = execution
+
+    def write(self, texte):
+        if texte.strip():
+            self.execution.avancer(message=texte.strip().splitlines()[-1])
+        return super().write(texte)
+
+
+@tache('importer_registre', tentatives=3, delai=3600)
+def importer_registre(execution, fichier, **options):
+    """Import d'un registre (fichier du serveur) ; relancé après un échec, il reprend où il s'était arrêté."""
+    if execution.tentative > 1:
+        options.pop('recommencer', None)
+    sortie = SortieProgression(execution)
+    call_command('importer_registre', fichier, stdout=sortie, **options)
+    lignes = sortie.getvalue().strip().splitlines()
+    return {'message': lignes[-1] if lignes else ''}
@@ -0,0 +1,93 @@
+from asyncio import iscoroutinefunction
+from datetime import date
+
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import resolve
+
+from vaccination import cache
+from vaccination.metriques import registre
+from vaccination.models import Village, Enfant, Vaccin
+
+URLS_ASGI = 'backend_api.urls_asgi'
+
+
+class LecturesAsynchronesTests(TestCase):
+
+    def setUp(self):
+        self.kolda = Village.objects.create(nom='Kolda')
+        self.joal = Village.objects.create(nom='Joal')
+        for numero in range(5):
+            enfant = Enfant.objects.create(nom=f'Enfant {numero}', sexe='MF'[numero % 2],
+                                           village=[self.kolda, self.joal][numero % 2],
+                                           date_naissance=date(2023, 1, numero + 1))
+            for rang in range(numero % 3):
+                Vaccin.objects.create(enfant=enfant, nom=['BCG', 'Polio'][rang], date_administration=date(2023, 2, 1),
+                                      statut=['recu', 'retard'][rang], notes=None if rang else 'Bras « gauche »')
+        self.enfant = Enfant.objects.order_by('id').last()
+        self.async_client = AsyncClient()
+
+    def lire_asynchrone(self, url, **entetes):
+        cache.stockage().clear()
+        with override_settings(ROOT_URLCONF=URLS_ASGI):
+            return async_to_sync(self.async_client.get)(url, headers=entetes)
+
+    def lire_synchrone(self, url):
+        cache.stockage().clear()
+        return self.client.get(url)
+
+    def test_vues_asynchrones(self):
+        with override_settings(ROOT_URLCONF=URLS_ASGI):
+            for url in ['/api/enfants/', f'/api/enfants/{self.enfant.pk}/', '/api/villages/', '/api/statistiques/']:
+                self.assertTrue(iscoroutinefunction(resolve(url).func), url)
+            # Les autres routes restent servies par DRF
+            self.assertFalse(iscoroutinefunction(resolve('/api/vaccins/').func))
+
+    def test_memes_reponses_que_drf(self):
+        for url in ['/api/villages/', f'/api/villages/{self.kolda.pk}/', '/api/villages/999/', '/api/enfants/',
+                    '/api/enfants/?expand=vaccins&page_size=2', '/api/enfants/?fields=id,nom&village=Joal',
+                    '/api/enfants/?ordering=-taux_couverture', '/api/enfants/?statut=retard',
+                    '/api/enfants/?date_naissance_min=hier', '/api/enfants/?cursor=inconnu',
+                    f'/api/enfants/{self.enfant.pk}/', f'/api/enfants/{self.enfant.pk}/?fields=nom,vaccins',
+                    '/api/enfants/999/', '/api/statistiques/']:
+            synchrone = self.lire_synchrone(url)
+            asynchrone = self.lire_asynchrone(url)
+            self.assertEqual((asynchrone.status_code, asynchrone.content),
+                             (synchrone.status_code, synchrone.content), url)
+            self.assertEqual(asynchrone.get('ETag'), synchrone.get('ETag'), url)
+
+    def test_pages_suivantes(self):
+        url = '/api/enfants/?page_size=2'
+        while url:
+            asynchrone = self.lire_asynchrone(url)
+            self.assertEqual(asynchrone.content, self.lire_synchrone(url).content, url)
+            url = asynchrone.json()['next']
+
+    def test_requete_conditionnelle(self):
+        etag = self.lire_asynchrone('/api/enfants/')['ETag']
+        self.assertEqual(self.lire_asynchrone('/api/enfants/', if_none_match=etag).status_code, 304)
+
+    def test_authentification_de_drf(self):
+        synchrone = self.client.get('/api/enfants/', HTTP_AUTHORIZATION='Token inconnu')
+        asynchrone = self.lire_asynchrone('/api/enfants/', authorization='Token inconnu')
+        self.assertEqual(asynchrone.status_code, 401)
+        self.assertEqual(asynchrone.content, synchrone.content)
+        self.assertEqual(asynchrone['WWW-Authenticate'], synchrone['WWW-Authenticate'])
+
+    def test_requetes_sql_mesurees(self):
+        registre.reinitialiser()
+        self.lire_asynchrone('/api/enfants/')
+        self.assertEqual(registre.requetes['enfant-list', 'GET', 200], 1)
+        self.assertGreaterEqual(registre.compteurs['sql_requetes']['enfant-list'], 2)
+
+    def test_api_navigable_et_ecritures_deleguees(self):
+        self.assertIn(b'<html', self.lire_asynchrone('/api/villages/', accept='text/html').content)
+        with override_settings(ROOT_URLCONF=URLS_ASGI):
+            creation = async_to_sync(self.async_client.post)('/api/villages/', {'nom': 'Fatick'})
+            self.assertEqual(creation.status_code, 201)
+            modification = async_to_sync(self.async_client.patch)(
+                f'/api/enfants/{self.enfant.pk}/', {'nom': 'Awa'}, content_type='application/json',
+            )
+            self.assertEqual(modification.status_code, 200)
+        self.assertTrue(Village.objects.filter(nom='Fatick').exists())
+        self.assertEqual(self.lire_asynchrone(f'/api/enfants/{self.enfant.pk}/').json()['nom'], 'Awa')
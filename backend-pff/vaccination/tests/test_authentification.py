@@ -0,0 +1,82 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+
+from vaccination import cache
+from vaccination.authentification import TokenEnCacheAuthentication, role_de
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AuthentificationTests(TestCase):
+
+    def setUp(self):
+        cache.stockage().clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user('aminata', password='secret123', first_name='Aminata')
+        self.user.profile.role = 'agent'
+        self.user.profile.save()
+
+    def connecter(self):
+        return self.client.post('/api/login/', {'username': 'aminata', 'password': 'secret123'}, format='json')
+
+    def test_connexion_une_requete(self):
+        Token.objects.create(user=self.user)
+        with self.assertNumQueries(1):
+            response = self.connecter()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['role'], 'agent')
+        self.assertEqual(response.data['full_name'], 'Aminata')
+
+    def test_premiere_connexion_cree_le_token(self):
+        response = self.connecter()
+        self.assertEqual(response.data['token'], Token.objects.get(user=self.user).key)
+        refus = self.client.post('/api/login/', {'username': 'aminata', 'password': 'faux'}, format='json')
+        self.assertEqual(refus.status_code, 401)
+
+    def test_token_en_cache(self):
+        key = Token.objects.create(user=self.user).key
+        authentification = TokenEnCacheAuthentication()
+        with self.assertNumQueries(1):
+            authentification.authenticate_credentials(key)
+        with self.assertNumQueries(0):
+            user, token = authentification.authenticate_credentials(key)
+            self.assertEqual(user.profile.role, 'agent')
+            self.assertEqual((user.pk, user.username, user.is_staff), (self.user.pk, 'aminata', False))
+        self.assertEqual(token.key, key)
+        # Ni mot de passe haché ni données personnelles dans le cache (fichier possible)
+        entree = repr(cache.stockage().get(f'auth:token:{key}'))
+        self.assertNotIn(self.user.password, entree)
+        self.assertNotIn('Aminata', entree)
+
+    def test_token_en_cache_sans_profil(self):
+        self.user.profile.delete()
+        key = Token.objects.create(user=User.objects.get(pk=self.user.pk)).key
+        authentification = TokenEnCacheAuthentication()
+        authentification.authenticate_credentials(key)
+        with self.assertNumQueries(0):
+            user, _ = authentification.authenticate_credentials(key)
+            self.assertEqual(role_de(user), 'parent')
+
+    def test_deconnexion_revoque(self):
+        key = self.connecter().data['token']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {key}')
+        self.assertEqual(self.client.post('/api/logout/').status_code, 204)
+        self.assertEqual(self.client.get('/api/villages/').status_code, 401)
+        with self.assertRaises(AuthenticationFailed):
+            TokenEnCacheAuthentication().authenticate_credentials(key)
+
+    def test_changement_de_role(self):
+        key = self.connecter().data['token']
+        self.user.profile.role = 'admin'
+        self.user.profile.save()
+        user, _ = TokenEnCacheAuthentication().authenticate_credentials(key)
+        self.assertEqual(user.profile.role, 'admin')
+
+    def test_utilisateur_desactive(self):
+        key = self.connecter().data['token']
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            TokenEnCacheAuthentication().authenticate_credentials(key)
@@ -0,0 +1,74 @@
+from datetime import date
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+
+from vaccination.benchmark import SCENARIOS, ClientDjango, comparer, mesurer_routes, percentile
+from vaccination.mesures import mesurer_sql
+from vaccination.models import Village, Enfant, Vaccin
+
+
+class MesuresTests(TestCase):
+
+    def setUp(self):
+        self.village = Village.objects.create(nom='Joal')
+        for i in range(3):
+            enfant = Enfant.objects.create(nom=f'E{i}', sexe='F', village=self.village, date_naissance=date(2023, 1, 1))
+            Vaccin.objects.create(enfant=enfant, nom='BCG', date_administration=date(2023, 1, 2), statut='recu')
+
+    def test_mesurer_sql(self):
+        with mesurer_sql() as externe:
+            list(Enfant.objects.all())
+            with mesurer_sql() as interne:
+                Vaccin.objects.count()
+        self.assertEqual((externe.requetes, externe.lignes), (2, 4))
+        self.assertEqual((interne.requetes, interne.lignes), (1, 1))
+        with mesurer_sql() as apres:
+            pass
+        self.assertEqual(apres.requetes, 0)
+
+    def test_mesurer_sql_toutes_les_bases(self):
+        replique = DatabaseWrapper({**connection.settings_dict, 'NAME': ':memory:'}, alias='replique')
+        self.addCleanup(replique.close)
+        with mock.patch.object(connections, 'all', return_value=[connection, replique]):
+            with mesurer_sql() as mesure:
+                Vaccin.objects.count()
+                with replique.cursor() as curseur:
+                    curseur.execute('SELECT 1 UNION ALL SELECT 2')
+                    curseur.fetchall()
+        self.assertEqual((mesure.requetes, mesure.lignes), (2, 3))
+
+    def test_percentile(self):
+        valeurs = list(range(1, 101))
+        self.assertEqual(percentile(valeurs, 50), 50.5)
+        self.assertAlmostEqual(percentile(valeurs, 99), 99.01)
+        self.assertEqual(percentile([3.0], 95), 3.0)
+
+    def test_routes(self):
+        ids = {
+            'village': [self.village.id],
+            'enfant': list(Enfant.objects.values_list('id', flat=True)),
+            'vaccin': list(Vaccin.objects.values_list('id', flat=True)),
+        }
+        User.objects.create_user('benchmark', is_staff=True)
+        scenarios = [s for s in SCENARIOS if s[0] != 'connexion']
+        resultats = mesurer_routes(ClientDjango(), ids, 3, {'username': 'benchmark'}, scenarios)
+        self.assertEqual(set(resultats), {s[0] for s in scenarios})
+        # Chaque déconnexion supprime le token d'un utilisateur créé pour elle
+        self.assertEqual(resultats.pop('deconnexion')['statuts'], [204])
+        self.assertFalse(Token.objects.filter(user__username__startswith='benchmark-deconnexion').exists())
+        for nom, mesure in resultats.items():
+            self.assertTrue(set(mesure['statuts']) <= {200, 201, 202}, nom)
+            self.assertGreater(mesure['octets'], 0, nom)
+        self.assertGreaterEqual(resultats['enfants_detail']['requetes_sql'], 1)
+
+    def test_comparer(self):
+        def resultats(p95, requetes):
+            return {'resultats': {'client': {'enfants_liste': {'p95_ms': p95, 'requetes_sql': requetes}}}}
+        self.assertEqual(comparer(resultats(10, 2), resultats(12, 2)), [])
+        self.assertEqual(len(comparer(resultats(10, 2), resultats(20, 3))), 2)
+        self.assertEqual(comparer({}, resultats(20, 3)), [])
@@ -0,0 +1,104 @@
+from datetime import date
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from vaccination import cache
+from vaccination.models import Village, Enfant, Vaccin
+
+
+class CacheReponsesTests(TestCase):
+
+    def setUp(self):
+        cache.stockage().clear()
+        self.client = APIClient()
+        self.village = Village.objects.create(nom='Fatick')
+        self.enfant = Enfant.objects.create(nom='Awa', sexe='F', village=self.village, date_naissance=date(2023, 1, 1))
+        self.autre = Enfant.objects.create(nom='Modou', sexe='M', village=self.village, date_naissance=date(2023, 2, 1))
+        self.vaccin = Vaccin.objects.create(enfant=self.enfant, nom='BCG', date_administration=date(2023, 1, 2), statut='recu')
+
+    def test_lecture_en_cache(self):
+        for url in ['/api/enfants/?expand=vaccins', f'/api/enfants/{self.enfant.id}/', '/api/villages/',
+                    '/api/vaccins/', f'/api/vaccins/{self.vaccin.id}/', f'/api/enfants/{self.enfant.id}/vaccins/']:
+            premiere = self.client.get(url)
+            avant = cache.compteurs()['succes']
+            # Seule reste la lecture des versions pour l'ETag
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertEqual(response.json(), premiere.json(), url)
+            self.assertEqual(cache.compteurs()['succes'], avant + 1)
+
+    def test_invalidation_par_ecriture(self):
+        url = f'/api/enfants/{self.enfant.id}/'
+        self.client.get(url)
+        self.vaccin.statut = 'retard'
+        self.vaccin.save()
+        self.assertEqual(self.client.get(url).data['vaccins'][0]['statut'], 'retard')
+        self.village.nom = 'Fatick Escale'
+        self.village.save()
+        self.assertEqual(self.client.get(url).data['village']['nom'], 'Fatick Escale')
+
+    def test_ecriture_d_un_autre_processus(self):
+        # L'invalidation faite par un autre processus (travailleur) n'atteint pas ce cache
+        urls = [f'/api/enfants/{self.enfant.id}/', '/api/vaccins/', f'/api/vaccins/{self.vaccin.id}/']
+        for url in urls:
+            self.client.get(url)
+        with mock.patch('vaccination.cache.invalider'):
+            self.vaccin.statut = 'retard'
+            self.vaccin.save()
+        self.assertEqual(self.client.get(urls[0]).data['vaccins'][0]['statut'], 'retard')
+        self.assertEqual(self.client.get(urls[1]).data['results'][0]['statut'], 'retard')
+        self.assertEqual(self.client.get(urls[2]).data['statut'], 'retard')
+
+    def test_invalidation_precise(self):
+        url = f'/api/enfants/{self.enfant.id}/'
+        self.client.get(url)
+        # Un vaccin d'un autre enfant ne touche pas cette fiche
+        Vaccin.objects.create(enfant=self.autre, nom='Polio', date_administration=date(2023, 3, 1), statut='recu')
+        avant = cache.compteurs()['succes']
+        self.client.get(url)
+        self.assertEqual(cache.compteurs()['succes'], avant + 1)
+        self.vaccin.delete()
+        self.assertEqual(self.client.get(url).data['vaccins'], [])
+
+    def test_filtre_par_nom_de_village(self):
+        url = '/api/vaccins/?village=Fatick Escale'
+        self.assertEqual(self.client.get(url).data['results'], [])
+        self.village.nom = 'Fatick Escale'
+        self.village.save()
+        self.assertEqual(len(self.client.get(url).data['results']), 1)
+
+    def test_vaccin_deplace(self):
+        urls = [f'/api/enfants/{self.enfant.id}/vaccins/', f'/api/enfants/{self.autre.id}/vaccins/']
+        for url in urls:
+            self.client.get(url)
+        self.vaccin.enfant = self.autre
+        self.vaccin.save()
+        self.assertEqual([len(self.client.get(url).data) for url in urls], [0, 1])
+
+    def test_envoi_en_lot(self):
+        url = f'/api/enfants/{self.enfant.id}/vaccins/'
+        self.client.get(url)
+        self.client.get('/api/enfants/')
+        self.client.post('/api/enfants/bulk/', {'enfants': [
+            {'cle': 'a', 'nom': 'Fatou', 'sexe': 'F', 'village_id': self.village.id, 'date_naissance': '2024-01-01'},
+        ]}, format='json')
+        self.assertEqual(len(self.client.get('/api/enfants/').data['results']), 3)
+
+    @override_settings(CACHE_VACCINATION_TAILLE_MAX_ENTREE=100)
+    def test_reponse_trop_grande_ignoree(self):
+        avant = cache.compteurs()['ignores']
+        self.client.get('/api/enfants/?expand=vaccins')
+        self.assertEqual(cache.compteurs()['ignores'], avant + 1)
+
+    def test_generation_evincee(self):
+        self.client.get('/api/villages/')
+        cache.stockage().delete('table:village')
+        avant = cache.compteurs()['echecs']
+        self.client.get('/api/villages/')
+        self.assertEqual(cache.compteurs()['echecs'], avant + 1)
+
+    def test_compteurs(self):
+        data = self.client.get('/api/cache/').json()
+        self.assertEqual(set(data), {'succes', 'echecs', 'ignores', 'invalidations', 'taux_succes', 'backend'})
@@ -0,0 +1,68 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+
+from vaccination.models import Profile
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ImportUtilisateursTests(TestCase):
+
+    def fichier(self, contenu, suffixe):
+        descripteur, chemin = tempfile.mkstemp(suffix=suffixe)
+        with os.fdopen(descripteur, 'w', encoding='utf-8') as fichier:
+            fichier.write(contenu)
+        self.addCleanup(os.remove, chemin)
+        return chemin
+
+    def importer(self, chemin, **options):
+        sortie = StringIO()
+        call_command('importer_utilisateurs', chemin, processus=1, stdout=sortie, stderr=StringIO(), **options)
+        return sortie.getvalue()
+
+    def test_import_csv(self):
+        chemin = self.fichier(
+            'username,email,password,role\n'
+            'fatou,fatou@example.sn,secret123,agent\n'
+            'moussa,,secret456,\n', '.csv'
+        )
+        # Existants, puis transaction : revérification, un INSERT users, un INSERT profils
+        with self.assertNumQueries(6):
+            sortie = self.importer(chemin)
+        self.assertIn('2 compte(s) créé(s)', sortie)
+        self.assertEqual(
+            dict(Profile.objects.values_list('user__username', 'role')), {'fatou': 'agent', 'moussa': 'parent'}
+        )
+        self.assertTrue(User.objects.get(username='fatou').check_password('secret123'))
+
+    def test_import_json_idempotent(self):
+        User.objects.create_user('awa')
+        chemin = self.fichier(json.dumps([
+            {'username': 'awa', 'password': 'x'},
+            {'username': 'ibou', 'role': 'tuteur', 'first_name': 'Ibrahima'},
+        ]), '.json')
+        sortie = self.importer(chemin, role='agent')
+        self.assertIn('1 compte(s) créé(s), 1 déjà existant(s)', sortie)
+        ibou = User.objects.get(username='ibou')
+        self.assertEqual((ibou.first_name, ibou.profile.role), ('Ibrahima', 'tuteur'))
+        self.assertFalse(ibou.has_usable_password())
+        self.assertIn('0 compte(s) créé(s)', self.importer(chemin))
+        self.assertEqual(Profile.objects.count(), 2)
+
+    def test_fichier_invalide(self):
+        chemin = self.fichier('username,role\nfatou,docteur\nfatou,agent\n,agent\n', '.csv')
+        with self.assertRaises(CommandError):
+            self.importer(chemin)
+        self.assertFalse(User.objects.exists())
+
+    def test_json_invalide(self):
+        for contenu in ['[{"username": "fatou"', '{"username": "fatou"}', '["fatou"]']:
+            with self.assertRaisesMessage(CommandError, 'Lecture impossible'):
+                self.importer(self.fichier(contenu, '.json'))
+        self.assertFalse(User.objects.exists())
@@ -0,0 +1,71 @@
+from datetime import date
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from vaccination.models import Village, Enfant, Vaccin
+
+
+class RequetesConditionnellesTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.village = Village.objects.create(nom='Joal')
+        self.enfant = Enfant.objects.create(nom='Awa', sexe='F', village=self.village, date_naissance=date(2023, 1, 1))
+        self.autre = Enfant.objects.create(nom='Abdou', sexe='M', village=self.village, date_naissance=date(2023, 2, 1))
+        self.vaccin = Vaccin.objects.create(enfant=self.enfant, nom='BCG', date_administration=date(2023, 1, 2), statut='recu')
+
+    def etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_304_sans_serialisation(self):
+        for url in ['/api/enfants/', '/api/villages/', '/api/vaccins/', f'/api/enfants/{self.enfant.id}/',
+                    f'/api/villages/{self.village.id}/', f'/api/enfants/{self.enfant.id}/vaccins/',
+                    '/api/statistiques/']:
+            etag = self.etag(url)
+            with self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304, url)
+            self.assertEqual(response.content, b'')
+            self.assertEqual(response['ETag'], etag)
+
+    def test_liste_invalidee_par_une_ecriture(self):
+        etag = self.etag('/api/enfants/')
+        Vaccin.objects.create(enfant=self.autre, nom='Polio', date_administration=date(2023, 3, 1), statut='retard')
+        response = self.client.get('/api/enfants/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_depend_des_parametres(self):
+        self.assertNotEqual(self.etag('/api/enfants/'), self.etag('/api/enfants/?expand=vaccins'))
+
+    def test_detail_enfant(self):
+        url = f'/api/enfants/{self.enfant.id}/'
+        etag = self.etag(url)
+        # Un vaccin d'un autre enfant ne change pas la fiche
+        Vaccin.objects.create(enfant=self.autre, nom='DTC', date_administration=date(2023, 3, 1), statut='recu')
+        self.assertEqual(self.etag(url), etag)
+        self.vaccin.statut = 'retard'
+        self.vaccin.save()
+        etag_modifie = self.etag(url)
+        self.assertNotEqual(etag_modifie, etag)
+        self.vaccin.delete()
+        self.assertNotEqual(self.etag(url), etag_modifie)
+        self.village.nom = 'Joal-Fadiouth'
+        self.village.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag_modifie).status_code, 200)
+
+    def test_if_modified_since(self):
+        response = self.client.get('/api/villages/')
+        derniere_modification = response['Last-Modified']
+        response = self.client.get('/api/villages/', HTTP_IF_MODIFIED_SINCE=derniere_modification)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get('/api/villages/', HTTP_IF_MODIFIED_SINCE='Mon, 01 Jan 2001 00:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
+
+    def test_objet_inexistant(self):
+        self.assertEqual(self.client.get('/api/enfants/9999/').status_code, 404)
+        self.assertEqual(self.client.get('/api/villages/9999/').status_code, 404)
+        self.assertEqual(self.client.get('/api/enfants/9999/vaccins/').status_code, 404)
@@ -0,0 +1,98 @@
+from datetime import timedelta
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from vaccination.models import Village, Enfant, Vaccin, RendezVous
+from vaccination.rendez_vous import calculer
+
+
+class CouvertureTests(TestCase):
+
+    def setUp(self):
+        self.aujourd_hui = timezone.localdate()
+        self.kolda = Village.objects.create(nom='Kolda')
+        self.joal = Village.objects.create(nom='Joal')
+        self.awa = self.enfant('Awa', self.kolda, 50)
+        self.modou = self.enfant('Modou', self.joal, 400)
+
+    def enfant(self, nom, village, age_jours):
+        return Enfant.objects.create(nom=nom, sexe='F', village=village,
+                                     date_naissance=self.aujourd_hui - timedelta(days=age_jours))
+
+    def vacciner(self, enfant, nom, statut='recu'):
+        return Vaccin.objects.create(enfant=enfant, nom=nom, date_administration=self.aujourd_hui, statut=statut)
+
+    def couverture(self, enfant):
+        return Enfant.objects.filter(pk=enfant.pk).values_list(
+            'taux_couverture', 'vaccins_recus', 'vaccins_retard', 'doses_manquantes', 'prochaine_echeance',
+        ).get()
+
+    def test_increments_des_vaccins(self):
+        bcg = self.vacciner(self.awa, 'BCG')
+        polio = self.vacciner(self.awa, 'Polio', statut='retard')
+        self.assertEqual(self.couverture(self.awa)[:3], (8.33, 1, 1))
+        polio.statut = 'recu'
+        polio.save()
+        self.assertEqual(self.couverture(self.awa)[:3], (16.67, 2, 0))
+        bcg.enfant = self.modou
+        bcg.save()
+        self.assertEqual(self.couverture(self.awa)[:3], (8.33, 1, 0))
+        self.assertEqual(self.couverture(self.modou)[:3], (8.33, 1, 0))
+        bcg.delete()
+        self.assertEqual(self.couverture(self.modou)[:3], (0.0, 0, 0))
+
+    def test_doses_manquantes_apres_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vacciner(self.awa, 'BCG')
+        naissance = self.awa.date_naissance
+        # Hépatite B de naissance : première dose attendue
+        self.assertEqual(self.couverture(self.awa), (8.33, 1, 0, 11, naissance))
+        for vaccin in ['Hépatite B', 'Polio', 'DTC', 'Pneumocoque', 'Rotavirus', 'DTC', 'DTC',
+                       'Rougeole', 'ROR', 'Méningite', 'Fièvre jaune']:
+            self.vacciner(self.awa, vaccin)
+        calculer([self.awa.pk])
+        self.assertEqual(self.couverture(self.awa), (100.0, 12, 0, 0, None))
+
+    def test_migration_remplit_les_rendez_vous(self):
+        self.vacciner(self.awa, 'BCG')
+        # Base d'avant la migration 0009 : ni rendez-vous ni couverture
+        RendezVous.objects.all().delete()
+        Enfant.objects.update(doses_manquantes=0, prochaine_echeance=None)
+        import_module('vaccination.migrations.0009_couverture_enfant').remplir_couverture(apps, None)
+        self.assertEqual(self.couverture(self.awa), (8.33, 1, 0, 11, self.awa.date_naissance))
+        self.assertEqual(RendezVous.objects.filter(enfant=self.awa).count(), 11)
+
+    def test_commande(self):
+        self.vacciner(self.modou, 'BCG')
+        self.vacciner(self.modou, 'Polio', statut='retard')
+        Enfant.objects.update(taux_couverture=0, vaccins_recus=0, vaccins_retard=0)
+        calculer()
+        sortie = StringIO()
+        call_command('recalculer_couverture', stdout=sortie)
+        self.assertIn('2 enfant(s)', sortie.getvalue())
+        self.assertEqual(self.couverture(self.modou)[:4], (8.33, 1, 1, 11))
+
+    def test_api_tri_et_filtres(self):
+        self.vacciner(self.awa, 'BCG')
+        for vaccin in ['BCG', 'Polio', 'DTC']:
+            self.vacciner(self.modou, vaccin)
+        sans = self.enfant('Fatou', self.kolda, 10)
+        calculer()
+
+        ordre = self.client.get('/api/enfants/', {'ordering': '-taux_couverture', 'page_size': 2}).json()
+        self.assertEqual([e['nom'] for e in ordre['results']], ['Modou', 'Awa'])
+        self.assertEqual(ordre['results'][0]['taux_couverture'], 25.0)
+        suite = self.client.get(ordre['next']).json()
+        self.assertEqual([e['nom'] for e in suite['results']], ['Fatou'])
+
+        filtres = self.client.get('/api/enfants/', {'couverture_min': '5', 'village': 'Kolda'}).json()['results']
+        self.assertEqual([e['nom'] for e in filtres], ['Awa'])
+        echeance = self.client.get('/api/enfants/', {'prochaine_echeance_max': str(sans.date_naissance)}).json()
+        self.assertEqual({e['nom'] for e in echeance['results']}, {'Awa', 'Fatou', 'Modou'})
+        self.assertEqual(self.client.get('/api/enfants/', {'couverture_min': '200'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/enfants/', {'ordering': 'nom'}).status_code, 400)
@@ -0,0 +1,94 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from datetime import date
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from vaccination import export
+from vaccination.models import Village, Enfant, Vaccin
+
+
+class ExportTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('agent'))
+        kolda = Village.objects.create(nom='Kolda')
+        joal = Village.objects.create(nom='Joal')
+        self.awa = Enfant.objects.create(nom='Awa', sexe='F', village=kolda, date_naissance=date(2023, 1, 1))
+        self.modou = Enfant.objects.create(nom='Modou', sexe='M', village=joal, date_naissance=date(2024, 3, 1))
+        Vaccin.objects.create(enfant=self.awa, nom='Polio', date_administration=date(2023, 2, 1), statut='recu')
+        Vaccin.objects.create(enfant=self.awa, nom='BCG', date_administration=date(2023, 1, 2), statut='recu',
+                              notes='Bras gauche, "sans réaction"')
+
+    def lire(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_csv(self):
+        response = self.client.get('/api/export/enfants.csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('enfants.csv', response['Content-Disposition'])
+        lignes = list(csv.DictReader(io.StringIO(self.lire(response).decode())))
+        self.assertEqual([(ligne['nom'], ligne['vaccin']) for ligne in lignes],
+                         [('Awa', 'BCG'), ('Awa', 'Polio'), ('Modou', '')])
+        self.assertEqual(lignes[0]['notes'], 'Bras gauche, "sans réaction"')
+        self.assertEqual(lignes[0]['village'], 'Kolda')
+
+    def test_ndjson(self):
+        objets = [json.loads(ligne) for ligne in self.lire(self.client.get('/api/export/enfants.ndjson')).splitlines()]
+        self.assertEqual([objet['nom'] for objet in objets], ['Awa', 'Modou'])
+        self.assertEqual([vaccin['nom'] for vaccin in objets[0]['vaccins']], ['BCG', 'Polio'])
+        self.assertEqual(objets[0]['village'], {'id': self.awa.village_id, 'nom': 'Kolda'})
+        self.assertEqual(objets[1]['vaccins'], [])
+
+    def test_gzip_et_filtres(self):
+        response = self.client.get('/api/export/enfants.ndjson', {
+            'gzip': '1', 'village': 'Kolda', 'date_administration_min': '2023-02-01',
+        })
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        objets = [json.loads(ligne) for ligne in gzip.decompress(self.lire(response)).splitlines()]
+        self.assertEqual(len(objets), 1)
+        self.assertEqual([vaccin['nom'] for vaccin in objets[0]['vaccins']], ['Polio'])
+
+    def test_une_requete_et_plusieurs_blocs(self):
+        for numero in range(50):
+            Enfant.objects.create(nom=f'Enfant {numero}', sexe='F', village=self.awa.village,
+                                  date_naissance=date(2022, 1, 1))
+        response = self.client.get('/api/export/enfants.csv')
+        with mock.patch.object(export, 'TAILLE_BLOC', 256), self.assertNumQueries(1):
+            blocs = list(response.streaming_content)
+        self.assertGreater(len(blocs), 5)
+        self.assertEqual(len(b''.join(blocs).decode().splitlines()), 54)
+
+    def test_erreurs(self):
+        self.assertEqual(self.client.get('/api/export/enfants.csv', {'date_naissance_min': 'hier'}).status_code, 400)
+        self.assertEqual(APIClient().get('/api/export/enfants.csv').status_code, 401)
+
+    def test_commande(self):
+        sortie = StringIO()
+        call_command('exporter_enfants', village=str(self.modou.village_id), stdout=sortie)
+        self.assertEqual(sortie.getvalue().splitlines()[1].split(',')[1], 'Modou')
+        with tempfile.TemporaryDirectory() as dossier:
+            chemin = os.path.join(dossier, 'export.ndjson.gz')
+            call_command('exporter_enfants', format='ndjson', gzip=True, sortie=chemin, stderr=StringIO())
+            with gzip.open(chemin, 'rt', encoding='utf-8') as fichier:
+                self.assertEqual(len(fichier.readlines()), 2)
+        with self.assertRaises(CommandError):
+            call_command('exporter_enfants', date_naissance_min='hier', stdout=StringIO())
+
+    def test_commande_gzip_sortie_standard(self):
+        sortie = io.TextIOWrapper(io.BytesIO())
+        with mock.patch('sys.stdout', sortie):
+            call_command('exporter_enfants', gzip=True)
+        self.assertEqual(len(gzip.decompress(sortie.buffer.getvalue()).decode().splitlines()), 4)
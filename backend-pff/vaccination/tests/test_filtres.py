@@ -0,0 +1,81 @@
+from datetime import date
+
+from django.db import connection
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from vaccination.models import Village, Enfant, Vaccin
+
+
+class FiltresTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.thies = Village.objects.create(nom='Thiès')
+        self.joal = Village.objects.create(nom='Joal')
+        self.fatou = Enfant.objects.create(nom='Fatou', sexe='F', village=self.thies, date_naissance=date(2022, 3, 1))
+        self.moussa = Enfant.objects.create(nom='Moussa', sexe='M', village=self.joal, date_naissance=date(2023, 6, 1))
+        self.awa = Enfant.objects.create(nom='Awa', sexe='F', village=self.joal, date_naissance=date(2024, 1, 15))
+        Vaccin.objects.create(enfant=self.fatou, nom='BCG', date_administration=date(2022, 3, 2), statut='recu')
+        Vaccin.objects.create(enfant=self.fatou, nom='Polio', date_administration=date(2022, 5, 2), statut='retard')
+        Vaccin.objects.create(enfant=self.moussa, nom='BCG', date_administration=date(2023, 6, 5), statut='recu')
+
+    def ids(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [ligne['id'] for ligne in response.data['results']]
+
+    def test_enfants_par_village(self):
+        self.assertEqual(self.ids(f'/api/enfants/?village={self.joal.id}'), [self.moussa.id, self.awa.id])
+        self.assertEqual(self.ids('/api/enfants/?village=Thiès'), [self.fatou.id])
+
+    def test_enfants_par_statut_et_vaccin(self):
+        self.assertEqual(self.ids('/api/enfants/?statut=retard'), [self.fatou.id])
+        self.assertEqual(self.ids('/api/enfants/?statut=recu'), [self.fatou.id, self.moussa.id])
+        self.assertEqual(self.ids('/api/enfants/?vaccin=BCG&village=Joal'), [self.moussa.id])
+        self.assertEqual(self.ids('/api/enfants/?vaccin=Polio&statut=recu'), [])
+
+    def test_enfants_par_statut_vaccinal(self):
+        # Valeurs envoyées par l'application mobile
+        Enfant.objects.filter(pk=self.fatou.pk).update(taux_couverture=100.0)
+        Enfant.objects.filter(pk=self.moussa.pk).update(taux_couverture=8.33)
+        self.assertEqual(self.ids('/api/enfants/?statut=complet'), [self.fatou.id])
+        self.assertEqual(self.ids('/api/enfants/?statut=partiel'), [self.moussa.id])
+        self.assertEqual(self.ids('/api/enfants/?statut=non_vacciné'), [self.awa.id])
+        self.assertEqual(self.client.get('/api/vaccins/?statut=complet').status_code, 400)
+
+    def test_enfants_par_date_naissance(self):
+        url = '/api/enfants/?date_naissance_min=2023-01-01&date_naissance_max=2023-12-31'
+        self.assertEqual(self.ids(url), [self.moussa.id])
+        self.assertEqual(self.ids('/api/enfants/?date_naissance_min=2023-01-01'), [self.moussa.id, self.awa.id])
+
+    def test_vaccins(self):
+        self.assertEqual(len(self.ids(f'/api/vaccins/?enfant={self.fatou.id}')), 2)
+        self.assertEqual(len(self.ids('/api/vaccins/?village=Joal')), 1)
+        self.assertEqual(len(self.ids('/api/vaccins/?statut=retard&nom=Polio')), 1)
+        self.assertEqual(len(self.ids('/api/vaccins/?date_administration_max=2022-12-31')), 2)
+
+    def test_parametres_invalides(self):
+        self.assertEqual(self.client.get('/api/enfants/?statut=perdu').status_code, 400)
+        self.assertEqual(self.client.get('/api/enfants/?date_naissance_min=hier').status_code, 400)
+        self.assertEqual(self.client.get('/api/vaccins/?enfant=abc').status_code, 400)
+
+
+class PlanRequeteTests(TestCase):
+    """Les filtres doivent utiliser un index plutôt qu'un parcours complet de table."""
+
+    def plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as curseur:
+            curseur.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return ' | '.join(str(ligne[-1]) for ligne in curseur.fetchall())
+
+    def test_index_utilises(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Plan spécifique à SQLite')
+        plan = self.plan(Enfant.objects.filter(village_id=1, date_naissance__gte=date(2023, 1, 1)))
+        self.assertIn('enfant_village_naiss_idx', plan)
+        plan = self.plan(Vaccin.objects.filter(date_administration__range=(date(2023, 1, 1), date(2023, 2, 1))))
+        self.assertIn('vaccin_date_admin_idx', plan)
+        plan = self.plan(Vaccin.objects.filter(enfant_id=1, statut='retard'))
+        self.assertIn('vaccin_enfant_statut_idx', plan)
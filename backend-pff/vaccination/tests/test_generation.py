@@ -0,0 +1,58 @@
+from datetime import date
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from vaccination.generation import generer_village
+from vaccination.models import DoseCalendrier, Village, Enfant, Vaccin, StatistiqueVillage
+from vaccination.statistiques import reconstruire
+
+REFERENCE = date(2025, 6, 1)
+
+
+class GenerationTests(TestCase):
+
+    def generer(self, **options):
+        call_command('generer_donnees', date_reference=REFERENCE, stdout=StringIO(), **options)
+
+    def test_deterministe(self):
+        self.assertEqual(generer_village(3, 42, 50, REFERENCE), generer_village(3, 42, 50, REFERENCE))
+        self.assertNotEqual(generer_village(3, 42, 50, REFERENCE), generer_village(3, 7, 50, REFERENCE))
+
+    def test_calendrier_en_base(self):
+        DoseCalendrier.objects.filter(vaccin='ROR').delete()
+        DoseCalendrier.objects.create(vaccin='Rougeole', dose=2, age_jours=450, tolerance_jours=60)
+        _, enfants = generer_village(0, 42, 200, REFERENCE)
+        noms = {v['nom'] for _, liste in enfants for v in liste}
+        self.assertNotIn('ROR', noms)
+        self.assertTrue(any([v['nom'] for v in liste].count('Rougeole') == 2 for _, liste in enfants))
+
+    def test_distribution(self):
+        _, enfants = generer_village(0, 42, 400, REFERENCE)
+        vaccins = [v for _, liste in enfants for v in liste]
+        retards = sum(v['statut'] == 'retard' for v in vaccins) / len(vaccins)
+        self.assertTrue(0.02 < retards < 0.3, retards)
+        for enfant, liste in enfants:
+            self.assertLessEqual(enfant['date_naissance'], REFERENCE)
+            self.assertTrue(all(enfant['date_naissance'] <= v['date_administration'] <= REFERENCE for v in liste))
+
+    def test_commande_reprend_sans_doublon(self):
+        self.generer(villages=3, enfants_par_village=20)
+        enfants, vaccins = Enfant.objects.count(), Vaccin.objects.count()
+        self.generer(villages=4, enfants_par_village=20)
+        self.assertEqual(Village.objects.count(), 4)
+        self.assertEqual(Enfant.objects.filter(village__in=Village.objects.order_by('id')[:3]).count(), enfants)
+        self.assertEqual(Vaccin.objects.filter(enfant__village__in=Village.objects.order_by('id')[:3]).count(), vaccins)
+
+    def test_statistiques_et_revisions(self):
+        self.generer(villages=2, enfants_par_village=30)
+        avant = list(StatistiqueVillage.objects.order_by('village').values_list(
+            'nombre_enfants', 'vaccins_recus', 'vaccins_retard'))
+        reconstruire()
+        apres = list(StatistiqueVillage.objects.order_by('village').values_list(
+            'nombre_enfants', 'vaccins_recus', 'vaccins_retard'))
+        self.assertEqual(avant, apres)
+        revisions = [*Enfant.objects.values_list('revision', flat=True),
+                     *Vaccin.objects.values_list('revision', flat=True)]
+        self.assertEqual(len(revisions), len(set(revisions)))
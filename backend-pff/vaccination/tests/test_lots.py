@@ -0,0 +1,107 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from vaccination.models import Village, Enfant, Vaccin, StatistiqueVillage
+from vaccination.statistiques import reconstruire
+
+
+def lot(village_id, nombre, prefixe='e', vaccins=2):
+    return {'enfants': [
+        {
+            'cle': f'{prefixe}{i}', 'nom': f'Enfant {i}', 'sexe': 'F', 'village_id': village_id,
+            'date_naissance': '2024-02-01',
+            'vaccins': [
+                {'cle': f'{prefixe}{i}-v{j}', 'nom': 'Polio', 'date_administration': '2024-03-01',
+                 'statut': 'recu' if j else 'retard'}
+                for j in range(vaccins)
+            ],
+        }
+        for i in range(nombre)
+    ]}
+
+
+class EnvoiEnLotTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.village = Village.objects.create(nom='Ngaparou')
+
+    def envoyer(self, donnees):
+        return self.client.post('/api/enfants/bulk/', donnees, format='json')
+
+    def test_creation(self):
+        response = self.envoyer(lot(self.village.id, 3))
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(Enfant.objects.count(), 3)
+        self.assertEqual(Vaccin.objects.count(), 6)
+        resultat = response.data['resultats'][1]
+        self.assertEqual(resultat['statut'], 'cree')
+        self.assertEqual(Enfant.objects.get(pk=resultat['id']).cle_client, 'e1')
+        self.assertEqual(Vaccin.objects.get(pk=resultat['vaccins'][0]['id']).enfant_id, resultat['id'])
+
+    def test_renvoi_idempotent(self):
+        premier = self.envoyer(lot(self.village.id, 3)).data
+        response = self.envoyer(lot(self.village.id, 3))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Enfant.objects.count(), 3)
+        self.assertEqual(Vaccin.objects.count(), 6)
+        self.assertEqual([r['id'] for r in response.data['resultats']], [r['id'] for r in premier['resultats']])
+        self.assertTrue(all(r['statut'] == 'existant' for r in response.data['resultats']))
+
+    def test_renvoi_partiel(self):
+        self.envoyer(lot(self.village.id, 2, vaccins=1))
+        response = self.envoyer(lot(self.village.id, 3, vaccins=2))
+        self.assertEqual(response.status_code, 201)
+        statuts = [(r['statut'], [v['statut'] for v in r['vaccins']]) for r in response.data['resultats']]
+        self.assertEqual(statuts, [
+            ('existant', ['existant', 'cree']),
+            ('existant', ['existant', 'cree']),
+            ('cree', ['cree', 'cree']),
+        ])
+        self.assertEqual(Vaccin.objects.count(), 6)
+
+    def test_lot_invalide_rien_ecrit(self):
+        donnees = lot(self.village.id, 3)
+        donnees['enfants'][2]['vaccins'][0]['statut'] = 'inconnu'
+        response = self.envoyer(donnees)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('statut', response.data[2]['vaccins'][0])
+        self.assertEqual(Enfant.objects.count(), 0)
+
+    def test_village_inconnu(self):
+        donnees = lot(self.village.id, 3)
+        donnees['enfants'][1]['village_id'] = 9999
+        response = self.envoyer(donnees)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.data), [1])
+        self.assertIn('village_id', response.data[1])
+        self.assertEqual(Enfant.objects.count(), 0)
+
+    def test_cles_en_double(self):
+        donnees = lot(self.village.id, 2)
+        donnees['enfants'][1]['cle'] = 'e0'
+        self.assertEqual(self.envoyer(donnees).status_code, 400)
+
+    def test_statistiques_et_synchronisation(self):
+        self.envoyer(lot(self.village.id, 4))
+        stat = StatistiqueVillage.objects.get(village=self.village)
+        self.assertEqual((stat.nombre_enfants, stat.vaccins_recus, stat.vaccins_retard), (4, 4, 4))
+        reconstruire()
+        stat = StatistiqueVillage.objects.get(village=self.village)
+        self.assertEqual((stat.nombre_enfants, stat.vaccins_recus, stat.vaccins_retard), (4, 4, 4))
+        synchro = self.client.get('/api/sync/').data
+        self.assertEqual(len(synchro['enfants']), 4)
+        self.assertEqual(len(synchro['vaccins']), 8)
+        revisions = [ligne['revision'] for cle in ('villages', 'enfants', 'vaccins') for ligne in synchro[cle]]
+        self.assertEqual(len(revisions), len(set(revisions)))
+
+    def test_nombre_de_requetes_constant(self):
+        # Premier envoi : création des compteurs de version
+        self.envoyer(lot(self.village.id, 1, prefixe='x'))
+        with CaptureQueriesContext(connection) as petit:
+            self.envoyer(lot(self.village.id, 2, prefixe='a'))
+        with CaptureQueriesContext(connection) as grand:
+            self.envoyer(lot(self.village.id, 40, prefixe='b'))
+        self.assertEqual(len(petit), len(grand))
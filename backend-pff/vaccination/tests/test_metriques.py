@@ -0,0 +1,59 @@
+from datetime import date
+
+from django.test import TestCase, override_settings
+
+from vaccination.metriques import registre
+from vaccination.models import Village, Enfant
+
+
+class MetriquesTests(TestCase):
+
+    def setUp(self):
+        registre.reinitialiser()
+        village = Village.objects.create(nom='Kolda')
+        Enfant.objects.create(nom='Awa', sexe='F', village=village, date_naissance=date(2023, 1, 1))
+
+    def lignes(self):
+        response = self.client.get('/api/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return {
+            ligne.rsplit(' ', 1)[0]: float(ligne.rsplit(' ', 1)[1])
+            for ligne in response.content.decode().splitlines() if not ligne.startswith('#')
+        }
+
+    def test_requetes_mesurees(self):
+        taille = len(self.client.get('/api/enfants/').content)
+        self.client.get('/api/enfants/')
+        self.client.get('/api/inconnue/')
+        lignes = self.lignes()
+        self.assertEqual(lignes['vaccination_requetes_total{vue="enfant-list",methode="GET",statut="200"}'], 2)
+        self.assertEqual(lignes['vaccination_requetes_total{vue="non_resolue",methode="GET",statut="404"}'], 1)
+        self.assertEqual(lignes['vaccination_requete_duree_secondes_count{vue="enfant-list",methode="GET"}'], 2)
+        self.assertEqual(
+            lignes['vaccination_requete_duree_secondes_bucket{vue="enfant-list",methode="GET",le="+Inf"}'], 2
+        )
+        self.assertEqual(lignes['vaccination_reponse_octets_total{vue="enfant-list"}'], 2 * taille)
+        self.assertGreaterEqual(lignes['vaccination_sql_requetes_total{vue="enfant-list"}'], 2)
+        self.assertGreater(lignes['vaccination_rendu_duree_secondes_total{vue="enfant-list"}'], 0)
+
+    def test_seaux_cumules(self):
+        registre.observer('v', 'GET', 200, 0.02, 0, 0.0, 0.0, 0)
+        registre.observer('v', 'GET', 200, 0.3, 0, 0.0, 0.0, 0)
+        lignes = self.lignes()
+        seau = 'vaccination_requete_duree_secondes_bucket{{vue="v",methode="GET",le="{}"}}'
+        self.assertEqual(
+            [lignes[seau.format(le)] for le in ['0.01', '0.025', '0.25', '0.5', '+Inf']], [0, 1, 1, 2, 2]
+        )
+
+    @override_settings(METRIQUES_ECHANTILLONNAGE=0.0)
+    def test_echantillonnage(self):
+        self.client.get('/api/enfants/')
+        self.assertFalse(registre.requetes)
+
+    @override_settings(METRIQUES_SEUIL_LENT=0.0)
+    def test_journal_requetes_lentes(self):
+        with self.assertLogs('vaccination.lent', 'WARNING') as journal:
+            self.client.get('/api/villages/')
+        self.assertIn('/api/villages/', journal.output[0])
+        self.assertIn('SELECT', journal.output[0])
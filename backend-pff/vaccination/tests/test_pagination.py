@@ -0,0 +1,105 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from vaccination.models import Enfant, Vaccin
+from vaccination.tests.test_requetes import creer_donnees
+
+
+class PaginationParCurseurTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        creer_donnees(7, nb_vaccins=2)
+
+    def parcourir(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(ligne['id'] for ligne in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_parcours_complet_enfants(self):
+        ids = self.parcourir('/api/enfants/?page_size=3')
+        self.assertEqual(ids, list(Enfant.objects.order_by('id').values_list('id', flat=True)))
+
+    def test_parcours_complet_vaccins(self):
+        ids = self.parcourir('/api/vaccins/?page_size=5')
+        self.assertEqual(ids, list(Vaccin.objects.order_by('id').values_list('id', flat=True)))
+
+    def test_page_profonde_sans_offset(self):
+        response = self.client.get('/api/enfants/?page_size=3')
+        with self.assertNumQueries(2) as contexte:
+            self.client.get(response.data['next'])
+        sql = contexte.captured_queries[-1]['sql']
+        self.assertIn('LIMIT', sql)
+        self.assertNotIn('OFFSET', sql)
+        self.assertNotIn('COUNT', sql)
+
+    def test_tri_par_couverture_sans_offset(self):
+        # Égalités nombreuses : le curseur porte le taux et l'identifiant
+        for index, enfant in enumerate(Enfant.objects.order_by('id')):
+            Enfant.objects.filter(pk=enfant.pk).update(taux_couverture=25.0 if index % 3 else 50.0)
+        for ordre in ['taux_couverture', '-taux_couverture']:
+            attendus = list(Enfant.objects.order_by(ordre, ordre.replace('taux_couverture', 'id'))
+                            .values_list('id', flat=True))
+            self.assertEqual(self.parcourir(f'/api/enfants/?ordering={ordre}&page_size=2'), attendus)
+            response = self.client.get(f'/api/enfants/?ordering={ordre}&page_size=2')
+            response = self.client.get(self.client.get(response.data['next']).data['next'])
+            with self.assertNumQueries(2) as contexte:
+                precedente = self.client.get(response.data['previous'])
+            self.assertNotIn('OFFSET', contexte.captured_queries[-1]['sql'])
+            self.assertEqual([ligne['id'] for ligne in precedente.data['results']], attendus[2:4])
+
+    def test_curseur_incomplet(self):
+        # p=25.0 : taux sans identifiant
+        response = self.client.get('/api/enfants/', {'ordering': 'taux_couverture', 'cursor': 'cD0yNS4w'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_taille_maximale(self):
+        response = self.client.get('/api/enfants/?page_size=100000')
+        self.assertEqual(len(response.data['results']), 7)
+
+
+class ChampsPartielsTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        creer_donnees(2, nb_vaccins=2)
+        self.enfant = Enfant.objects.order_by('id').first()
+
+    def test_liste_sans_vaccins_par_defaut(self):
+        ligne = self.client.get('/api/enfants/').data['results'][0]
+        self.assertNotIn('vaccins', ligne)
+        self.assertEqual(set(ligne), {
+            'id', 'nom', 'sexe', 'village', 'date_naissance', 'taux_couverture',
+            'vaccins_recus', 'vaccins_retard', 'doses_manquantes', 'prochaine_echeance',
+        })
+
+    def test_liste_expand(self):
+        ligne = self.client.get('/api/enfants/?expand=vaccins').data['results'][0]
+        self.assertEqual(len(ligne['vaccins']), 2)
+
+    def test_fields(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/enfants/?fields=id,nom')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'nom'})
+        response = self.client.get('/api/enfants/?fields=id,vaccins')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'vaccins'})
+
+    def test_detail_complet(self):
+        response = self.client.get(f'/api/enfants/{self.enfant.id}/')
+        self.assertEqual(len(response.data['vaccins']), 2)
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/enfants/{self.enfant.id}/?fields=nom,village')
+        self.assertEqual(set(response.data), {'nom', 'village'})
+
+    def test_ecriture_non_affectee(self):
+        response = self.client.post('/api/enfants/?fields=id', {
+            'nom': 'Moussa', 'sexe': 'M', 'village_id': self.enfant.village_id,
+            'date_naissance': '2024-01-01',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['vaccins'], [])
+        self.assertEqual(response.data['village']['id'], self.enfant.village_id)
@@ -0,0 +1,62 @@
+from datetime import date
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from vaccination import cache, rapide
+from vaccination.models import Village, Enfant, Vaccin
+
+
+class ListesRapidesTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        kolda = Village.objects.create(nom='Kolda')
+        joal = Village.objects.create(nom='Joal-Fadiouth')
+        for numero in range(7):
+            enfant = Enfant.objects.create(nom=f'Enfant {numero} « Ndèye »', sexe='MF'[numero % 2],
+                                           village=[kolda, joal][numero % 2], date_naissance=date(2023, 1, numero + 1))
+            for rang, nom in enumerate(['Polio', 'BCG', 'DTC'][:numero % 4]):
+                Vaccin.objects.create(enfant=enfant, nom=nom, date_administration=date(2023, 2, rang + 1),
+                                      statut=['recu', 'retard'][rang % 2], notes='Ligne\u2028suivante' if rang else None)
+        Enfant.objects.filter(nom__startswith='Enfant 3').update(taux_couverture=25.0, prochaine_echeance=date(2024, 1, 1))
+
+    def lire(self, url, rapide_active):
+        cache.stockage().clear()
+        with override_settings(LISTES_RAPIDES=rapide_active):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return response.content
+
+    def test_reponses_identiques_octet_pour_octet(self):
+        for url in ['/api/enfants/', '/api/enfants/?expand=vaccins&page_size=3', '/api/enfants/?fields=id,village',
+                    '/api/enfants/?fields=nom,vaccins&statut=retard', '/api/enfants/?ordering=-taux_couverture',
+                    '/api/enfants/?village=Joal-Fadiouth&couverture_max=10', '/api/vaccins/',
+                    '/api/vaccins/?statut=retard&page_size=2', '/api/vaccins/?village=Kolda']:
+            self.assertEqual(self.lire(url, True), self.lire(url, False), url)
+
+    def test_pages_suivantes(self):
+        url = '/api/enfants/?expand=vaccins&page_size=2'
+        while url:
+            contenu = self.lire(url, True)
+            self.assertEqual(contenu, self.lire(url, False), url)
+            url = self.client.get(url).json()['next']
+
+    @override_settings(LISTES_RAPIDES=True)
+    def test_requetes(self):
+        # Versions pour l'ETag, puis enfants (village joint) et vaccins de la page
+        cache.stockage().clear()
+        with self.assertNumQueries(3):
+            self.client.get('/api/enfants/?expand=vaccins')
+        cache.stockage().clear()
+        with self.assertNumQueries(2):
+            self.client.get('/api/enfants/')
+
+    def test_rendu_sans_orjson(self):
+        donnees = {'nom': 'Awa « Diop »', 'notes': 'a\u2029b', 'taux': 8.33, 'date': date(2024, 1, 1), 'vide': None}
+        attendu = JSONRenderer().render(donnees)
+        self.assertEqual(rapide.RenduJSONRapide().render(donnees), attendu)
+        with mock.patch.object(rapide, 'orjson', None):
+            self.assertEqual(rapide.RenduJSONRapide().render(donnees), attendu)
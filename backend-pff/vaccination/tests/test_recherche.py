@@ -0,0 +1,146 @@
+from datetime import date
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from vaccination import cache, recherche
+from vaccination.models import Village, Enfant, Vaccin
+
+
+def naissance(jour=1):
+    return date(2023, 1, jour)
+
+
+class RechercheTests(TestCase):
+
+    def setUp(self):
+        cache.stockage().clear()
+        self.client = APIClient()
+        self.kolda = Village.objects.create(nom='Kolda')
+        self.diaobe = Village.objects.create(nom='Diaobé')
+        self.aissatou = Enfant.objects.create(nom='Aïssatou Diallo', sexe='F', village=self.kolda,
+                                              date_naissance=naissance())
+        self.moussa = Enfant.objects.create(nom='Moussa Kane', sexe='M', village=self.diaobe,
+                                            date_naissance=naissance(2))
+        Vaccin.objects.create(enfant=self.aissatou, nom='BCG', date_administration=naissance(2), statut='recu')
+
+    def chercher(self, q, **params):
+        # update() et le SQL direct ne changent pas les générations : on lit l'index, pas le cache
+        cache.stockage().clear()
+        response = self.client.get('/api/enfants/search/', {'q': q, **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data
+
+    def noms(self, q, **params):
+        return [enfant['nom'] for enfant in self.chercher(q, **params)['results']]
+
+    def test_prefixe_sans_accents(self):
+        for q in ['aissa', 'AÏSSA', 'dial', 'aissatou diallo', 'Aïssatou, Di']:
+            self.assertEqual(self.noms(q), ['Aïssatou Diallo'], q)
+        self.assertEqual(self.noms('issatou'), [])
+
+    def test_village(self):
+        self.assertEqual(self.noms('diaobe'), ['Moussa Kane'])
+        # Tous les mots doivent être trouvés, dans le nom ou le village
+        self.assertEqual(self.noms('moussa kold'), [])
+        self.assertEqual(self.noms('aissa kold'), ['Aïssatou Diallo'])
+
+    def test_nom_classe_avant_village(self):
+        Enfant.objects.create(nom='Awa Kolda', sexe='F', village=self.diaobe, date_naissance=naissance(3))
+        Enfant.objects.create(nom='Fatou Sow', sexe='F', village=self.kolda, date_naissance=naissance(4))
+        self.assertEqual(self.noms('kolda'), ['Awa Kolda', 'Fatou Sow', 'Aïssatou Diallo'])
+
+    def test_mots_entiers_avant_prefixes(self):
+        Enfant.objects.create(nom='Awa Ba', sexe='F', village=self.kolda, date_naissance=naissance())
+        # Plus récents, mais seulement par préfixe ou par le village
+        Enfant.objects.bulk_create([Enfant(nom=f'Awadi Ba {numero}', sexe='F', village=self.kolda,
+                                           date_naissance=naissance()) for numero in range(30)])
+        Enfant.objects.create(nom='Moussa Sow', sexe='M', village=Village.objects.create(nom='Awaye'),
+                              date_naissance=naissance())
+        noms = self.noms('awa', page_size=100)
+        self.assertEqual(noms[:2], ['Awa Ba', 'Awadi Ba 29'])
+        self.assertEqual(noms[-1], 'Moussa Sow')
+        self.assertEqual(len(noms), 32)
+
+    def test_index_tenu_a_jour(self):
+        self.aissatou.nom = 'Binta Diallo'
+        self.aissatou.save()
+        self.assertEqual(self.noms('aissa'), [])
+        self.assertEqual(self.noms('binta'), ['Binta Diallo'])
+
+        self.diaobe.nom = 'Vélingara'
+        self.diaobe.save()
+        self.assertEqual(self.noms('velin'), ['Moussa Kane'])
+        Enfant.objects.filter(pk=self.moussa.pk).update(village=self.kolda)
+        self.assertEqual(self.noms('velin'), [])
+
+        # Écritures en masse : aucun signal, l'index suit quand même
+        Enfant.objects.bulk_create([Enfant(nom='Ousmane Ba', sexe='M', village=self.kolda, date_naissance=naissance())])
+        self.assertEqual(self.noms('ousm'), ['Ousmane Ba'])
+        self.moussa.delete()
+        self.assertEqual(self.noms('moussa'), [])
+
+    def test_reparation_des_declencheurs(self):
+        with connection.cursor() as curseur:
+            curseur.execute(f'DROP TRIGGER {recherche.TABLE}_insertion')
+        Enfant.objects.create(nom='Ousmane Ba', sexe='M', village=self.kolda, date_naissance=naissance())
+        self.assertEqual(self.noms('ousm'), [])
+        self.assertTrue(recherche.reparer(connection))
+        self.assertFalse(recherche.reparer(connection))
+        self.assertEqual(self.noms('ousm'), ['Ousmane Ba'])
+
+        sortie = StringIO()
+        call_command('reconstruire_recherche', stdout=sortie)
+        self.assertIn('3 enfant(s)', sortie.getvalue())
+
+    def test_pagination(self):
+        Enfant.objects.bulk_create([Enfant(nom=f'Mamadou {numero}', sexe='M', village=self.kolda,
+                                           date_naissance=naissance()) for numero in range(5)])
+        page = self.chercher('mamadou', page_size=2)
+        self.assertEqual([e['nom'] for e in page['results']], ['Mamadou 4', 'Mamadou 3'])
+        self.assertIsNone(page['previous'])
+        vus = []
+        url = '/api/enfants/search/?q=mamadou&page_size=2'
+        while url:
+            page = self.client.get(url).data
+            vus += [enfant['nom'] for enfant in page['results']]
+            url = page['next']
+        self.assertEqual(vus, [f'Mamadou {numero}' for numero in range(4, -1, -1)])
+        self.assertIn('page=2', page['previous'])
+        # Pages à cheval sur deux niveaux du classement
+        Enfant.objects.create(nom='Moussa Kane', sexe='M', village=Village.objects.create(nom='Mamadouba'),
+                              date_naissance=naissance())
+        pages = [self.noms('mamadou', page_size=4, page=numero) for numero in [1, 2, 3]]
+        self.assertEqual(pages, [['Mamadou 4', 'Mamadou 3', 'Mamadou 2', 'Mamadou 1'],
+                                 ['Mamadou 0', 'Moussa Kane'], []])
+
+    def test_parametres_invalides(self):
+        for params in [{}, {'q': 'a'}, {'q': ' ;,'}, {'q': 'awa', 'page': '0'}, {'q': 'awa', 'page_size': 'x'}]:
+            self.assertEqual(self.client.get('/api/enfants/search/', params).status_code, 400, params)
+
+    def test_champs_et_liste_rapide(self):
+        resultat = self.chercher('aissa')['results'][0]
+        self.assertNotIn('vaccins', resultat)
+        self.assertEqual(resultat['village'], {'id': self.kolda.pk, 'nom': 'Kolda'})
+        self.assertEqual(self.chercher('aissa', fields='id,nom')['results'], [{'id': self.aissatou.pk,
+                                                                              'nom': 'Aïssatou Diallo'}])
+        url = '/api/enfants/search/?q=aissa&expand=vaccins'
+        contenus = []
+        for rapide in [False, True]:
+            cache.stockage().clear()
+            with override_settings(LISTES_RAPIDES=rapide):
+                contenus.append(self.client.get(url).content)
+        self.assertEqual(contenus[0], contenus[1])
+        self.assertIn(b'BCG', contenus[0])
+
+    def test_validateurs_de_la_liste(self):
+        response = self.client.get('/api/enfants/search/', {'q': 'aissa'})
+        self.assertEqual(self.client.get('/api/enfants/search/', {'q': 'aissa'},
+                                         HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.aissatou.nom = 'Binta Diallo'
+        self.aissatou.save()
+        response = self.client.get('/api/enfants/search/', {'q': 'aissa'}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual((response.status_code, response.data['results']), (200, []))
@@ -0,0 +1,128 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from vaccination.models import Village, Enfant, Vaccin, StatistiqueVillage
+from vaccination.registres import Importateur, cle_enfant
+
+EN_TETE = 'village,enfant,nom,sexe,date_naissance,vaccin,date_administration,statut,notes\n'
+
+
+def registre(enfants, prefixe='K', doses=('BCG', 'Polio', 'DTC')):
+    return EN_TETE + ''.join(
+        f'Kolda,{prefixe}{numero},Enfant {numero},F,01/02/2023,{dose},2023-03-0{rang + 1},recu,\n'
+        for numero in range(enfants) for rang, dose in enumerate(doses)
+    )
+
+
+class ImportRegistreTests(TestCase):
+
+    def setUp(self):
+        dossier = tempfile.TemporaryDirectory()
+        self.addCleanup(dossier.cleanup)
+        self.dossier = dossier.name
+
+    def fichier(self, contenu):
+        chemin = os.path.join(self.dossier, 'registre.csv')
+        with open(chemin, 'w', encoding='utf-8') as fichier:
+            fichier.write(contenu)
+        return chemin
+
+    def importer(self, chemin, **options):
+        sortie = StringIO()
+        call_command('importer_registre', chemin, stdout=sortie, **options)
+        return sortie.getvalue()
+
+    def test_import(self):
+        Village.objects.create(nom='Kolda')
+        chemin = self.fichier(
+            EN_TETE
+            + 'Kolda,K1,Awa Diop,F,2023-01-01,BCG,2023-01-02,recu,\n'
+            + 'Kolda,K1,Awa Diop,F,2023-01-01,Polio,2023-02-01,retard,Absente\n'
+            + 'Joal,J1,Modou Fall,m,2022-05-01,BCG,05/05/2022,,\n'
+            + 'Joal,J2,Fatou Sow,X,2022-05-01,BCG,2022-05-05,recu,\n'
+            + 'Joal,J1,Modou Fall,M,2022-05-01,BCG,2022-05-05,recu,\n'
+        )
+        sortie = self.importer(chemin)
+        self.assertIn('3 vaccins, 2 enfants et 1 villages créés, 1 doublons ignorés, 1 lignes rejetées', sortie)
+        awa = Enfant.objects.get(cle_client=cle_enfant('Kolda', 'K1'))
+        self.assertEqual(list(awa.vaccins.order_by('id').values_list('nom', 'statut', 'notes')),
+                         [('BCG', 'recu', None), ('Polio', 'retard', 'Absente')])
+        self.assertEqual(Enfant.objects.get(cle_client=cle_enfant('Joal', 'J1')).village.nom, 'Joal')
+        statistique = StatistiqueVillage.objects.get(village__nom='Kolda')
+        self.assertEqual((statistique.nombre_enfants, statistique.vaccins_recus, statistique.vaccins_retard), (1, 1, 1))
+        with open(f'{chemin}.rejets.csv', encoding='utf-8') as rejets:
+            self.assertIn("4,sexe inconnu : 'X'", rejets.read())
+
+    def test_numeros_propres_a_chaque_village(self):
+        self.importer(self.fichier(EN_TETE + 'Kolda,1,Awa Diop,F,2023-01-01,BCG,2023-01-02,recu,\n'))
+        chemin = os.path.join(self.dossier, 'joal.csv')
+        with open(chemin, 'w', encoding='utf-8') as fichier:
+            fichier.write(
+                EN_TETE
+                + 'Joal,1,Modou Fall,M,2022-05-01,BCG,2022-05-05,recu,\n'
+                + 'Joal,1,Modou Fall,M,2022-05-01,Polio,2022-06-05,recu,\n'
+                # Même numéro dans le même registre, mais un autre enfant : rejeté
+                + 'Joal,1,Fatou Sow,F,2022-05-01,DTC,2022-06-05,recu,\n'
+            )
+        sortie = self.importer(chemin)
+        self.assertIn('2 vaccins, 1 enfants et 1 villages créés, 0 doublons ignorés, 1 lignes rejetées', sortie)
+        self.assertEqual(sorted(Enfant.objects.values_list('nom', 'village__nom')),
+                         [('Awa Diop', 'Kolda'), ('Modou Fall', 'Joal')])
+        self.assertEqual(Vaccin.objects.filter(enfant__nom='Awa Diop').count(), 1)
+        self.assertEqual(Vaccin.objects.filter(enfant__nom='Modou Fall').count(), 2)
+        with open(f'{chemin}.rejets.csv', encoding='utf-8') as rejets:
+            self.assertIn('3,"enfant 1 déjà inscrit : Modou Fall, né le 2022-05-01"', rejets.read())
+
+    def test_requetes_independantes_du_nombre_de_lignes(self):
+        Village.objects.create(nom='Kolda')
+        nombres = []
+        # Le premier import crée les compteurs de versions : il n'est pas comparé
+        for enfants, nom in [(1, 'amorce'), (5, 'petit'), (60, 'grand')]:
+            chemin = os.path.join(self.dossier, f'{nom}.csv')
+            with open(chemin, 'w', encoding='utf-8') as fichier:
+                fichier.write(registre(enfants, prefixe=nom))
+            # Sans le recalcul final des rendez-vous, dont les INSERT suivent la population
+            with CaptureQueriesContext(connection) as requetes, \
+                    mock.patch('vaccination.rendez_vous.calculer', return_value=0):
+                self.importer(chemin)
+            nombres.append(len(requetes))
+        # Douze fois plus de lignes : au plus un INSERT de plus par table (limite de paramètres de SQLite)
+        self.assertLessEqual(nombres[2] - nombres[1], 2)
+        self.assertEqual(Vaccin.objects.count(), 198)
+
+    def test_reprise_apres_interruption(self):
+        chemin = self.fichier(registre(10))
+        ecrire = Importateur.ecrire
+        appels = []
+
+        def interrompre(importateur, lignes, position):
+            appels.append(position)
+            if len(appels) == 3:
+                raise KeyboardInterrupt
+            return ecrire(importateur, lignes, position)
+
+        with mock.patch.object(Importateur, 'ecrire', interrompre), self.assertRaises(KeyboardInterrupt):
+            self.importer(chemin, lignes_par_transaction=6)
+        self.assertEqual(Vaccin.objects.count(), 12)
+
+        sortie = self.importer(chemin, lignes_par_transaction=6)
+        self.assertIn('Reprise après la ligne 12.', sortie)
+        self.assertIn('18 vaccins, 6 enfants', sortie)
+        self.assertEqual(Vaccin.objects.count(), 30)
+        self.assertEqual(StatistiqueVillage.objects.get(village__nom='Kolda').vaccins_recus, 30)
+
+        self.assertIn('0 vaccins, 0 enfants', self.importer(chemin))
+        self.assertIn('30 doublons ignorés', self.importer(chemin, recommencer=True))
+        self.assertEqual(Vaccin.objects.count(), 30)
+
+    def test_colonnes_manquantes(self):
+        with self.assertRaisesMessage(CommandError, 'colonnes manquantes : nom, sexe'):
+            self.importer(self.fichier('village,enfant,date_naissance,vaccin,date_administration\n'))
@@ -0,0 +1,101 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from vaccination.models import Village, Enfant, Vaccin, DoseCalendrier, RendezVous, Tache
+from vaccination.rendez_vous import calculer
+
+
+class RendezVousTests(TestCase):
+
+    def setUp(self):
+        self.aujourd_hui = timezone.localdate()
+        self.kolda = Village.objects.create(nom='Kolda')
+        self.joal = Village.objects.create(nom='Joal')
+        # 50 jours : doses de naissance en retard, doses de 6 semaines dans la fenêtre
+        self.awa = self.enfant('Awa', self.kolda, 50)
+
+    def enfant(self, nom, village, age_jours):
+        return Enfant.objects.create(nom=nom, sexe='F', village=village,
+                                     date_naissance=self.aujourd_hui - timedelta(days=age_jours))
+
+    def vacciner(self, enfant, nom, statut='recu'):
+        return Vaccin.objects.create(enfant=enfant, nom=nom, date_administration=self.aujourd_hui, statut=statut)
+
+    def attendus(self, enfant):
+        return list(RendezVous.objects.filter(enfant=enfant).order_by('date_prevue', 'vaccin', 'dose')
+                    .values_list('vaccin', 'dose', 'prochaine'))
+
+    def test_doses_restantes(self):
+        self.vacciner(self.awa, 'BCG')
+        self.vacciner(self.awa, 'DTC')
+        self.vacciner(self.awa, 'Polio', statut='retard')
+        self.assertEqual(calculer(), 10)
+        attendus = self.attendus(self.awa)
+        self.assertEqual(attendus[:3], [('Hépatite B', 1, True), ('Polio', 1, False), ('Pneumocoque', 1, False)])
+        self.assertNotIn(('BCG', 1, False), attendus)
+        self.assertEqual([dose for vaccin, dose, _ in attendus if vaccin == 'DTC'], [2, 3])
+        naissance = self.awa.date_naissance
+        rdv = RendezVous.objects.get(enfant=self.awa, vaccin='DTC', dose=2)
+        self.assertEqual((rdv.date_prevue, rdv.date_limite, rdv.village_id),
+                         (naissance + timedelta(days=70), naissance + timedelta(days=98), self.kolda.pk))
+
+    def test_requetes_independantes_de_la_population(self):
+        nombres = []
+        for enfants in [1, 8]:
+            for numero in range(enfants):
+                self.enfant(f'Enfant {numero}', self.joal, numero * 30)
+            with CaptureQueriesContext(connection) as requetes:
+                calculer()
+            nombres.append(len(requetes))
+        self.assertEqual(nombres[0], nombres[1])
+
+    def test_recalcul_apres_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            modou = self.enfant('Modou', self.joal, 10)
+        self.assertEqual(len(self.attendus(modou)), 12)
+        with self.captureOnCommitCallbacks(execute=True):
+            vaccin = self.vacciner(modou, 'BCG')
+        self.assertEqual(len(self.attendus(modou)), 11)
+        with self.captureOnCommitCallbacks(execute=True):
+            vaccin.enfant = self.awa
+            vaccin.save()
+        self.assertEqual(len(self.attendus(modou)), 12)
+        self.assertEqual(len(self.attendus(self.awa)), 11)
+        with self.captureOnCommitCallbacks(execute=True):
+            DoseCalendrier.objects.create(vaccin='Polio', dose=2, age_jours=42)
+            DoseCalendrier.objects.create(vaccin='Polio', dose=3, age_jours=70)
+        # Recalcul de toute la population laissé au travailleur, une seule fois
+        self.assertEqual(len(self.attendus(modou)), 12)
+        self.assertEqual(Tache.objects.filter(nom='recalculer_rendez_vous').count(), 1)
+        call_command('travailleur', processus=0, une_fois=True, attente=0, stdout=StringIO())
+        self.assertEqual(len(self.attendus(modou)), 14)
+
+    def test_api(self):
+        self.enfant('Modou', self.joal, 400)
+        calculer()
+        response = self.client.get('/api/rendez-vous/', {'village': 'Kolda', 'page_size': 50})
+        self.assertEqual(response.status_code, 200)
+        resultats = response.json()['results']
+        self.assertEqual(len(resultats), 12)
+        self.assertEqual([r['date_prevue'] for r in resultats], sorted(r['date_prevue'] for r in resultats))
+        statuts = {(r['vaccin'], r['dose']): r['statut'] for r in resultats}
+        self.assertEqual(statuts['BCG', 1], 'en_retard')
+        self.assertEqual(statuts['DTC', 1], 'du')
+        self.assertEqual(statuts['DTC', 2], 'a_venir')
+        self.assertEqual(resultats[0]['enfant_nom'], 'Awa')
+
+        intervalle = self.client.get('/api/rendez-vous/', {
+            'from': str(self.aujourd_hui), 'to': str(self.aujourd_hui + timedelta(days=60)),
+        }).json()['results']
+        self.assertEqual({(r['enfant_nom'], r['vaccin'], r['dose']) for r in intervalle},
+                         {('Awa', 'DTC', 2), ('Awa', 'DTC', 3), ('Modou', 'Méningite', 1), ('Modou', 'ROR', 1)})
+        en_retard = self.client.get('/api/rendez-vous/', {'statut': 'en_retard', 'prochaine': '1'}).json()['results']
+        self.assertEqual([(r['enfant_nom'], r['vaccin']) for r in en_retard], [('Modou', 'BCG'), ('Awa', 'BCG')])
+        self.assertEqual(self.client.get('/api/rendez-vous/', {'statut': 'demain'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/rendez-vous/', {'from': 'lundi'}).status_code, 400)
@@ -0,0 +1,78 @@
+from datetime import date
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from vaccination.models import Village, Enfant, Vaccin
+
+
+def creer_donnees(nb_enfants, nb_vaccins=3):
+    villages = [Village.objects.create(nom=f'Village {i}') for i in range(3)]
+    for i in range(nb_enfants):
+        enfant = Enfant.objects.create(
+            nom=f'Enfant {i}',
+            sexe='M' if i % 2 else 'F',
+            village=villages[i % len(villages)],
+            date_naissance=date(2023, 1, 1),
+        )
+        for j in range(nb_vaccins):
+            Vaccin.objects.create(
+                enfant=enfant,
+                nom=f'Vaccin {j}',
+                date_administration=date(2023, 3, 1),
+                statut='recu',
+            )
+
+
+class BudgetRequetesTests(TestCase):
+    """Nombre de requêtes SQL fixe par endpoint, indépendant du volume de données."""
+
+    # (url, nombre de requêtes attendu), dont une pour les validateurs ETag/Last-Modified
+    BUDGETS = [
+        ('/api/enfants/', 2),
+        ('/api/enfants/?expand=vaccins', 3),
+        ('/api/villages/', 2),
+        ('/api/vaccins/', 2),
+    ]
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def verifier_budget(self, url, budget):
+        with self.assertNumQueries(budget):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_listes_budget_constant(self):
+        creer_donnees(2)
+        for url, budget in self.BUDGETS:
+            self.verifier_budget(url, budget)
+        creer_donnees(20)
+        for url, budget in self.BUDGETS:
+            self.verifier_budget(url, budget)
+
+    def test_detail_enfant(self):
+        creer_donnees(5)
+        enfant = Enfant.objects.first()
+        response = self.verifier_budget(f'/api/enfants/{enfant.id}/', 3)
+        self.assertEqual(response.data['village']['nom'], enfant.village.nom)
+        self.assertEqual(len(response.data['vaccins']), 3)
+
+    def test_detail_village(self):
+        creer_donnees(1)
+        village = Village.objects.first()
+        self.verifier_budget(f'/api/villages/{village.id}/', 2)
+
+    def test_detail_vaccin(self):
+        creer_donnees(1)
+        vaccin = Vaccin.objects.first()
+        self.verifier_budget(f'/api/vaccins/{vaccin.id}/', 2)
+
+    def test_liste_enfants_contenu(self):
+        creer_donnees(4, nb_vaccins=2)
+        response = self.verifier_budget('/api/enfants/?expand=vaccins', 3)
+        self.assertEqual(len(response.data['results']), 4)
+        for enfant in response.data['results']:
+            self.assertEqual(len(enfant['vaccins']), 2)
+            self.assertIn('nom', enfant['village'])
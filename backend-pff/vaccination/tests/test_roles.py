@@ -0,0 +1,59 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from vaccination.models import Profile
+from vaccination.roles import compter_roles, creer_profils_manquants
+
+
+class RapportsRolesTests(TestCase):
+
+    def setUp(self):
+        for i, role in enumerate(['agent', 'agent', 'parent', 'admin']):
+            user = User.objects.create(username=f'user{i}', email=f'user{i}@example.sn')
+            user.profile.role = role
+            user.profile.save()
+        Profile.objects.filter(user__username='user3').delete()
+        User.objects.bulk_create([User(username=f'sans{i}') for i in range(3)])
+
+    def test_compter_roles_une_requete(self):
+        with self.assertNumQueries(1):
+            comptes = compter_roles()
+        self.assertEqual(comptes, {None: 4, 'agent': 2, 'parent': 1})
+
+    def test_creer_profils_manquants(self):
+        with self.assertNumQueries(5):
+            self.assertEqual(creer_profils_manquants(taille=2), 4)
+        self.assertEqual(compter_roles(), {'agent': 2, 'parent': 5})
+        self.assertEqual(creer_profils_manquants(), 0)
+
+    def test_profil_cree_entre_temps(self):
+        bulk_create = Profile.objects.bulk_create
+
+        def concurrent(lot, **options):
+            # Un autre processus crée le profil du premier utilisateur du lot
+            Profile.objects.create(user_id=lot[0].user_id, role='agent')
+            return bulk_create(lot, **options)
+
+        with mock.patch.object(Profile.objects, 'bulk_create', side_effect=concurrent):
+            with self.assertRaises(CommandError):
+                call_command('corriger_profils', stdout=StringIO())
+        # Rien d'écrit : relancée, la commande compte exactement ce qu'elle crée
+        self.assertEqual(compter_roles(), {None: 4, 'agent': 2, 'parent': 1})
+        self.assertEqual(creer_profils_manquants(), 4)
+
+    def test_commandes(self):
+        sortie = StringIO()
+        call_command('voir_roles', stdout=sortie)
+        self.assertIn('user0@example.sn', sortie.getvalue())
+        self.assertIn('Agent de santé: 2', sortie.getvalue())
+        self.assertIn('Aucun profil: 4', sortie.getvalue())
+        call_command('corriger_profils', role='tuteur', stdout=StringIO())
+        sortie = StringIO()
+        call_command('voir_roles', statistiques=True, stdout=sortie)
+        self.assertIn('Tuteur: 4', sortie.getvalue())
+        self.assertNotIn('user0@example.sn', sortie.getvalue())
@@ -0,0 +1,101 @@
+import os
+import sqlite3
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from vaccination import cache
+from vaccination.models import Village
+from vaccination.routage import COOKIE_COLLANT, RoutageLectureEcriture
+
+
+@override_settings(REPLIQUE_ALIAS='replique')
+class RoutageTests(TestCase):
+
+    def setUp(self):
+        cache.stockage().clear()
+        Village.objects.create(nom='Kolda')
+        self.tokens = [Token.objects.create(user=User.objects.create_user(nom)).key for nom in ['awa', 'modou']]
+
+    def bases(self, appel):
+        """Bases choisies par le routeur pendant `appel` ; les requêtes restent sur la base de test."""
+        bases = []
+        original = RoutageLectureEcriture.db_for_read
+
+        def espion(routeur, model, **hints):
+            if model._meta.app_label == 'vaccination':
+                bases.append(original(routeur, model, **hints))
+
+        with mock.patch.object(RoutageLectureEcriture, 'db_for_read', espion):
+            response = appel()
+        return response, set(bases)
+
+    def test_lectures_sur_la_replique(self):
+        for chemin in ['/api/villages/', '/api/enfants/', '/api/statistiques/']:
+            response, bases = self.bases(lambda: self.client.get(chemin))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(bases, {'replique'}, chemin)
+
+    def test_ecritures_et_synchronisation_sur_la_principale(self):
+        response, bases = self.bases(
+            lambda: self.client.post('/api/villages/', {'nom': 'Joal'}, content_type='application/json')
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(bases, {None})
+        self.assertEqual(self.bases(lambda: APIClient().get('/api/sync/'))[1], {None})
+
+    def test_relire_ses_ecritures(self):
+        response = self.client.post('/api/villages/', {'nom': 'Joal'}, content_type='application/json')
+        self.assertIn(COOKIE_COLLANT, response.cookies)
+        self.assertEqual(self.bases(lambda: self.client.get('/api/villages/'))[1], {None})
+
+    def test_collant_par_jeton(self):
+        auteur, autre = APIClient(), APIClient()
+        auteur.credentials(HTTP_AUTHORIZATION=f'Token {self.tokens[0]}')
+        autre.credentials(HTTP_AUTHORIZATION=f'Token {self.tokens[1]}')
+        auteur.post('/api/villages/', {'nom': 'Joal'}, format='json')
+        auteur.cookies.clear()
+        self.assertEqual(self.bases(lambda: auteur.get('/api/villages/'))[1], {None})
+        self.assertEqual(self.bases(lambda: autre.get('/api/villages/'))[1], {'replique'})
+
+    def test_cache_separe_pour_la_replique(self):
+        self.bases(lambda: self.client.get('/api/villages/'))
+        self.client.cookies[COOKIE_COLLANT] = '1'
+        avant = cache.compteurs()['echecs']
+        self.bases(lambda: self.client.get('/api/villages/'))
+        self.assertEqual(cache.compteurs()['echecs'], avant + 1)
+
+    @override_settings(REPLIQUE_ALIAS=None)
+    def test_sans_replique(self):
+        response, bases = self.bases(lambda: self.client.post(
+            '/api/villages/', {'nom': 'Joal'}, content_type='application/json'
+        ))
+        self.assertNotIn(COOKIE_COLLANT, response.cookies)
+        self.assertEqual(self.bases(lambda: self.client.get('/api/villages/'))[1], {None})
+
+    def test_migrations_sur_la_principale(self):
+        routeur = RoutageLectureEcriture()
+        self.assertTrue(routeur.allow_migrate('default', 'vaccination'))
+        self.assertFalse(routeur.allow_migrate('replique', 'vaccination'))
+        self.assertIsNone(routeur.db_for_read(User))
+
+
+class RepliquerBaseTests(TransactionTestCase):
+
+    def test_copie(self):
+        Village.objects.create(nom='Kolda')
+        with tempfile.TemporaryDirectory() as dossier:
+            chemin = os.path.join(dossier, 'replique.sqlite3')
+            call_command('repliquer_base', vers=chemin, stdout=StringIO())
+            copie = sqlite3.connect(chemin)
+            try:
+                self.assertEqual(copie.execute('SELECT nom FROM vaccination_village').fetchall(), [('Kolda',)])
+            finally:
+                copie.close()
+            self.assertEqual(os.listdir(dossier), ['replique.sqlite3'])
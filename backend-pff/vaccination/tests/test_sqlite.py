@@ -0,0 +1,75 @@
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase
+
+from vaccination.verrous import ecriture, reessayer_si_verrouillee
+
+
+class RepriseTests(TransactionTestCase):
+
+    def fonction(self, *erreurs):
+        appels = mock.Mock(side_effect=[*erreurs, 'ok'])
+        return appels, reessayer_si_verrouillee(appels, delai=0)
+
+    def test_relance_si_verrouillee(self):
+        appels, fonction = self.fonction(OperationalError('database is locked'), OperationalError('database is locked'))
+        self.assertEqual(fonction(1, a=2), 'ok')
+        self.assertEqual(appels.call_count, 3)
+        appels.assert_called_with(1, a=2)
+
+    def test_abandon_apres_tentatives(self):
+        appels, fonction = self.fonction(*[OperationalError('database is locked')] * 4)
+        with self.assertRaises(OperationalError):
+            fonction()
+        self.assertEqual(appels.call_count, 4)
+
+    def test_autres_erreurs_propagees(self):
+        appels, fonction = self.fonction(OperationalError('no such table: x'))
+        with self.assertRaises(OperationalError):
+            fonction()
+        self.assertEqual(appels.call_count, 1)
+
+
+class RepriseTransactionTests(TransactionTestCase):
+
+    def test_pas_de_relance_dans_un_bloc_atomic(self):
+        appels = mock.Mock(side_effect=[OperationalError('database is locked'), 'ok'])
+        with self.assertRaises(OperationalError), transaction.atomic():
+            reessayer_si_verrouillee(appels, delai=0)()
+        self.assertEqual(appels.call_count, 1)
+
+    def test_ecriture_immediate_lecture_differee(self):
+        with mock.patch.object(connection, '_start_transaction_under_autocommit',
+                               wraps=connection._start_transaction_under_autocommit) as debut:
+            modes = []
+            debut.side_effect = lambda: modes.append(connection.transaction_mode)
+            with ecriture():
+                pass
+            with transaction.atomic():
+                pass
+        self.assertEqual(modes, ['IMMEDIATE', None])
+        self.assertIsNone(connection.transaction_mode)
+
+
+class PragmasTests(TestCase):
+
+    def pragma(self, nom):
+        with connection.cursor() as curseur:
+            curseur.execute(f'PRAGMA {nom}')
+            return curseur.fetchone()[0]
+
+    @skipUnless(settings.SQLITE_PROFIL == 'production', 'profil SQLite par défaut uniquement')
+    def test_profil_production_applique(self):
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('busy_timeout'), 20000)
+        self.assertEqual(self.pragma('temp_store'), 2)
+        self.assertEqual(connection.settings_dict['CONN_MAX_AGE'], 600)
+        # Les lectures (synchronisation) ne prennent pas le verrou d'écriture
+        self.assertNotIn('transaction_mode', connection.settings_dict['OPTIONS'])
+
+    def test_profil_simple(self):
+        profil = settings.PROFILS_SQLITE['simple']
+        self.assertEqual(profil['CONN_MAX_AGE'], 0)
+        self.assertNotIn('transaction_mode', profil['OPTIONS'])
@@ -0,0 +1,138 @@
+from datetime import date, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from vaccination.models import Village, Enfant, Vaccin, StatistiqueVillage, RendezVous
+from vaccination.statistiques import reconstruire
+
+
+class StatistiquesIncrementalesTests(TestCase):
+
+    def setUp(self):
+        self.thies = Village.objects.create(nom='Thiès')
+        self.mbour = Village.objects.create(nom='Mbour')
+        self.enfant = Enfant.objects.create(
+            nom='Fatou', sexe='F', village=self.thies, date_naissance=date(2023, 1, 1)
+        )
+
+    def stat(self, village):
+        return StatistiqueVillage.objects.get(village=village)
+
+    def vacciner(self, statut='recu', enfant=None):
+        return Vaccin.objects.create(
+            enfant=enfant or self.enfant, nom='BCG',
+            date_administration=date(2023, 2, 1), statut=statut,
+        )
+
+    def assertCoherent(self):
+        attendu = {
+            (s.village_id, s.nombre_enfants, s.vaccins_recus, s.vaccins_retard)
+            for s in StatistiqueVillage.objects.all()
+        }
+        reconstruire()
+        recalcule = {
+            (s.village_id, s.nombre_enfants, s.vaccins_recus, s.vaccins_retard)
+            for s in StatistiqueVillage.objects.all()
+        }
+        self.assertEqual(attendu, recalcule)
+
+    def test_creation_enfant_et_vaccins(self):
+        self.vacciner('recu')
+        self.vacciner('retard')
+        stat = self.stat(self.thies)
+        self.assertEqual((stat.nombre_enfants, stat.vaccins_recus, stat.vaccins_retard), (1, 1, 1))
+        self.assertCoherent()
+
+    def test_ecriture_en_temps_constant(self):
+        for _ in range(5):
+            self.vacciner()
+        # Révision (2) + INSERT + version de table + village de l'enfant
+        # + UPDATE des compteurs + UPDATE de la couverture de l'enfant + savepoint (2),
+        # quel que soit le volume
+        with self.assertNumQueries(9):
+            self.vacciner()
+        vaccin = Vaccin.objects.first()
+        vaccin.statut = 'retard'
+        with self.assertNumQueries(13):
+            vaccin.save()
+        self.assertCoherent()
+
+    def test_changement_statut_et_suppression(self):
+        vaccin = self.vacciner('recu')
+        vaccin.statut = 'retard'
+        vaccin.save()
+        stat = self.stat(self.thies)
+        self.assertEqual((stat.vaccins_recus, stat.vaccins_retard), (0, 1))
+        vaccin.delete()
+        stat = self.stat(self.thies)
+        self.assertEqual((stat.vaccins_recus, stat.vaccins_retard), (0, 0))
+
+    def test_demenagement_enfant(self):
+        self.vacciner('recu')
+        self.vacciner('retard')
+        self.enfant.village = self.mbour
+        self.enfant.save()
+        self.assertEqual(self.stat(self.thies).nombre_enfants, 0)
+        self.assertEqual(self.stat(self.thies).vaccins_recus, 0)
+        self.assertEqual(self.stat(self.mbour).nombre_enfants, 1)
+        self.assertEqual(self.stat(self.mbour).vaccins_retard, 1)
+        self.assertCoherent()
+
+    def test_suppression_en_cascade(self):
+        self.vacciner()
+        self.enfant.delete()
+        stat = self.stat(self.thies)
+        self.assertEqual((stat.nombre_enfants, stat.vaccins_recus), (0, 0))
+        self.thies.delete()
+        self.assertFalse(StatistiqueVillage.objects.filter(village_id=self.thies.id).exists())
+
+    def test_ligne_manquante_recalculee(self):
+        self.vacciner()
+        StatistiqueVillage.objects.all().delete()
+        self.vacciner()
+        self.assertEqual(self.stat(self.thies).vaccins_recus, 2)
+
+    def test_commande_recalcul(self):
+        self.vacciner()
+        StatistiqueVillage.objects.update(nombre_enfants=42)
+        call_command('recalculer_statistiques', stdout=StringIO())
+        self.assertEqual(self.stat(self.thies).nombre_enfants, 1)
+
+
+class StatistiquesEndpointTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        village = Village.objects.create(nom='Joal')
+        Village.objects.create(nom='Popenguine')
+        enfants = [
+            Enfant.objects.create(nom=f'E{i}', sexe='M', village=village, date_naissance=date(2022, 5, 1))
+            for i in range(2)
+        ]
+        aujourd_hui = timezone.localdate()
+        for statut in ['recu', 'recu', 'recu', 'retard']:
+            Vaccin.objects.create(enfant=enfants[0], nom='DTC', date_administration=date(2022, 7, 1), statut=statut)
+        Vaccin.objects.create(enfant=enfants[1], nom='Polio', date_administration=date(2022, 6, 1), statut='recu')
+        # Seule la prochaine dose de chaque enfant compte, et pas une fois en retard
+        for enfant, prevue, prochaine in [(enfants[0], aujourd_hui + timedelta(days=10), True),
+                                          (enfants[0], aujourd_hui + timedelta(days=40), False),
+                                          (enfants[1], aujourd_hui - timedelta(days=60), True)]:
+            RendezVous.objects.create(enfant=enfant, village=village, vaccin='VPO', dose=1, date_prevue=prevue,
+                                      date_limite=prevue + timedelta(days=28), prochaine=prochaine)
+
+    def test_reponse(self):
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/statistiques/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['nombre_enfants'], 2)
+        self.assertEqual(response.data['vaccins_recus'], 4)
+        self.assertEqual(response.data['vaccins_retard'], 1)
+        self.assertEqual(response.data['prochains_rendez_vous'], 1)
+        self.assertAlmostEqual(response.data['taux_couverture_global'], round(100 * 4 / 24, 2))
+        villages = {v['village']: v for v in response.data['villages']}
+        self.assertEqual(villages['Joal']['nombre_enfants'], 2)
+        self.assertEqual(villages['Popenguine']['taux_couverture'], 0.0)
@@ -0,0 +1,83 @@
+from datetime import date
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from vaccination.models import Village, Enfant, Vaccin, Suppression
+
+
+class SynchronisationTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.village = Village.objects.create(nom='Mbour')
+        self.enfant = Enfant.objects.create(nom='Ousmane', sexe='M', village=self.village, date_naissance=date(2023, 2, 1))
+        self.vaccin = Vaccin.objects.create(enfant=self.enfant, nom='BCG', date_administration=date(2023, 2, 2), statut='recu')
+
+    def sync(self, token=None, **params):
+        if token is not None:
+            params['since'] = token
+        response = self.client.get('/api/sync/', params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_synchronisation_initiale(self):
+        lot = self.sync()
+        self.assertTrue(lot['complet'])
+        self.assertEqual([v['id'] for v in lot['villages']], [self.village.id])
+        self.assertEqual(lot['enfants'][0]['village_id'], self.village.id)
+        self.assertEqual(lot['vaccins'][0]['enfant_id'], self.enfant.id)
+
+    def test_seulement_les_changements(self):
+        token = self.sync()['token']
+        self.assertEqual(self.sync(token)['enfants'], [])
+
+        self.enfant.nom = 'Ousmane Ba'
+        self.enfant.save()
+        lot = self.sync(token)
+        self.assertEqual([e['nom'] for e in lot['enfants']], ['Ousmane Ba'])
+        self.assertEqual(lot['villages'], [])
+        self.assertEqual(lot['vaccins'], [])
+        self.assertEqual(self.sync(lot['token'])['enfants'], [])
+
+    def test_update_fields_incremente_la_revision(self):
+        token = self.sync()['token']
+        self.village.nom = 'Mbour Sérère'
+        self.village.save(update_fields=['nom'])
+        self.assertEqual(len(self.sync(token)['villages']), 1)
+
+    def test_suppressions(self):
+        token = self.sync()['token']
+        enfant_id, vaccin_id = self.enfant.id, self.vaccin.id
+        self.enfant.delete()
+        lot = self.sync(token)
+        self.assertEqual(lot['suppressions']['enfant'], [enfant_id])
+        self.assertEqual(lot['suppressions']['vaccin'], [vaccin_id])
+        self.assertEqual(Suppression.objects.count(), 2)
+
+    def test_cout_independant_du_volume(self):
+        for i in range(20):
+            Enfant.objects.create(nom=f'E{i}', sexe='F', village=self.village, date_naissance=date(2024, 1, 1))
+        token = self.sync()['token']
+        self.vaccin.statut = 'retard'
+        self.vaccin.save()
+        with self.assertNumQueries(7):
+            lot = self.sync(token)
+        self.assertEqual(len(lot['vaccins']), 1)
+
+    def test_lots_limites(self):
+        for i in range(4):
+            Vaccin.objects.create(enfant=self.enfant, nom=f'V{i}', date_administration=date(2023, 3, 1), statut='recu')
+        vus, token = [], None
+        while True:
+            lot = self.sync(token, limite=2)
+            vus.extend(v['id'] for v in lot['vaccins'])
+            token = lot['token']
+            self.assertLessEqual(len(lot['villages']) + len(lot['enfants']) + len(lot['vaccins']), 2)
+            if lot['complet']:
+                break
+        self.assertEqual(sorted(vus), sorted(Vaccin.objects.values_list('id', flat=True)))
+
+    def test_token_invalide(self):
+        self.assertEqual(self.client.get('/api/sync/', {'since': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/sync/', {'since': '999999'}).status_code, 400)
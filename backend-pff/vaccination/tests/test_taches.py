@@ -0,0 +1,205 @@
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from vaccination import taches
+from vaccination.models import Village, Enfant, Vaccin, StatistiqueVillage, Tache
+
+
+def doubler(execution, valeur):
+    execution.avancer(50.0, 'moitié', forcer=True)
+    return {'valeur': 2 * valeur}
+
+
+def echouer(execution):
+    raise RuntimeError('base indisponible')
+
+
+def lire_echeance(execution):
+    return {'expire_le': Tache.objects.values_list('expire_le', flat=True).get(pk=execution.pk)}
+
+
+TACHES_DE_TEST = {
+    'doubler': taches.Definition(doubler, 3, 60, False),
+    'lire_echeance': taches.Definition(lire_echeance, 1, 60, False),
+    'echouer': taches.Definition(echouer, 2, 60, False),
+}
+
+
+@mock.patch.dict(taches.TACHES, TACHES_DE_TEST)
+class FileTachesTests(TestCase):
+
+    def test_reservation_exclusive(self):
+        premiere = taches.mettre_en_file('doubler', {'valeur': 1})
+        seconde = taches.mettre_en_file('doubler', {'valeur': 2})
+        taches.mettre_en_file('doubler', {'valeur': 3}, apres=timezone.now() + timedelta(hours=1))
+        self.assertEqual(taches.reserver('a', 1), [(premiere.pk, 1, 60)])
+        self.assertEqual(taches.reserver('b', 5), [(seconde.pk, 1, 60)])
+        # Plus rien de prêt : la troisième attend son heure
+        self.assertEqual(taches.reserver('c', 5), [])
+        self.assertEqual(Tache.objects.get(pk=premiere.pk).travailleur, 'a')
+
+    def test_tache_inconnue(self):
+        with self.assertRaises(taches.TacheInconnue):
+            taches.mettre_en_file('inexistante')
+
+    def test_execution(self):
+        tache = taches.mettre_en_file('doubler', {'valeur': 21})
+        [(pk, tentative, _)] = taches.reserver('a', 1)
+        taches.executer(pk, tentative)
+        tache.refresh_from_db()
+        self.assertEqual((tache.statut, tache.resultat, tache.progression), (Tache.TERMINEE, {'valeur': 42}, 100.0))
+        self.assertEqual(tache.message, 'moitié')
+
+    def test_nouvelles_tentatives_puis_echec(self):
+        tache = taches.mettre_en_file('echouer')
+        [(pk, tentative, _)] = taches.reserver('a', 1)
+        taches.executer(pk, tentative)
+        tache.refresh_from_db()
+        self.assertEqual((tache.statut, tache.tentatives), (Tache.EN_ATTENTE, 1))
+        self.assertIn('RuntimeError: base indisponible', tache.erreur)
+        self.assertGreater(tache.executer_apres, timezone.now() + timedelta(seconds=taches.DELAI_REPRISE - 5))
+
+        Tache.objects.filter(pk=pk).update(executer_apres=timezone.now())
+        [(pk, tentative, _)] = taches.reserver('a', 1)
+        self.assertEqual(tentative, 2)
+        taches.executer(pk, tentative)
+        tache.refresh_from_db()
+        self.assertEqual((tache.statut, tache.tentatives), (Tache.ECHEC, 2))
+        self.assertIsNotNone(tache.fin)
+
+    def test_tentative_perimee(self):
+        taches.mettre_en_file('doubler', {'valeur': 1})
+        [(pk, tentative, _)] = taches.reserver('a', 1)
+        # Échéance dépassée depuis longtemps : un autre travailleur reprend la tâche
+        Tache.objects.filter(pk=pk).update(expire_le=timezone.now() - timedelta(hours=1))
+        self.assertEqual(taches.reprendre_expirees(), 1)
+        Tache.objects.filter(pk=pk).update(executer_apres=timezone.now())
+        self.assertEqual(taches.reserver('b', 1), [(pk, 2, 60)])
+        # L'ancienne tentative ne peut plus rien écrire
+        self.assertEqual(taches.terminer(pk, tentative, {'valeur': 0}), 0)
+        self.assertEqual(Tache.objects.get(pk=pk).statut, Tache.EN_COURS)
+
+    def test_sans_echeance(self):
+        taches.mettre_en_file('doubler', {'valeur': 1})
+        [(pk, tentative, _)] = taches.reserver('a', 1, echeance=False)
+        # Longue exécution dans le travailleur : les autres ne la reprennent pas
+        self.assertEqual(taches.reprendre_expirees(marge=-3600), 0)
+        self.assertEqual(Tache.objects.values_list('statut', 'tentatives').get(pk=pk), (Tache.EN_COURS, 1))
+
+    def test_avancement_indicatif(self):
+        taches.mettre_en_file('doubler', {'valeur': 1})
+        [(pk, tentative, _)] = taches.reserver('a', 1)
+        execution = taches.Execution(pk, tentative)
+        with mock.patch('django.db.models.QuerySet.update', side_effect=OperationalError('database is locked')):
+            execution.avancer(10.0, 'début', forcer=True)
+        # Publications rapprochées ignorées
+        execution.avancer(20.0, 'suite')
+        execution.avancer(30.0, 'fin', forcer=True)
+        self.assertEqual(Tache.objects.values_list('progression', 'message').get(pk=pk), (30.0, 'fin'))
+
+    def test_relacher(self):
+        taches.mettre_en_file('doubler', {'valeur': 1})
+        [(pk, tentative, _)] = taches.reserver('a', 1)
+        taches.relacher(pk, tentative)
+        self.assertEqual(Tache.objects.values_list('statut', 'tentatives').get(pk=pk), (Tache.EN_ATTENTE, 0))
+
+    def test_travailleur(self):
+        premiere = taches.mettre_en_file('doubler', {'valeur': 1})
+        seconde = taches.mettre_en_file('echouer')
+        sortie = StringIO()
+        call_command('travailleur', processus=0, une_fois=True, attente=0, stdout=sortie)
+        self.assertEqual(Tache.objects.get(pk=premiere.pk).statut, Tache.TERMINEE)
+        # Nouvel essai programmé plus tard : le travailleur s'arrête sans l'attendre
+        self.assertEqual(Tache.objects.get(pk=seconde.pk).statut, Tache.EN_ATTENTE)
+        self.assertIn(f'Tâche {premiere.pk} : terminee.', sortie.getvalue())
+
+    def test_travailleur_sans_processus_sans_echeance(self):
+        tache = taches.mettre_en_file('lire_echeance')
+        call_command('travailleur', processus=0, une_fois=True, attente=0, stdout=StringIO())
+        self.assertEqual(Tache.objects.get(pk=tache.pk).resultat, {'expire_le': None})
+
+
+class ApiTachesTests(TestCase):
+
+    def setUp(self):
+        dossier = tempfile.TemporaryDirectory()
+        self.addCleanup(dossier.cleanup)
+        reglages = override_settings(TACHES_DOSSIER=dossier.name)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        self.agent = User.objects.create_user('agent')
+        self.admin = User.objects.create_user('admin', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.agent)
+        kolda = Village.objects.create(nom='Kolda')
+        awa = Enfant.objects.create(nom='Awa', sexe='F', village=kolda, date_naissance=date(2023, 1, 1))
+        Vaccin.objects.create(enfant=awa, nom='BCG', date_administration=date(2023, 1, 2), statut='recu')
+
+    def travailler(self):
+        call_command('travailleur', processus=0, une_fois=True, attente=0, stdout=StringIO())
+
+    def test_creation_reservee_aux_administrateurs(self):
+        self.assertEqual(self.client.post('/api/taches/', {'nom': 'reconstruire_statistiques'}).status_code, 403)
+        self.client.force_authenticate(self.admin)
+        for donnees in [{'nom': 'importer_registre'}, {'nom': 'inconnue'},
+                        {'nom': 'reconstruire_statistiques', 'parametres': {'village': 1}}]:
+            self.assertEqual(self.client.post('/api/taches/', donnees, format='json').status_code, 400, donnees)
+
+    def test_suivi(self):
+        self.client.force_authenticate(self.admin)
+        StatistiqueVillage.objects.all().delete()
+        response = self.client.post('/api/taches/', {'nom': 'reconstruire_statistiques'}, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['statut'], Tache.EN_ATTENTE)
+        suivi = self.client.get(response['Location'])
+        self.assertEqual(suivi['Retry-After'], '2')
+
+        self.travailler()
+        suivi = self.client.get(response['Location'])
+        self.assertEqual((suivi.data['statut'], suivi.data['resultat']), (Tache.TERMINEE, {'villages': 1}))
+        self.assertFalse(suivi.has_header('Retry-After'))
+        self.assertEqual(StatistiqueVillage.objects.get().vaccins_recus, 1)
+        # Un autre utilisateur ne voit pas la tâche
+        self.client.force_authenticate(self.agent)
+        self.assertEqual(self.client.get(response['Location']).status_code, 404)
+        self.assertEqual(self.client.get('/api/taches/').data['results'], [])
+
+    def test_export_differe(self):
+        direct = b''.join(self.client.get('/api/export/enfants.csv?village=Kolda').streaming_content)
+        self.client.force_authenticate(self.admin)
+        parametres = {'extension': 'csv', 'gzip': False, 'filtres': {'village': 'Kolda'}}
+        response = self.client.post('/api/taches/', {'nom': 'exporter_enfants', 'parametres': parametres},
+                                    format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['parametres'], parametres)
+        self.assertIsNone(response.data['fichier'])
+
+        self.travailler()
+        suivi = self.client.get(response['Location'])
+        self.assertEqual(suivi.data['resultat']['enfants'], 1)
+        fichier = self.client.get(suivi.data['fichier'])
+        self.assertEqual(fichier.status_code, 200)
+        self.assertEqual(b''.join(fichier.streaming_content), direct)
+
+    def test_export_differe_filtres_invalides(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.post('/api/taches/', {
+            'nom': 'exporter_enfants', 'parametres': {'filtres': {'date_naissance_min': 'hier'}},
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Tache.objects.exists())
+
+    def test_export_get_sans_tache(self):
+        # Un GET d'export n'écrit jamais en base, même avec l'ancien ?differe=1
+        response = self.client.get('/api/export/enfants.csv?village=Kolda&differe=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Tache.objects.exists())
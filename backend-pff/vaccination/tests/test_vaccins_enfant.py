@@ -0,0 +1,57 @@
+from datetime import date
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from vaccination.models import Village, Enfant, Vaccin, StatistiqueVillage
+
+
+class VaccinsEnfantTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        village = Village.objects.create(nom='Popenguine')
+        self.enfant = Enfant.objects.create(nom='Aminata', sexe='F', village=village, date_naissance=date(2023, 8, 1))
+        self.autre = Enfant.objects.create(nom='Mamadou', sexe='M', village=village, date_naissance=date(2023, 9, 1))
+        for nom in ['BCG', 'Polio']:
+            Vaccin.objects.create(enfant=self.enfant, nom=nom, date_administration=date(2023, 8, 2), statut='recu')
+        Vaccin.objects.create(enfant=self.autre, nom='BCG', date_administration=date(2023, 9, 2), statut='retard')
+        self.url = f'/api/enfants/{self.enfant.id}/vaccins/'
+
+    def test_liste(self):
+        with self.assertNumQueries(2) as contexte:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([v['nom'] for v in response.data], ['BCG', 'Polio'])
+        self.assertIn(f'"enfant_id" = {self.enfant.id}', contexte.captured_queries[1]['sql'])
+
+    def test_liste_filtree(self):
+        response = self.client.get(f'/api/enfants/{self.autre.id}/vaccins/?statut=retard')
+        self.assertEqual(len(response.data), 1)
+
+    def test_creation(self):
+        response = self.client.post(self.url, {
+            'nom': 'Rougeole', 'date_administration': '2024-05-01', 'statut': 'retard',
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(Vaccin.objects.get(pk=response.data['id']).enfant_id, self.enfant.id)
+        self.assertEqual(StatistiqueVillage.objects.get(village=self.enfant.village).vaccins_retard, 2)
+
+    def test_enfant_inconnu(self):
+        self.assertEqual(self.client.get('/api/enfants/9999/vaccins/').status_code, 404)
+        response = self.client.post('/api/enfants/9999/vaccins/', {
+            'nom': 'BCG', 'date_administration': '2024-05-01', 'statut': 'recu',
+        }, format='json')
+        self.assertEqual(response.status_code, 404)
+
+    def test_creation_a_plat(self):
+        response = self.client.post('/api/vaccins/', {
+            'enfant': self.autre.id, 'nom': 'DTC', 'date_administration': '2024-01-01', 'statut': 'recu',
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['enfant'], self.autre.id)
+        self.assertEqual(self.autre.vaccins.count(), 2)
+
+    def test_fiche_inchangee(self):
+        vaccin = self.client.get(f'/api/enfants/{self.enfant.id}/').data['vaccins'][0]
+        self.assertNotIn('enfant', vaccin)
@@ -1,14 +1,44 @@
 from rest_framework.routers import DefaultRouter
-from .views import VillageViewSet, EnfantViewSet, VaccinViewSet, CustomLoginView
+from .views import VillageViewSet, EnfantViewSet, VaccinViewSet, CustomLoginView, LogoutView, StatistiquesView, SyncView, CacheView, ExportEnfantsView, RendezVousView, TacheViewSet, metriques
+from .asynchrone import VillagesAsynchrones, EnfantsAsynchrones, StatistiquesAsynchrones
 from rest_framework.authtoken.views import obtain_auth_token
-from django.urls import path
+from django.urls import path, re_path
+from django.views.decorators.csrf import csrf_exempt
 
 router = DefaultRouter()
 router.register(r'villages', VillageViewSet)
 router.register(r'enfants', EnfantViewSet)
 router.register(r'vaccins', VaccinViewSet)
+router.register(r'taches', TacheViewSet, basename='tache')
 
 urlpatterns = [
     path('login/', CustomLoginView.as_view(), name='custom_login'),
+    path('logout/', LogoutView.as_view(), name='logout'),
+    path('statistiques/', StatistiquesView.as_view(), name='statistiques'),
+    path('sync/', SyncView.as_view(), name='sync'),
+    path('rendez-vous/', RendezVousView.as_view(), name='rendez_vous'),
+    path('cache/', CacheView.as_view(), name='cache'),
+    path('metrics/', metriques, name='metriques'),
+    re_path(r'^export/enfants\.(?P<extension>csv|ndjson)$', ExportEnfantsView.as_view(), name='export_enfants'),
 ]
-urlpatterns += router.urls 
\ No newline at end of file
+urlpatterns += router.urls
+
+
+def lecture_asynchrone(classe, synchrone):
+    # Les vues DRF sont exemptées de CSRF (vérifié par SessionAuthentication) : la vue
+    # asynchrone, qui leur délègue les écritures, l'est aussi
+    if isinstance(synchrone, str):
+        synchrone = next(motif.callback for motif in router.urls if motif.name == synchrone)
+    return csrf_exempt(classe.as_view(synchrone=synchrone))
+
+
+# Lectures asynchrones (asynchrone.py), placées devant les routes DRF sous ASGI
+# (backend_api/urls_asgi.py), sous les mêmes noms (reverse, métriques)
+routes_asynchrones = [
+    path('villages/', lecture_asynchrone(VillagesAsynchrones, 'village-list'), name='village-list'),
+    re_path(r'^villages/(?P<pk>\d+)/$', lecture_asynchrone(VillagesAsynchrones, 'village-detail'), name='village-detail'),
+    path('enfants/', lecture_asynchrone(EnfantsAsynchrones, 'enfant-list'), name='enfant-list'),
+    re_path(r'^enfants/(?P<pk>\d+)/$', lecture_asynchrone(EnfantsAsynchrones, 'enfant-detail'), name='enfant-detail'),
+    path('statistiques/', lecture_asynchrone(StatistiquesAsynchrones, StatistiquesView.as_view()), name='statistiques'),
+]
+ 
\ No newline at end of file
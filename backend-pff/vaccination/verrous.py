@@ -0,0 +1,75 @@
+import random
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+
+TENTATIVES = 4
+DELAI_INITIAL = 0.05
+
+
+def base_verrouillee(erreur):
+    message = str(erreur).lower()
+    return 'locked' in message or 'busy' in message
+
+
+@contextmanager
+def ecriture(using=DEFAULT_DB_ALIAS):
+    """
+    Transaction d'écriture, ouverte sous SQLite par BEGIN IMMEDIATE : le verrou d'écriture est
+    pris dès le début (avec l'attente de busy_timeout) au lieu d'échouer lors du passage d'une
+    lecture à l'écriture. Les autres transactions restent DEFERRED.
+    """
+    connexion = connections[using]
+    if connexion.vendor != 'sqlite' or connexion.in_atomic_block:
+        with transaction.atomic(using=using):
+            yield
+        return
+    # Le mode est relu des réglages à la connexion : elle doit être ouverte avant
+    connexion.ensure_connection()
+    mode = connexion.transaction_mode
+    connexion.transaction_mode = 'IMMEDIATE'
+    try:
+        with transaction.atomic(using=using):
+            # Seul le BEGIN de ce bloc est concerné
+            connexion.transaction_mode = mode
+            yield
+    finally:
+        connexion.transaction_mode = mode
+
+
+def reessayer_si_verrouillee(fonction=None, *, tentatives=TENTATIVES, delai=DELAI_INITIAL, using=DEFAULT_DB_ALIAS):
+    """
+    Relance `fonction` quand SQLite signale une base verrouillée malgré son délai d'attente,
+    avec une attente exponentielle et aléatoire. Chaque essai forme une transaction d'écriture
+    complète (`ecriture`) : dans un bloc atomic englobant, l'erreur est propagée sans nouvel essai.
+    """
+    if fonction is None:
+        return lambda f: reessayer_si_verrouillee(f, tentatives=tentatives, delai=delai, using=using)
+
+    @wraps(fonction)
+    def enveloppe(*args, **kwargs):
+        for tentative in range(tentatives):
+            try:
+                with ecriture(using):
+                    return fonction(*args, **kwargs)
+            except OperationalError as erreur:
+                if (not base_verrouillee(erreur) or tentative == tentatives - 1
+                        or connections[using].in_atomic_block):
+                    raise
+                time.sleep(delai * 2 ** tentative * (1 + random.random()))
+    return enveloppe
+
+
+class EcritureAvecRepriseMixin:
+    """Écritures des viewsets relancées si la base est momentanément verrouillée."""
+
+    def perform_create(self, serializer):
+        reessayer_si_verrouillee(super().perform_create)(serializer)
+
+    def perform_update(self, serializer):
+        reessayer_si_verrouillee(super().perform_update)(serializer)
+
+    def perform_destroy(self, instance):
+        reessayer_si_verrouillee(super().perform_destroy)(instance)
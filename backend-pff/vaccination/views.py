@@ -1,7 +1,31 @@
+from django.db import IntegrityError
+from django.db.models import Prefetch
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from django.shortcuts import render
-from rest_framework import viewsets
-from .models import Village, Enfant, Vaccin
-from .serializers import VillageSerializer, EnfantSerializer, VaccinSerializer
+from django.utils import timezone
+from rest_framework import generics, mixins, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, PermissionDenied
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
+from .models import Village, Enfant, Vaccin, StatistiqueVillage, RendezVous, Tache, version_table
+from .filters import EnfantFilter, VaccinFilter, RendezVousFilter
+from .pagination import PaginationEnfants, PaginationRecherche, PaginationRendezVous
+from .synchronisation import changements, lire_token, TokenInvalide, LIMITE_PAR_DEFAUT
+from .serializers import (
+    VillageSerializer, EnfantSerializer, VaccinSerializer, VaccinImbriqueSerializer,
+    StatistiqueVillageSerializer, EnfantLotSerializer, RendezVousSerializer, TacheSerializer,
+)
+from .lots import enregistrer_lot
+from .conditionnel import ConditionnelMixin, versions_tables, version_enfant
+from .cache import CacheReponseMixin, compteurs
+from .metriques import registre
+from .verrous import EcritureAvecRepriseMixin, reessayer_si_verrouillee
+from .routage import base_lecture
+from .rapide import ListeRapideMixin, date_iso, listes_rapides, vaccins_par_enfant
+from . import couverture, export, recherche, taches
+from .rendez_vous import avec_statut
+from .authentification import est_administrateur, memoriser, role_de
+from rest_framework.reverse import reverse
 from django.contrib.auth import authenticate
 from rest_framework.authtoken.models import Token
 from rest_framework.response import Response
@@ -9,29 +33,384 @@ from rest_framework.views import APIView
 from rest_framework import status
 from django.contrib.auth.models import User
 from .models import Profile
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Create your views here.
 
-class VillageViewSet(viewsets.ModelViewSet):
-    queryset = Village.objects.all()
+def liste_parametre(valeur):
+    """'a,b' -> ['a', 'b'] ; None si le paramètre est absent."""
+    if valeur is None:
+        return None
+    return [element.strip() for element in valeur.split(',') if element.strip()]
+
+class ChampsDynamiquesMixin:
+    """
+    Champs partiels en lecture : `?fields=id,nom` restreint la réponse, et les relations
+    de `champs_extensibles` ne sont incluses en liste qu'avec `?expand=vaccins`.
+    Le détail inclut toutes les relations sauf si `fields` est précisé.
+    """
+    champs_extensibles = []
+    # Actions qui renvoient une liste (mêmes champs par défaut que `list`)
+    actions_liste = ['list']
+
+    def champs_demandes(self):
+        if self.request is None or self.request.method not in SAFE_METHODS:
+            return None
+        fields = liste_parametre(self.request.query_params.get('fields'))
+        expand = set(liste_parametre(self.request.query_params.get('expand')) or [])
+        extensibles = set(self.champs_extensibles)
+        if fields:
+            return set(fields) | (expand & extensibles)
+        if self.action in self.actions_liste:
+            return set(self.get_serializer_class().Meta.fields) - (extensibles - expand)
+        return None
+
+    def inclut(self, champ):
+        champs = self.champs_demandes()
+        return champs is None or champ in champs
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('champs', self.champs_demandes())
+        return super().get_serializer(*args, **kwargs)
+
+class VillageViewSet(ConditionnelMixin, CacheReponseMixin, EcritureAvecRepriseMixin, viewsets.ModelViewSet):
+    queryset = Village.objects.all().order_by('id')
+    lookup_value_regex = r'\d+'
     serializer_class = VillageSerializer
+    lecture_replique = True
+    # Table de référence de petite taille : renvoyée en entier
+    pagination_class = None
+    tables_versionnees = [Village]
+    generations_liste = [version_table(Village)]
 
-class EnfantViewSet(viewsets.ModelViewSet):
-    queryset = Enfant.objects.all().order_by('id')
+    def generations_detail(self, pk):
+        return self.generations_liste
+
+class EnfantViewSet(ConditionnelMixin, CacheReponseMixin, ChampsDynamiquesMixin, ListeRapideMixin,
+                    EcritureAvecRepriseMixin, viewsets.ModelViewSet):
+    queryset = Enfant.objects.select_related('village').order_by('id')
+    lookup_value_regex = r'\d+'
     serializer_class = EnfantSerializer
+    pagination_class = PaginationEnfants
+    lecture_replique = True
+    filter_backends = [EnfantFilter]
+    champs_extensibles = ['vaccins']
+    actions_liste = ['list', 'search']
+    tables_versionnees = [Enfant, Village, Vaccin]
+    generations_liste = [version_table(Enfant), version_table(Village), version_table(Vaccin), couverture.GENERATION]
+
+    def generations_detail(self, pk):
+        # La fiche inclut le nom du village, les vaccins de l'enfant et sa couverture
+        return [version_table(Village), f'enfant:{pk}', couverture.GENERATION]
+
+    colonnes_rapides = [
+        'id', 'nom', 'sexe', 'village_id', 'village__nom', 'date_naissance', 'taux_couverture',
+        'vaccins_recus', 'vaccins_retard', 'doses_manquantes', 'prochaine_echeance',
+    ]
+
+    def get_queryset(self):
+        # Village en jointure ; vaccins préchargés seulement s'ils sont sérialisés :
+        # 1 ou 2 requêtes quel que soit le nombre d'enfants
+        queryset = super().get_queryset()
+        if self.inclut('vaccins'):
+            queryset = queryset.prefetch_related(Prefetch('vaccins', queryset=Vaccin.objects.order_by('id')))
+        return queryset
+
+    def serialiser_lignes(self, lignes, vaccins=None):
+        """`vaccins` : {enfant_id: [vaccins]} déjà lus (vues asynchrones), sinon lus ici si demandés."""
+        champs = self.champs_demandes()
+        sortie = [nom for nom in EnfantSerializer.Meta.fields
+                  if nom != 'village_id' and (champs is None or nom in champs)]
+        if vaccins is None:
+            vaccins = vaccins_par_enfant([ligne['id'] for ligne in lignes]) if 'vaccins' in sortie else {}
+        resultats = []
+        for ligne in lignes:
+            ligne['village'] = {'id': ligne['village_id'], 'nom': ligne['village__nom']}
+            ligne['date_naissance'] = date_iso(ligne['date_naissance'])
+            ligne['prochaine_echeance'] = date_iso(ligne['prochaine_echeance'])
+            ligne['vaccins'] = vaccins.get(ligne['id'], [])
+            resultats.append({nom: ligne[nom] for nom in sortie})
+        return resultats
 
-class VaccinViewSet(viewsets.ModelViewSet):
-    queryset = Vaccin.objects.all()
+    def validateurs_detail(self, request, *args, **kwargs):
+        return version_enfant(kwargs['pk'])
+
+    @action(detail=True, methods=['get', 'post'], url_path='vaccins', filter_backends=[])
+    def vaccins(self, request, pk=None):
+        """
+        Vaccins d'un enfant : une recherche par `enfant_id` sur l'index (enfant, statut),
+        sans charger l'enfant ni toucher aux vaccins des autres enfants.
+        """
+        if request.method == 'POST':
+            if not Enfant.objects.filter(pk=pk).exists():
+                raise NotFound('Enfant introuvable.')
+            serializer = VaccinImbriqueSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            reessayer_si_verrouillee(serializer.save)(enfant_id=pk)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        # La version de la fiche sert aussi de test d'existence
+        validateurs = version_enfant(pk)
+        if validateurs is None:
+            raise NotFound('Enfant introuvable.')
+        vaccins = VaccinFilter().filter_queryset(request, Vaccin.objects.filter(enfant_id=pk).order_by('id'), self)
+        return self.repondre_si_modifie(request, validateurs, lambda: self.reponse_en_cache(
+            request, [f'enfant:{pk}'], lambda: Response(VaccinImbriqueSerializer(vaccins, many=True).data)
+        ))
+
+    @action(detail=False, methods=['get'], url_path='search', filter_backends=[],
+            pagination_class=PaginationRecherche)
+    def search(self, request):
+        """
+        Recherche `?q=` par préfixes sur le nom de l'enfant et celui de son village, sans
+        tenir compte des accents (recherche.py), classée par pertinence ; mêmes champs,
+        mêmes validateurs et même cache que la liste.
+        """
+        mots = recherche.termes(request.query_params.get('q'))
+        return self.repondre_si_modifie(request, self.validateurs_liste(request), lambda: self.reponse_en_cache(
+            request, self.generations_liste, lambda: self.resultats_recherche(request, mots)
+        ))
+
+    def resultats_recherche(self, request, mots):
+        decalage, taille = self.paginator.bornes(request)
+        queryset = self.get_queryset()
+        ids = self.paginator.paginer(recherche.rechercher(mots, taille + 1, decalage, using=queryset.db))
+        # Lignes relues par clé primaire, puis remises dans l'ordre du classement
+        queryset = queryset.filter(pk__in=ids)
+        if listes_rapides():
+            lignes = {ligne['id']: ligne for ligne in queryset.prefetch_related(None).values(*self.colonnes_rapides)}
+            donnees = self.serialiser_lignes([lignes[pk] for pk in ids if pk in lignes])
+        else:
+            enfants = {enfant.pk: enfant for enfant in queryset}
+            donnees = self.get_serializer([enfants[pk] for pk in ids if pk in enfants], many=True).data
+        return self.paginator.get_paginated_response(donnees)
+
+    # Nombre maximal d'enfants par envoi en lot
+    taille_max_lot = 1000
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Envoi en lot d'enfants et de leurs vaccins, chacun avec une clé `cle` fournie
+        par le client : tout est écrit dans une transaction, et un renvoi ne duplique rien.
+        """
+        donnees = request.data.get('enfants') if isinstance(request.data, dict) else request.data
+        if not isinstance(donnees, list) or not donnees:
+            return Response({'error': 'Liste "enfants" attendue.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(donnees) > self.taille_max_lot:
+            return Response(
+                {'error': f'Lot trop volumineux (maximum {self.taille_max_lot} enfants).'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        serializer = EnfantLotSerializer(data=donnees, many=True)
+        serializer.is_valid(raise_exception=True)
+        try:
+            resultats = reessayer_si_verrouillee(enregistrer_lot)(serializer.validated_data)
+        except IntegrityError:
+            # Même lot envoyé en parallèle : le renvoi suivant verra les lignes existantes
+            return Response({'error': 'Conflit avec un envoi concurrent, réessayer.'}, status=status.HTTP_409_CONFLICT)
+        cree = any(r['statut'] == 'cree' or any(v['statut'] == 'cree' for v in r['vaccins']) for r in resultats)
+        return Response({'resultats': resultats}, status=status.HTTP_201_CREATED if cree else status.HTTP_200_OK)
+
+class VaccinViewSet(ConditionnelMixin, CacheReponseMixin, ListeRapideMixin, EcritureAvecRepriseMixin,
+                    viewsets.ModelViewSet):
+    queryset = Vaccin.objects.all().order_by('id')
+    lookup_value_regex = r'\d+'
     serializer_class = VaccinSerializer
+    lecture_replique = True
+    filter_backends = [VaccinFilter]
+    tables_versionnees = [Vaccin, Enfant, Village]
+    # Les filtres par village passent par l'enfant, et ?village= accepte le nom du village
+    generations_liste = [version_table(Vaccin), version_table(Enfant), version_table(Village)]
+    colonnes_rapides = ['id', 'enfant_id', 'nom', 'date_administration', 'statut', 'notes']
+
+    def serialiser_lignes(self, lignes):
+        return [
+            {'id': ligne['id'], 'enfant': ligne['enfant_id'], 'nom': ligne['nom'],
+             'date_administration': date_iso(ligne['date_administration']), 'statut': ligne['statut'],
+             'notes': ligne['notes']}
+            for ligne in lignes
+        ]
+
+class StatistiquesView(ConditionnelMixin, APIView):
+    """Statistiques globales et par village, lues depuis la table StatistiqueVillage."""
+    lecture_replique = True
+
+    tables_versionnees = [Village, Enfant, Vaccin]
+
+    @staticmethod
+    def validateurs(versions):
+        # Les rendez-vous à venir dépendent aussi du jour courant ; leur recalcul publie
+        # une nouvelle version de la table des enfants
+        cle, date = versions
+        return f'{cle}-{timezone.localdate().isoformat()}', date
+
+    @staticmethod
+    def requetes():
+        """
+        (statistiques par village, rendez-vous à venir) : lues en liste et comptés par les appelants.
+        Un rendez-vous par enfant, sa prochaine dose, tant qu'elle n'est pas en retard.
+        """
+        return (
+            StatistiqueVillage.objects.select_related('village').order_by('village__nom'),
+            RendezVous.objects.filter(prochaine=True, date_limite__gte=timezone.localdate()),
+        )
+
+    @staticmethod
+    def donnees(lignes, prochains):
+        total = StatistiqueVillage(
+            nombre_enfants=sum(ligne.nombre_enfants for ligne in lignes),
+            vaccins_recus=sum(ligne.vaccins_recus for ligne in lignes),
+            vaccins_retard=sum(ligne.vaccins_retard for ligne in lignes),
+        )
+        return {
+            'nombre_enfants': total.nombre_enfants,
+            'taux_couverture_global': total.taux_couverture,
+            'prochains_rendez_vous': prochains,
+            'vaccins_recus': total.vaccins_recus,
+            'vaccins_retard': total.vaccins_retard,
+            'villages': StatistiqueVillageSerializer(lignes, many=True).data,
+        }
+
+    def get(self, request, *args, **kwargs):
+        validateurs = self.validateurs(versions_tables(*self.tables_versionnees))
+        return self.repondre_si_modifie(request, validateurs, self.statistiques)
+
+    def statistiques(self):
+        lignes, prochains = self.requetes()
+        return Response(self.donnees(list(lignes), prochains.count()))
+
+class RendezVousView(generics.ListAPIView):
+    """
+    Doses attendues, calculées depuis le calendrier vaccinal (rendez_vous.py), avec leur
+    statut du jour : a_venir, du (dans la fenêtre de tolérance) ou en_retard.
+    """
+    serializer_class = RendezVousSerializer
+    pagination_class = PaginationRendezVous
+    filter_backends = [RendezVousFilter]
+    lecture_replique = True
+
+    def get_queryset(self):
+        return avec_statut(RendezVous.objects.select_related('enfant', 'village'))
+
+class CacheView(APIView):
+    """Compteurs du cache des réponses (processus courant)."""
+
+    def get(self, request, *args, **kwargs):
+        return Response(compteurs())
+
+def metriques(request):
+    """Métriques du processus courant au format texte de Prometheus."""
+    return HttpResponse(registre.exposer(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+class ExportEnfantsView(APIView):
+    """
+    Export complet des enfants et de leurs vaccins (`enfants.csv` ou `enfants.ndjson`,
+    `?gzip=1` pour compresser), produit au fil de la lecture : la mémoire ne dépend pas du volume.
+    Filtres : village, date_naissance_min/max, date_administration_min/max.
+    Export différé : POST /api/taches/ avec nom=exporter_enfants.
+    """
+    permission_classes = [IsAuthenticated]
+    lecture_replique = True
+
+    def get(self, request, extension):
+        filtres = export.filtres(request.query_params)
+        # Le corps est lu après la fin de la vue : la base de lecture est fixée dès maintenant
+        blocs = export.exporter(extension, filtres, using=base_lecture())
+        nom = f'enfants.{extension}'
+        if request.query_params.get('gzip') in ('1', 'true'):
+            response = StreamingHttpResponse(export.compresser(blocs), content_type='application/gzip')
+            nom += '.gz'
+        else:
+            response = StreamingHttpResponse(blocs, content_type=export.TYPES[extension])
+        response['Content-Disposition'] = f'attachment; filename="{nom}"'
+        return response
+
+def reponse_tache(request, tache):
+    """202 Accepted : la tâche mise en file, à suivre sur l'URL de l'en-tête Location."""
+    return Response(
+        TacheSerializer(tache, context={'request': request}).data, status=status.HTTP_202_ACCEPTED,
+        headers={'Location': reverse('tache-detail', args=[tache.pk], request=request)},
+    )
+
+class TacheViewSet(mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Tâches différées (taches.py) : avancement et résultat sur /api/taches/<id>/, avec
+    Retry-After tant que la tâche n'est pas finie, fichier produit sur /api/taches/<id>/fichier/.
+    Chacun voit ses tâches, un administrateur toutes ; seul un administrateur en crée par POST.
+    """
+    serializer_class = TacheSerializer
+    permission_classes = [IsAuthenticated]
+    # Secondes suggérées entre deux interrogations d'une tâche en cours
+    intervalle_interrogation = 2
+
+    def get_queryset(self):
+        if est_administrateur(self.request.user):
+            return Tache.objects.all()
+        return Tache.objects.filter(demandeur=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        if not est_administrateur(request.user):
+            raise PermissionDenied('Réservé aux administrateurs.')
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        tache = taches.mettre_en_file(
+            serializer.validated_data['nom'], serializer.validated_data.get('parametres'), demandeur=request.user,
+        )
+        return reponse_tache(request, tache)
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        if response.data['statut'] in (Tache.EN_ATTENTE, Tache.EN_COURS):
+            response['Retry-After'] = str(self.intervalle_interrogation)
+        return response
+
+    @action(detail=True)
+    def fichier(self, request, pk=None):
+        tache = self.get_object()
+        nom = (tache.resultat or {}).get('fichier') if tache.statut == Tache.TERMINEE else None
+        chemin = taches.dossier_fichiers() / nom if nom else None
+        if chemin is None or not chemin.is_file():
+            raise NotFound('Aucun fichier pour cette tâche.')
+        return FileResponse(open(chemin, 'rb'), as_attachment=True, filename=nom)
+
+class SyncView(APIView):
+    """
+    Synchronisation différentielle : `?since=<token>` renvoie les lignes modifiées et les
+    suppressions depuis ce token, avec le token à renvoyer au prochain appel.
+    """
+
+    def get(self, request, *args, **kwargs):
+        try:
+            depuis = lire_token(request.query_params.get('since'))
+            limite = int(request.query_params.get('limite', LIMITE_PAR_DEFAUT))
+        except ValueError as erreur:
+            message = str(erreur) if isinstance(erreur, TokenInvalide) else 'Limite invalide.'
+            return Response({'error': message}, status=status.HTTP_400_BAD_REQUEST)
+        limite = max(1, min(limite, 10 * LIMITE_PAR_DEFAUT))
+        try:
+            return Response(changements(depuis, limite))
+        except TokenInvalide as erreur:
+            return Response({'error': str(erreur)}, status=status.HTTP_400_BAD_REQUEST)
 
 class CustomLoginView(APIView):
+    # Seuls les identifiants comptent : aucune authentification préalable à résoudre
+    authentication_classes = []
+
     def post(self, request, *args, **kwargs):
         username = request.data.get('username')
         password = request.data.get('password')
-        user = authenticate(username=username, password=password)
+        # Utilisateur, profil et token lus en une requête (ModelBackendAvecProfil)
+        user = authenticate(request, username=username, password=password)
         if user is not None:
-            token, created = Token.objects.get_or_create(user=user)
-            role = user.profile.role if hasattr(user, 'profile') else 'parent'
+            try:
+                token = user.auth_token
+            except Token.DoesNotExist:
+                token, created = Token.objects.get_or_create(user=user)
+            # Les requêtes suivantes avec ce token n'iront pas en base
+            memoriser(token.key, user)
+            role = role_de(user)
             
             # Gestion du nom complet avec fallback
             if user.first_name and user.last_name:
@@ -43,7 +422,7 @@ class CustomLoginView(APIView):
             else:
                 full_name = user.username
             
-            print(f"Login - Username: {user.username}, Full Name: {full_name}, Role: {role}")
+            logger.debug('Connexion de %s (%s)', user.username, role)
             
             return Response({
                 'token': token.key,
@@ -52,3 +431,11 @@ class CustomLoginView(APIView):
                 'full_name': full_name,
             })
         return Response({'error': 'Identifiants invalides'}, status=status.HTTP_401_UNAUTHORIZED)
+
+class LogoutView(APIView):
+    """Supprime le token de l'utilisateur ; le signal le retire aussi du cache."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        Token.objects.filter(user=request.user).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)